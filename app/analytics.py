@@ -1,20 +1,95 @@
-from collections.abc import Sequence
+import datetime as dt
+import functools
+import os
+from array import array
+from collections.abc import Collection, Mapping, Sequence
+from typing import cast
+from uuid import UUID
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
 from .project_types import (
+    AggregationPeriod,
+    AnalyticsEngine,
     FitnessGoal,
+    PeriodAggregateEntry,
     ProgressMetrics,
+    ProgressReport,
     Result,
     WeeklyAggregateEntry,
+    WeeklyAverage,
+    WeeklyRollup,
+    WeeklyStat,
+    WeeklyTrendFit,
+    WeekStart,
     WeightEntry,
+    WeightForecast,
+    WeightSeries,
 )
 
 MAINTAIN_ACCEPTABLE_CHANGE = 0.2
 
+DEFAULT_ANALYTICS_ENGINE: AnalyticsEngine = "pandas"
+DEFAULT_WEEK_START: WeekStart = "monday"
+
+# Optional weekly statistics and the entry fields they are returned in
+WEEKLY_STAT_FIELDS: dict[WeeklyStat, str] = {
+    "median": "median_weight",
+    "min": "min_weight",
+    "max": "max_weight",
+    "std": "std_weight",
+    "count": "entries_count",
+}
+
+DEFAULT_FORECAST_WINDOW_WEEKS = 8
+# Normal approximation of a 95% confidence interval of the weekly change
+FORECAST_CONFIDENCE_Z = 1.96
+# Target dates further away than this are not projected
+MAX_FORECAST_WEEKS = 520
+
+# Readings deviating from the median of their neighbours by more than
+# OUTLIER_THRESHOLD robust standard deviations are flagged as outliers
+OUTLIER_WINDOW = 7
+OUTLIER_THRESHOLD = 3.0
+# Smaller deviations are never flagged, so flat histories with a MAD close to 0
+# don't turn normal day to day fluctuations into outliers
+OUTLIER_MIN_DEVIATION = 1.0
+# Scales MAD to the standard deviation of normally distributed values
+MAD_TO_STD = 1.4826
+
+# Day ordinal of 1970-01-01, used to convert datetime64 days to day ordinals
+UNIX_EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+@functools.cache
+def get_analytics_engine() -> AnalyticsEngine:
+    # Read once, the app calls it on startup so an invalid value fails there
+    engine = os.environ.get("ANALYTICS_ENGINE", DEFAULT_ANALYTICS_ENGINE)
+    match engine:
+        case "pandas" | "numpy":
+            return engine
+        case _:
+            raise ValueError(f"Unsupported analytics engine {engine}")
+
 
 def get_weekly_aggregates(
-    daily_entries: Sequence[WeightEntry], goal: FitnessGoal
+    daily_entries: Sequence[WeightEntry] | WeightSeries,
+    goal: FitnessGoal,
+    stats: Collection[WeeklyStat] = (),
+) -> list[WeeklyAggregateEntry]:
+    if get_analytics_engine() == "numpy":
+        return get_weekly_aggregates_numpy(daily_entries, goal, stats)
+
+    return get_weekly_aggregates_pandas(daily_entries, goal, stats)
+
+
+def get_weekly_aggregates_pandas(
+    daily_entries: Sequence[WeightEntry] | WeightSeries,
+    goal: FitnessGoal,
+    stats: Collection[WeeklyStat] = (),
 ) -> list[WeeklyAggregateEntry]:
     def weight_change_to_result(weight_change: float) -> Result:
         return calculate_result(weight_change, goal)
@@ -22,25 +97,37 @@ def get_weekly_aggregates(
     if len(daily_entries) == 0:
         return []
 
-    # 1. Convert daily_entries DTO list to data frame
-    df = pd.DataFrame([entry.model_dump() for entry in daily_entries])
+    # 1. Convert daily_entries to data frame
+    if isinstance(daily_entries, WeightSeries):
+        day_ordinals, weights = get_series_arrays(daily_entries)
+        df = pd.DataFrame(
+            {
+                "entry_date": (day_ordinals - UNIX_EPOCH_ORDINAL).astype(
+                    "datetime64[D]"
+                ),
+                "weight": weights,
+            }
+        )
+    else:
+        df = pd.DataFrame([entry.model_dump() for entry in daily_entries])
 
     # Set date index to aggregate by week
     df["week_start"] = pd.to_datetime(df["entry_date"])
     df.set_index("week_start", inplace=True)  # pyright: ignore[reportUnknownMemberType]
 
-    # Calculate weekly averages (mean and median) using resample method
-    # averages = round(df['weight'].resample('W').agg(['mean','median']).dropna(), 2)
-    weekly_averages: pd.Series[float] = (
-        df["weight"].resample("W").mean().dropna().round(2)
-    )
+    # Calculate weekly averages and requested statistics in one resample pass
+    weekly_stats = cast(
+        pd.DataFrame,
+        df["weight"].resample("W").agg(["mean", *stats]),  # pyright: ignore
+    ).dropna(subset=["mean"])
 
     # After resampling, the date of the week is end of week
     # We set the index date to beginning the week
     # (resample results in end of week so we subtract 6 days from it)
-    weekly_averages.index = weekly_averages.index.map(  # pyright:ignore
+    weekly_stats.index = weekly_stats.index.map(  # pyright:ignore
         lambda day: day - pd.DateOffset(n=6)  # pyright:ignore
     )
+    weekly_averages: pd.Series[float] = weekly_stats["mean"].round(2)
 
     # Calculate the weight change between weeks
     weekly_entries: pd.DataFrame = weekly_averages.to_frame(name="avg_weight")
@@ -70,6 +157,15 @@ def get_weekly_aggregates(
         weight_change_to_result
     )
 
+    for stat in stats:
+        stat_values = weekly_stats[stat]
+        if stat != "count":
+            stat_values = stat_values.round(2)
+        # Standard deviation of a single reading is NaN
+        weekly_entries[WEEKLY_STAT_FIELDS[stat]] = stat_values.astype(object).where(
+            stat_values.notna(), None
+        )
+
     # Reset index to keep date as a column
     # and convert it to simple datetime type
     weekly_entries.reset_index(inplace=True)
@@ -82,6 +178,796 @@ def get_weekly_aggregates(
     return [WeeklyAggregateEntry.model_validate(record) for record in records]
 
 
+def get_weekly_aggregates_numpy(
+    daily_entries: Sequence[WeightEntry] | WeightSeries,
+    goal: FitnessGoal,
+    stats: Collection[WeeklyStat] = (),
+) -> list[WeeklyAggregateEntry]:
+    if len(daily_entries) == 0:
+        return []
+
+    if isinstance(daily_entries, WeightSeries):
+        return aggregate_weeks(*get_series_arrays(daily_entries), goal, stats)
+
+    entries_count = len(daily_entries)
+    day_ordinals = np.fromiter(
+        (entry.entry_date.toordinal() for entry in daily_entries),
+        dtype=np.int64,
+        count=entries_count,
+    )
+    weights = np.fromiter(
+        (entry.weight for entry in daily_entries),
+        dtype=np.float64,
+        count=entries_count,
+    )
+
+    return aggregate_weeks(day_ordinals, weights, goal, stats)
+
+
+def get_series_arrays(
+    series: WeightSeries,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    # Views over the series buffers, only the ordinals are widened to int64
+    day_ordinals = np.frombuffer(series.day_ordinals, dtype=np.intc).astype(np.int64)
+    weights = np.frombuffer(series.weights, dtype=np.float64)
+    return day_ordinals, weights
+
+
+def detect_outliers(
+    weights: npt.NDArray[np.float64],
+    window: int = OUTLIER_WINDOW,
+    threshold: float = OUTLIER_THRESHOLD,
+) -> npt.NDArray[np.bool_]:
+    """
+    Flag readings far from the rolling median of the neighbouring readings,
+    measured in rolling MADs (Hampel filter). Windows hold a fixed number
+    of readings, so the pass is linear in the length of the history
+    """
+    # Too few neighbours to tell a mis-weigh from a real change
+    if len(weights) < window:
+        return np.zeros(len(weights), dtype=np.bool_)
+
+    # Edges are mirrored so the first and last readings get full windows
+    half_window = window // 2
+    windows = sliding_window_view(
+        np.pad(weights, half_window, mode="reflect"), 2 * half_window + 1
+    )
+    rolling_median = np.median(windows, axis=1)
+    rolling_mad = np.median(np.abs(windows - rolling_median[:, None]), axis=1)
+
+    deviations = np.abs(weights - rolling_median)
+    max_deviations = threshold * np.maximum(
+        rolling_mad * MAD_TO_STD, OUTLIER_MIN_DEVIATION
+    )
+    return cast(npt.NDArray[np.bool_], deviations > max_deviations)
+
+
+def split_outliers(series: WeightSeries) -> tuple[WeightSeries, WeightSeries]:
+    """
+    Split a series into regular readings and flagged outliers
+    """
+    day_ordinals, weights = get_series_arrays(series)
+    is_outlier = detect_outliers(weights)
+    if not is_outlier.any():
+        return series, WeightSeries(series.user_id)
+
+    def select(mask: npt.NDArray[np.bool_]) -> WeightSeries:
+        return WeightSeries(
+            series.user_id,
+            array("i", day_ordinals[mask].tolist()),
+            array("d", weights[mask].tolist()),
+        )
+
+    return select(~is_outlier), select(is_outlier)
+
+
+def aggregate_weeks(
+    day_ordinals: npt.NDArray[np.int64],
+    weights: npt.NDArray[np.float64],
+    goal: FitnessGoal,
+    stats: Collection[WeeklyStat] = (),
+) -> list[WeeklyAggregateEntry]:
+    """
+    Bin daily weights into Monday-start weeks and calculate weekly metrics.
+    Gives the same output as the pandas engine without building data frames
+    """
+    if len(day_ordinals) == 0:
+        return []
+
+    week_starts, means = bucket_daily_weights(day_ordinals, weights, "week", "monday")
+    weekly_stats = (
+        calculate_weekly_stats(day_ordinals, weights, stats) if stats else None
+    )
+    return weekly_entries_from_means(week_starts, means, goal, weekly_stats)
+
+
+def calculate_weekly_stats(
+    day_ordinals: npt.NDArray[np.int64],
+    weights: npt.NDArray[np.float64],
+    stats: Collection[WeeklyStat],
+) -> dict[str, list[float | None] | list[int]]:
+    """
+    Requested statistics of each Monday-start week with entries, by entry field.
+    Weights are sorted once by week and value, so min, max and median
+    are read at the group boundaries instead of grouping once per statistic
+    """
+    week_index = get_bucket_index(day_ordinals, "week", "monday")
+    order = np.lexsort((weights, week_index))
+    sorted_weeks = week_index[order]
+    sorted_weights = weights[order]
+
+    is_group_start = np.empty(len(sorted_weeks), dtype=np.bool_)
+    is_group_start[0] = True
+    is_group_start[1:] = sorted_weeks[1:] != sorted_weeks[:-1]
+    group_starts = np.flatnonzero(is_group_start)
+    counts = np.diff(np.append(group_starts, len(sorted_weeks)))
+
+    weekly_stats: dict[str, list[float | None] | list[int]] = {}
+    for stat in stats:
+        match stat:
+            case "median":
+                values = (
+                    sorted_weights[group_starts + (counts - 1) // 2]
+                    + sorted_weights[group_starts + counts // 2]
+                ) / 2
+            case "min":
+                values = sorted_weights[group_starts]
+            case "max":
+                values = sorted_weights[group_starts + counts - 1]
+            case "std":
+                # Sample standard deviation, same as pandas
+                means = np.add.reduceat(sorted_weights, group_starts) / counts
+                squared_deviations = np.add.reduceat(
+                    (sorted_weights - np.repeat(means, counts)) ** 2, group_starts
+                )
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values = np.sqrt(squared_deviations / (counts - 1))
+                weekly_stats[WEEKLY_STAT_FIELDS[stat]] = [
+                    round(value, 2) if count > 1 else None
+                    for value, count in zip(
+                        values.tolist(), counts.tolist(), strict=True
+                    )
+                ]
+                continue
+            case "count":
+                weekly_stats[WEEKLY_STAT_FIELDS[stat]] = counts.tolist()
+                continue
+
+        weekly_stats[WEEKLY_STAT_FIELDS[stat]] = np.round(values, 2).tolist()
+
+    return weekly_stats
+
+
+def get_period_aggregates(
+    daily_entries: Sequence[WeightEntry] | WeightSeries,
+    goal: FitnessGoal,
+    period: AggregationPeriod,
+    week_start: WeekStart = DEFAULT_WEEK_START,
+) -> list[PeriodAggregateEntry]:
+    if len(daily_entries) == 0:
+        return []
+
+    if isinstance(daily_entries, WeightSeries):
+        day_ordinals, weights = get_series_arrays(daily_entries)
+    else:
+        day_ordinals = np.fromiter(
+            (entry.entry_date.toordinal() for entry in daily_entries),
+            dtype=np.int64,
+            count=len(daily_entries),
+        )
+        weights = np.fromiter(
+            (entry.weight for entry in daily_entries),
+            dtype=np.float64,
+            count=len(daily_entries),
+        )
+
+    period_starts, means = bucket_daily_weights(
+        day_ordinals, weights, period, week_start
+    )
+    avg_weight = np.round(means, 2)
+    period_days = get_period_days(period_starts, period)
+
+    is_reference_period = np.zeros(len(avg_weight), dtype=np.bool_)
+    is_reference_period[0] = True
+    weight_change, weight_change_prc, net_calories = calculate_weekly_changes(
+        avg_weight, is_reference_period, period_days
+    )
+    # Results are judged on the weekly rate so the maintain tolerance stays weekly
+    results = calculate_results(weight_change * 7 / period_days, goal)
+
+    return [
+        PeriodAggregateEntry.model_construct(
+            period_start=dt.date.fromordinal(period_start),
+            avg_weight=avg,
+            weight_change=change,
+            weight_change_prc=change_prc,
+            net_calories=calories,
+            result=result,
+        )
+        for period_start, avg, change, change_prc, calories, result in zip(
+            period_starts.tolist(),
+            avg_weight.tolist(),
+            weight_change.tolist(),
+            weight_change_prc.tolist(),
+            net_calories.tolist(),
+            results,
+            strict=True,
+        )
+    ]
+
+
+def bucket_daily_weights(
+    day_ordinals: npt.NDArray[np.int64],
+    weights: npt.NDArray[np.float64],
+    period: AggregationPeriod,
+    week_start: WeekStart = DEFAULT_WEEK_START,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """
+    Group daily weights into calendar periods.
+    Returns the start day ordinal and mean weight
+    of each period that has entries, in ascending order
+    """
+    # Periods without any entries are skipped, same as dropna() after resample
+    buckets, means = get_group_means(
+        get_bucket_index(day_ordinals, period, week_start), day_ordinals, weights
+    )
+    return get_bucket_starts(buckets, period, week_start), means
+
+
+def get_group_means(
+    group_index: npt.NDArray[np.int64],
+    day_ordinals: npt.NDArray[np.int64],
+    weights: npt.NDArray[np.float64],
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """
+    Mean weight of each group with entries, in ascending group order.
+    Weights are summed in date order with Kahan compensation like pandas
+    does for group means, so rounding the means gives the same result
+    """
+    order = np.lexsort((day_ordinals, group_index))
+    sorted_groups = group_index[order]
+    sorted_weights = weights[order]
+
+    is_group_start = np.empty(len(sorted_groups), dtype=np.bool_)
+    is_group_start[0] = True
+    is_group_start[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    group_starts = np.flatnonzero(is_group_start)
+    counts = np.diff(np.append(group_starts, len(sorted_groups)))
+
+    sums = np.zeros(len(group_starts), dtype=np.float64)
+    compensation = np.zeros(len(group_starts), dtype=np.float64)
+    # One summation step for the n-th weight of every group that has one
+    for position in range(int(counts.max())):
+        groups = np.flatnonzero(counts > position)
+        value = sorted_weights[group_starts[groups] + position] - compensation[groups]
+        total = sums[groups] + value
+        compensation[groups] = total - sums[groups] - value
+        sums[groups] = total
+
+    return sorted_groups[group_starts], sums / counts
+
+
+def get_bucket_index(
+    day_ordinals: npt.NDArray[np.int64],
+    period: AggregationPeriod,
+    week_start: WeekStart,
+) -> npt.NDArray[np.int64]:
+    match period:
+        case "day":
+            return day_ordinals
+        case "week":
+            # Day 1 of the proleptic Gregorian calendar is a Monday
+            # and day 7 a Sunday, so integer division by 7 gives the week
+            return (
+                (day_ordinals - 1) // 7 if week_start == "monday" else day_ordinals // 7
+            )
+        case "month":
+            return to_month_index(day_ordinals)
+        case "quarter":
+            return to_month_index(day_ordinals) // 3
+
+
+def get_bucket_starts(
+    buckets: npt.NDArray[np.int64],
+    period: AggregationPeriod,
+    week_start: WeekStart,
+) -> npt.NDArray[np.int64]:
+    match period:
+        case "day":
+            return buckets
+        case "week":
+            return buckets * 7 + 1 if week_start == "monday" else buckets * 7
+        case "month":
+            return month_index_to_ordinal(buckets)
+        case "quarter":
+            return month_index_to_ordinal(buckets * 3)
+
+
+def get_period_days(
+    period_starts: npt.NDArray[np.int64], period: AggregationPeriod
+) -> npt.NDArray[np.int64]:
+    match period:
+        case "day":
+            return np.ones_like(period_starts)
+        case "week":
+            return np.full_like(period_starts, 7)
+        case "month" | "quarter":
+            months = 1 if period == "month" else 3
+            next_starts = month_index_to_ordinal(to_month_index(period_starts) + months)
+            return next_starts - period_starts
+
+
+def to_month_index(day_ordinals: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    # Months since 1970-01
+    return (
+        (day_ordinals - UNIX_EPOCH_ORDINAL)
+        .astype("datetime64[D]")
+        .astype("datetime64[M]")
+        .astype(np.int64)
+    )
+
+
+def month_index_to_ordinal(
+    month_index: npt.NDArray[np.int64],
+) -> npt.NDArray[np.int64]:
+    return (
+        month_index.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+        + UNIX_EPOCH_ORDINAL
+    )
+
+
+def get_weekly_aggregates_from_rollups(
+    weekly_rollups: Sequence[WeeklyRollup], goal: FitnessGoal
+) -> list[WeeklyAggregateEntry]:
+    if len(weekly_rollups) == 0:
+        return []
+
+    rollups = sorted(weekly_rollups, key=lambda rollup: rollup.week_start)
+    week_starts = np.fromiter(
+        (rollup.week_start.toordinal() for rollup in rollups),
+        dtype=np.int64,
+        count=len(rollups),
+    )
+    sums = np.fromiter(
+        (rollup.weight_sum for rollup in rollups),
+        dtype=np.float64,
+        count=len(rollups),
+    )
+    counts = np.fromiter(
+        (rollup.entry_count for rollup in rollups),
+        dtype=np.int64,
+        count=len(rollups),
+    )
+
+    return weekly_entries_from_means(week_starts, sums / counts, goal)
+
+
+def get_weekly_aggregates_from_averages(
+    weekly_averages: Sequence[WeeklyAverage], goal: FitnessGoal
+) -> list[WeeklyAggregateEntry]:
+    if len(weekly_averages) == 0:
+        return []
+
+    averages = sorted(weekly_averages, key=lambda average: average.week_start)
+    week_starts = np.fromiter(
+        (average.week_start.toordinal() for average in averages),
+        dtype=np.int64,
+        count=len(averages),
+    )
+    avg_weight = np.fromiter(
+        (average.avg_weight for average in averages),
+        dtype=np.float64,
+        count=len(averages),
+    )
+    previous_avg_weight = np.fromiter(
+        (
+            np.nan
+            if average.previous_avg_weight is None
+            else average.previous_avg_weight
+            for average in averages
+        ),
+        dtype=np.float64,
+        count=len(averages),
+    )
+    # Averages are rounded before comparing weeks, same as the other engines
+    avg_weight = np.round(avg_weight, 2)
+    previous_avg_weight = np.round(previous_avg_weight, 2)
+
+    # Weeks without a previous week are reference weeks
+    weight_change, weight_change_prc, net_calories = calculate_weekly_changes(
+        avg_weight,
+        np.isnan(previous_avg_weight),
+        previous_avg_weight=previous_avg_weight,
+    )
+
+    return to_weekly_entries(
+        week_starts.tolist(),
+        avg_weight.tolist(),
+        weight_change.tolist(),
+        weight_change_prc.tolist(),
+        net_calories.tolist(),
+        calculate_results(weight_change, goal),
+    )
+
+
+def weekly_entries_from_means(
+    week_starts: npt.NDArray[np.int64],
+    means: npt.NDArray[np.float64],
+    goal: FitnessGoal,
+    weekly_stats: Mapping[str, Sequence[float | int | None]] | None = None,
+) -> list[WeeklyAggregateEntry]:
+    avg_weight = np.round(means, 2)
+
+    # The first week is the reference point so it has no change
+    is_reference_week = np.zeros(len(avg_weight), dtype=np.bool_)
+    is_reference_week[0] = True
+    weight_change, weight_change_prc, net_calories = calculate_weekly_changes(
+        avg_weight, is_reference_week
+    )
+
+    return to_weekly_entries(
+        week_starts.tolist(),
+        avg_weight.tolist(),
+        weight_change.tolist(),
+        weight_change_prc.tolist(),
+        net_calories.tolist(),
+        calculate_results(weight_change, goal),
+        weekly_stats,
+    )
+
+
+def calculate_weekly_changes(
+    avg_weight: npt.NDArray[np.float64],
+    is_reference_week: npt.NDArray[np.bool_],
+    period_days: npt.NDArray[np.int64] | int = 7,
+    previous_avg_weight: npt.NDArray[np.float64] | None = None,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], npt.NDArray[np.int64]]:
+    """
+    Weight change, % change and estimated net calories of each week
+    compared to the previous one. Reference weeks have no change.
+    Net calories are daily averages, so changes over periods
+    other than weeks are scaled by the period length
+    """
+    if previous_avg_weight is None:
+        previous_avg_weight = np.empty_like(avg_weight)
+        previous_avg_weight[0] = avg_weight[0]
+        previous_avg_weight[1:] = avg_weight[:-1]
+
+    weight_change = np.where(
+        is_reference_week, 0.0, np.round(avg_weight - previous_avg_weight, 2)
+    )
+    weight_change_prc = np.where(
+        is_reference_week,
+        0.0,
+        np.round(weight_change / previous_avg_weight * 100, 2),
+    )
+    net_calories = np.round(
+        weight_change * 500 / 0.45 * (7 / np.asarray(period_days)), 0
+    ).astype(np.int64)
+
+    return weight_change, weight_change_prc, net_calories
+
+
+def to_weekly_entries(
+    week_starts: list[int],
+    avg_weight: list[float],
+    weight_change: list[float],
+    weight_change_prc: list[float],
+    net_calories: list[int],
+    results: list[Result],
+    weekly_stats: Mapping[str, Sequence[float | int | None]] | None = None,
+) -> list[WeeklyAggregateEntry]:
+    # Statistics are only set when requested, so they stay out of the payload
+    stat_fields: list[dict[str, float | int | None]] = (
+        [
+            dict(zip(weekly_stats, values, strict=True))
+            for values in zip(*weekly_stats.values(), strict=True)
+        ]
+        if weekly_stats
+        else [{}] * len(week_starts)
+    )
+
+    # Values are calculated by the engine so model validation is skipped
+    return [
+        WeeklyAggregateEntry.model_construct(
+            week_start=dt.date.fromordinal(week_start),
+            avg_weight=avg,
+            weight_change=change,
+            weight_change_prc=change_prc,
+            net_calories=calories,
+            result=result,
+            **week_stats,
+        )
+        for week_start, avg, change, change_prc, calories, result, week_stats in zip(
+            week_starts,
+            avg_weight,
+            weight_change,
+            weight_change_prc,
+            net_calories,
+            results,
+            stat_fields,
+            strict=True,
+        )
+    ]
+
+
+def get_progress_reports(
+    entries: pd.DataFrame, goal: FitnessGoal
+) -> dict[UUID, ProgressReport]:
+    """
+    Weekly aggregates and summary metrics of many users at once.
+    Takes a frame with user_id, entry_date and weight columns and groups it
+    by user and week in one pass instead of one data frame per user.
+    Same output as get_weekly_aggregates and get_summary for each user
+    """
+    if entries.empty:
+        return {}
+
+    user_codes, user_ids = pd.factorize(entries["user_id"])
+    day_ordinals = (
+        pd.to_datetime(entries["entry_date"])
+        .to_numpy(dtype="datetime64[D]")
+        .astype(np.int64)
+        + UNIX_EPOCH_ORDINAL
+    )
+    weights = entries["weight"].to_numpy(dtype=np.float64)
+
+    # Same Monday-start week binning as bucket_daily_weights
+    week_index = (day_ordinals - 1) // 7
+    first_week = int(week_index.min())
+    weeks_span = int(week_index.max()) - first_week + 1
+
+    # One key per (user, week) pair. Sorted keys order the weeks within each user
+    group_keys = user_codes.astype(np.int64) * weeks_span + (week_index - first_week)
+    unique_keys, means = get_group_means(group_keys, day_ordinals, weights)
+
+    week_users = unique_keys // weeks_span
+    week_starts = (unique_keys % weeks_span + first_week) * 7 + 1
+    avg_weight = np.round(means, 2)
+
+    # First week of each user is the reference point for the following weeks
+    is_reference_week = np.ones(len(unique_keys), dtype=np.bool_)
+    is_reference_week[1:] = week_users[1:] != week_users[:-1]
+    weight_change, weight_change_prc, net_calories = calculate_weekly_changes(
+        avg_weight, is_reference_week
+    )
+    results = calculate_results(weight_change, goal)
+
+    # Summary metrics exclude the reference week, same as get_summary
+    users_count = len(user_ids)
+    compared_weeks = np.bincount(
+        week_users, weights=~is_reference_week, minlength=users_count
+    )
+    total_change = np.bincount(week_users, weights=weight_change, minlength=users_count)
+    total_change_prc = np.bincount(
+        week_users, weights=weight_change_prc, minlength=users_count
+    )
+    total_net_calories = np.bincount(
+        week_users, weights=net_calories, minlength=users_count
+    )
+    divisor = np.maximum(compared_weeks, 1)
+    avg_change = np.round(total_change / divisor, 2)
+    avg_change_prc = np.round(total_change_prc / divisor, 2)
+    avg_net_calories = np.trunc(total_net_calories / divisor).astype(np.int64)
+    total_change = np.round(total_change, 2)
+
+    # Each user's weeks are a contiguous slice of the sorted weeks
+    user_starts = np.flatnonzero(is_reference_week).tolist()
+    user_ends = [*user_starts[1:], len(unique_keys)]
+
+    week_starts_list = week_starts.tolist()
+    avg_weight_list = avg_weight.tolist()
+    weight_change_list = weight_change.tolist()
+    weight_change_prc_list = weight_change_prc.tolist()
+    net_calories_list = net_calories.tolist()
+
+    reports: dict[UUID, ProgressReport] = {}
+    for user_code, user_id in enumerate(user_ids):
+        start, end = user_starts[user_code], user_ends[user_code]
+        weekly_data = to_weekly_entries(
+            week_starts_list[start:end],
+            avg_weight_list[start:end],
+            weight_change_list[start:end],
+            weight_change_prc_list[start:end],
+            net_calories_list[start:end],
+            results[start:end],
+        )
+        metrics = ProgressMetrics.model_construct(
+            total_change=float(total_change[user_code]),
+            avg_change=float(avg_change[user_code]),
+            avg_change_prc=float(avg_change_prc[user_code]),
+            avg_net_calories=int(avg_net_calories[user_code]),
+        )
+        reports[user_id] = ProgressReport.model_construct(
+            weekly_data=weekly_data, metrics=metrics
+        )
+
+    return reports
+
+
+def fit_weekly_trend(
+    weekly_entries: Sequence[WeeklyAggregateEntry],
+    window_weeks: int = DEFAULT_FORECAST_WINDOW_WEEKS,
+) -> WeeklyTrendFit | None:
+    return fit_trend_lines(*get_trend_arrays([weekly_entries], window_weeks))[0]
+
+
+def fit_weekly_trends(
+    weekly_entries_by_user: Mapping[UUID, Sequence[WeeklyAggregateEntry]],
+    window_weeks: int = DEFAULT_FORECAST_WINDOW_WEEKS,
+) -> dict[UUID, WeeklyTrendFit | None]:
+    """
+    Least-squares line through the average weights of each user's last N weeks.
+    Users are rows of padded matrices, so all lines are fitted in one pass.
+    Users with less than 2 weeks get no fit
+    """
+    user_ids = list(weekly_entries_by_user)
+    if not user_ids:
+        return {}
+
+    trend_arrays = get_trend_arrays(weekly_entries_by_user.values(), window_weeks)
+    return dict(zip(user_ids, fit_trend_lines(*trend_arrays), strict=True))
+
+
+def get_trend_arrays(
+    weekly_entries_rows: Collection[Sequence[WeeklyAggregateEntry]], window_weeks: int
+) -> tuple[
+    npt.NDArray[np.float64],
+    npt.NDArray[np.float64],
+    npt.NDArray[np.bool_],
+    list[dt.date | None],
+]:
+    """
+    Week offsets and average weights of the last N weeks of each row, padded
+    to the window and marked in the mask, and the last week start of each row
+    """
+    weeks_x = np.zeros((len(weekly_entries_rows), window_weeks), dtype=np.float64)
+    weights = np.zeros((len(weekly_entries_rows), window_weeks), dtype=np.float64)
+    mask = np.zeros((len(weekly_entries_rows), window_weeks), dtype=np.bool_)
+    last_week_starts: list[dt.date | None] = []
+
+    for row, weekly_entries in enumerate(weekly_entries_rows):
+        window = sorted(weekly_entries, key=lambda week: week.week_start)[
+            -window_weeks:
+        ]
+        if not window:
+            last_week_starts.append(None)
+            continue
+
+        last_week_start = window[-1].week_start
+        last_week_starts.append(last_week_start)
+        # Weeks before the last one get negative x, missing weeks leave gaps
+        weeks_x[row, : len(window)] = [
+            (week.week_start - last_week_start).days / 7 for week in window
+        ]
+        weights[row, : len(window)] = [week.avg_weight for week in window]
+        mask[row, : len(window)] = True
+
+    return weeks_x, weights, mask, last_week_starts
+
+
+def fit_trend_lines(
+    weeks_x: npt.NDArray[np.float64],
+    weights: npt.NDArray[np.float64],
+    mask: npt.NDArray[np.bool_],
+    last_week_starts: Sequence[dt.date | None],
+) -> list[WeeklyTrendFit | None]:
+    """
+    Least-squares line through each row of the week offset and weight matrices,
+    mask marks the filled cells. Rows with less than 2 weeks get no fit
+    """
+    counts = mask.sum(axis=1)
+    sum_x = np.where(mask, weeks_x, 0).sum(axis=1)
+    sum_y = np.where(mask, weights, 0).sum(axis=1)
+    sum_xx = np.where(mask, weeks_x**2, 0).sum(axis=1)
+    sum_xy = np.where(mask, weeks_x * weights, 0).sum(axis=1)
+
+    has_fit = counts >= 2
+    safe_counts = np.maximum(counts, 1)
+    x_variance = sum_xx - sum_x**2 / safe_counts
+    has_fit &= x_variance > 0
+    safe_x_variance = np.where(has_fit, x_variance, 1.0)
+
+    slope = (sum_xy - sum_x * sum_y / safe_counts) / safe_x_variance
+    intercept = (sum_y - slope * sum_x) / safe_counts
+
+    residuals = np.where(
+        mask, weights - (intercept[:, np.newaxis] + slope[:, np.newaxis] * weeks_x), 0
+    )
+    # Standard error needs at least one degree of freedom (3 weeks)
+    has_error = has_fit & (counts > 2)
+    residual_variance = (residuals**2).sum(axis=1) / np.maximum(counts - 2, 1)
+    slope_std_error = np.sqrt(residual_variance / safe_x_variance)
+
+    fits: list[WeeklyTrendFit | None] = []
+    for row, fit_last_week_start in enumerate(last_week_starts):
+        if not has_fit[row] or fit_last_week_start is None:
+            fits.append(None)
+            continue
+
+        fits.append(
+            WeeklyTrendFit.model_construct(
+                last_week_start=fit_last_week_start,
+                intercept=float(intercept[row]),
+                slope=float(slope[row]),
+                slope_std_error=(
+                    float(slope_std_error[row]) if has_error[row] else None
+                ),
+                weeks_count=int(counts[row]),
+            )
+        )
+
+    return fits
+
+
+def get_forecast(fit: WeeklyTrendFit, target_weight: float) -> WeightForecast:
+    """
+    Project when the fitted line reaches the target weight.
+    The target date range comes from the confidence interval of the slope
+    """
+    weekly_change_low = weekly_change_high = None
+    earliest_target_date = latest_target_date = None
+    target_date = project_target_date(fit, target_weight, fit.slope)
+
+    if fit.slope_std_error is not None:
+        margin = FORECAST_CONFIDENCE_Z * fit.slope_std_error
+        weekly_change_low = fit.slope - margin
+        weekly_change_high = fit.slope + margin
+        bound_dates = [
+            project_target_date(fit, target_weight, slope)
+            for slope in (weekly_change_low, weekly_change_high)
+        ]
+        reachable_dates = [date for date in bound_dates if date is not None]
+        if reachable_dates and target_date is not None:
+            earliest_target_date = min(reachable_dates)
+            # A bound moving away from the target never reaches it
+            if len(reachable_dates) == len(bound_dates):
+                latest_target_date = max(reachable_dates)
+
+    return WeightForecast(
+        target_weight=target_weight,
+        current_weight=round(fit.intercept, 2),
+        weekly_change=round(fit.slope, 2),
+        weekly_change_low=(
+            round(weekly_change_low, 2) if weekly_change_low is not None else None
+        ),
+        weekly_change_high=(
+            round(weekly_change_high, 2) if weekly_change_high is not None else None
+        ),
+        target_date=target_date,
+        earliest_target_date=earliest_target_date,
+        latest_target_date=latest_target_date,
+        weeks_count=fit.weeks_count,
+    )
+
+
+def get_forecasts(
+    weekly_entries_by_user: Mapping[UUID, Sequence[WeeklyAggregateEntry]],
+    target_weights: Mapping[UUID, float],
+    window_weeks: int = DEFAULT_FORECAST_WINDOW_WEEKS,
+) -> dict[UUID, WeightForecast | None]:
+    fits = fit_weekly_trends(weekly_entries_by_user, window_weeks)
+    return {
+        user_id: get_forecast(fit, target_weights[user_id])
+        if fit is not None and user_id in target_weights
+        else None
+        for user_id, fit in fits.items()
+    }
+
+
+def project_target_date(
+    fit: WeeklyTrendFit, target_weight: float, slope: float
+) -> dt.date | None:
+    if slope == 0:
+        return None
+
+    weeks_to_target = (target_weight - fit.intercept) / slope
+    if not 0 <= weeks_to_target <= MAX_FORECAST_WEEKS:
+        return None
+
+    return fit.last_week_start + dt.timedelta(days=round(weeks_to_target * 7))
+
+
 def get_summary(
     weekly_entries: list[WeeklyAggregateEntry],
 ) -> ProgressMetrics | None:
@@ -137,3 +1023,19 @@ def calculate_result(weight_change: float, goal: FitnessGoal) -> Result | None:
                 if abs(weight_change) <= MAINTAIN_ACCEPTABLE_CHANGE
                 else "negative"
             )
+
+
+def calculate_results(
+    weight_changes: npt.NDArray[np.float64], goal: FitnessGoal
+) -> list[Result]:
+    match goal:
+        case "lose":
+            positive = weight_changes < 0
+        case "gain":
+            positive = weight_changes > 0
+        case "maintain":
+            positive = np.abs(weight_changes) <= MAINTAIN_ACCEPTABLE_CHANGE
+        case _:
+            return [None] * len(weight_changes)
+
+    return cast(list[Result], np.where(positive, "positive", "negative").tolist())
@@ -0,0 +1,197 @@
+import datetime as dt
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, Literal, NamedTuple, cast
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from . import utils
+from .project_types import (
+    AggregationPeriod,
+    DataStorage,
+    FitnessGoal,
+    WeeklyStat,
+    WeekStart,
+)
+
+type AnalyticsKind = Literal[
+    "weekly-aggregates", "aggregates", "summary", "latest-entry", "forecast"
+]
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL_SECONDS = 300.0
+
+
+class AnalyticsQuery(NamedTuple):
+    kind: AnalyticsKind
+    user_id: UUID
+    goal: FitnessGoal | None = None
+    date_from: dt.date | None = None
+    date_to: dt.date | None = None
+    weeks_limit: int | None = None
+    period: AggregationPeriod | None = None
+    week_start: WeekStart | None = None
+    stats: tuple[WeeklyStat, ...] = ()
+    exclude_outliers: bool = False
+
+
+class AnalyticsCacheStats(BaseModel):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+# Cache key also holds the user's data version at the time of calculation
+type CacheKey = tuple[AnalyticsQuery, int]
+
+
+class AnalyticsCache:
+    """
+    Bounded LRU cache of analytics results with TTL expiry.
+    Every storage mutation bumps the user's data version, so results
+    calculated from older data are never returned again.
+    Results calculated within replica_lag_seconds of a change may come from
+    a replica without it, so they expire once that time has passed.
+    Cached values are shared between requests and must not be modified.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        replica_lag_seconds: float = 0.0,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.replica_lag_seconds = replica_lag_seconds
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[CacheKey, tuple[float, Any]] = OrderedDict()
+        self._data_versions: dict[UUID, int] = {}
+        self._recent_changes = utils.RecentChanges(replica_lag_seconds)
+        self._watched_storages: weakref.WeakSet[DataStorage] = weakref.WeakSet()
+        # Sync routes run in a thread pool
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AnalyticsCache":
+        return cls(
+            max_size=int(os.environ.get("ANALYTICS_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+            ttl_seconds=float(
+                os.environ.get("ANALYTICS_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS)
+            ),
+            replica_lag_seconds=utils.get_replica_lag_seconds(),
+        )
+
+    def watch(self, data_storage: DataStorage) -> None:
+        with self._lock:
+            if data_storage in self._watched_storages:
+                return
+            self._watched_storages.add(data_storage)
+
+        data_storage.add_mutation_listener(self.invalidate)
+
+    def get_data_version(self, user_id: UUID) -> int:
+        with self._lock:
+            return self._data_versions.get(user_id, 0)
+
+    def invalidate(self, user_id: UUID, changed_from: dt.date | None = None) -> None:
+        # Entries of older versions are unreachable and get evicted by LRU / TTL
+        now = self._clock()
+        with self._lock:
+            self._data_versions[user_id] = self._data_versions.get(user_id, 0) + 1
+            self._recent_changes.add(user_id, now)
+
+    def get_or_compute[T](
+        self,
+        query: AnalyticsQuery,
+        compute: Callable[[], T],
+        data_version: int | None = None,
+    ) -> T:
+        """
+        data_version: the user's data version the calculation is based on,
+        when its inputs were read before this call (default: current version)
+        """
+        if self.max_size <= 0:
+            return compute()
+
+        key, looked_up_at, cached = self._lookup(query, data_version)
+        if cached is not None:
+            return cast(T, cached[1])
+
+        # Computed outside of the lock so slow queries don't block other users
+        value = compute()
+        self._store(key, value, looked_up_at)
+        return value
+
+    async def get_or_compute_async[T](
+        self,
+        query: AnalyticsQuery,
+        compute: Callable[[], Awaitable[T]],
+        data_version: int | None = None,
+    ) -> T:
+        if self.max_size <= 0:
+            return await compute()
+
+        key, looked_up_at, cached = self._lookup(query, data_version)
+        if cached is not None:
+            return cast(T, cached[1])
+
+        value = await compute()
+        self._store(key, value, looked_up_at)
+        return value
+
+    def _lookup(
+        self, query: AnalyticsQuery, data_version: int | None = None
+    ) -> tuple[CacheKey, float, tuple[float, Any] | None]:
+        now = self._clock()
+        with self._lock:
+            if data_version is None:
+                data_version = self._data_versions.get(query.user_id, 0)
+            key: CacheKey = (query, data_version)
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, now, cached
+
+            if cached is not None:
+                del self._entries[key]
+            self.misses += 1
+            return key, now, None
+
+    def _store(self, key: CacheKey, value: Any, looked_up_at: float) -> None:
+        query, data_version = key
+        with self._lock:
+            # Calculated from data changed since, so never returned again
+            if data_version != self._data_versions.get(query.user_id, 0):
+                return
+            expires_at = self._clock() + self.ttl_seconds
+            changed_at = self._recent_changes.get(query.user_id, looked_up_at)
+            if changed_at is not None:
+                expires_at = min(expires_at, changed_at + self.replica_lag_seconds)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> AnalyticsCacheStats:
+        with self._lock:
+            return AnalyticsCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                size=len(self._entries),
+                max_size=self.max_size,
+            )
@@ -1,7 +1,9 @@
+import base64
+import binascii
 import datetime as dt
 import logging
 import os
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
 from typing import (
     Annotated,
     cast,
@@ -14,37 +16,65 @@ from fastapi import (
     HTTPException,
     Query,
     Request,
+    Response,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from google.oauth2.credentials import Credentials
 from pydantic import BaseModel, field_validator
 
 from . import analytics, utils
+from .analytics_cache import AnalyticsCache, AnalyticsCacheStats, AnalyticsQuery
+from .async_db_storage import AsyncDatabaseStorage
 from .data_integration import (
     DataIntegrationService,
     DataSyncError,
     SourceFetchError,
     SourceNoDataError,
 )
+from .db_pool import DBPoolStats
+from .db_storage import DatabaseStorage
 from .demo import DemoDataSourceClient
 from .google_fit import GoogleFitAuth, GoogleFitClient
 from .project_types import (
+    AggregationPeriod,
+    AsyncDataStorage,
     DataSourceClient,
     DataSourceName,
     DataStorage,
     DuplicateEntryError,
     EntryNotFoundError,
     FitnessGoal,
+    PeriodAggregateEntry,
     ProgressSummary,
+    TrendPoint,
     WeeklyAggregateEntry,
+    WeeklyStat,
+    WeekStart,
     WeightEntry,
+    WeightForecast,
+    WeightSeries,
 )
+from .trend import TrendTracker
 
 
 class WeeklyAggregateResponse(BaseModel):
     weekly_data: list[WeeklyAggregateEntry]
     goal: FitnessGoal
+    outliers: list[WeightEntry] | None = None
+
+
+class PeriodAggregateResponse(BaseModel):
+    data: list[PeriodAggregateEntry]
+    period: AggregationPeriod
+    week_start: WeekStart
+    goal: FitnessGoal
+
+
+class TrendResponse(BaseModel):
+    trend_data: list[TrendPoint]
+    smoothing: float
 
 
 class DataSyncRequest(BaseModel):
@@ -88,6 +118,9 @@ class NoCredentialsError(Exception):
 MFP_SOURCE_NAME = "mfp"
 GFIT_SOURCE_NAME = "gfit"
 
+MAX_DAILY_ENTRIES_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 router_v1 = APIRouter(prefix="/api/v1", tags=["v1"])
 
 logger = logging.getLogger(__name__)
@@ -99,6 +132,14 @@ def get_data_storage(request: Request) -> DataStorage:
     return cast(DataStorage, request.app.state.data_storage)
 
 
+def get_async_data_storage(request: Request) -> AsyncDataStorage | None:
+    # Only set up with ASYNC_DB_READS, otherwise reads use the sync storage
+    return cast(
+        AsyncDataStorage | None,
+        getattr(request.app.state, "async_data_storage", None),
+    )
+
+
 def get_data_source_client(
     request: Request, source_name: DataSourceName, user_id: UUID
 ) -> DataSourceClient:
@@ -124,8 +165,13 @@ def get_data_source_client(
 
 def get_current_user(
     request: Request,
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(jwt_authentication)],
+    credentials: Annotated[
+        HTTPAuthorizationCredentials | None, Depends(jwt_authentication)
+    ],
 ) -> UUID:
+    # No credentials without an Authorization header, as auto_error is disabled
+    if credentials is None:
+        raise HTTPException(401, "Authentication failed")
     jwt_token = credentials.credentials
     supabase_client = request.app.state.supabase
 
@@ -152,45 +198,345 @@ def is_demo_user(user_id: UUID) -> bool:
 
 
 DataStorageDependency = Annotated[DataStorage, Depends(get_data_storage)]
+AsyncDataStorageDependency = Annotated[
+    AsyncDataStorage | None, Depends(get_async_data_storage)
+]
+
+
+def get_analytics_cache(
+    request: Request, data_storage: DataStorageDependency
+) -> AnalyticsCache:
+    analytics_cache = getattr(request.app.state, "analytics_cache", None)
+    if analytics_cache is None:
+        # Without a cache set up at startup, results are calculated every time
+        return AnalyticsCache(max_size=0)
+
+    analytics_cache = cast(AnalyticsCache, analytics_cache)
+    # Storage may be swapped through dependency overrides
+    analytics_cache.watch(data_storage)
+    return analytics_cache
+
+
+AnalyticsCacheDependency = Annotated[AnalyticsCache, Depends(get_analytics_cache)]
+
+
+def get_trend_tracker(
+    request: Request, data_storage: DataStorageDependency
+) -> TrendTracker:
+    trend_tracker = getattr(request.app.state, "trend_tracker", None)
+    if trend_tracker is None:
+        trend_tracker = TrendTracker()
+        request.app.state.trend_tracker = trend_tracker
+
+    trend_tracker = cast(TrendTracker, trend_tracker)
+    trend_tracker.watch(data_storage)
+    return trend_tracker
+
+
+TrendTrackerDependency = Annotated[TrendTracker, Depends(get_trend_tracker)]
 UserDependency = Annotated[UUID, Depends(get_current_user)]
 
 
+def get_admin_user(request: Request, user_id: UserDependency) -> UUID:
+    # Operators listed in ADMIN_USER_IDS, read once on startup
+    admin_user_ids = cast(
+        frozenset[UUID], getattr(request.app.state, "admin_user_ids", frozenset())
+    )
+    if user_id not in admin_user_ids:
+        logger.warning(f"Metrics request denied for user: {user_id}")
+        raise HTTPException(403, "Not allowed")
+    return user_id
+
+
+# Process-wide state of all users, only for operators
+metrics_router = APIRouter(
+    prefix="/api/v1/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(get_admin_user)],
+)
+
+
+def get_filtered_weight_series(
+    data_storage: DataStorage,
+    user_id: UUID,
+    date_from: dt.date | None = None,
+    date_to: dt.date | None = None,
+    weeks_limit: int | None = None,
+) -> WeightSeries:
+    if weeks_limit is None:
+        return data_storage.get_weight_series(user_id, date_from, date_to)
+
+    # Only the N + 1 most recent weeks with entries are aggregated,
+    # so first try reading just the last N + 1 calendar weeks
+    latest_entries = data_storage.get_weight_entries(
+        user_id, date_from, date_to, order="desc", limit=1
+    )
+    if not latest_entries:
+        return WeightSeries(user_id)
+
+    window_start = utils.get_week_start(latest_entries[0].entry_date) - dt.timedelta(
+        weeks=weeks_limit
+    )
+    if date_from is None or date_from < window_start:
+        weight_series = data_storage.get_weight_series(user_id, window_start, date_to)
+        weeks_count = len({utils.get_week_start(day) for day, _ in weight_series})
+        if weeks_count > weeks_limit:
+            return weight_series
+
+    # Weeks without entries in the window, so older weeks are needed as well
+    return data_storage.get_weight_series(user_id, date_from, date_to)
+
+
 def get_filtered_daily_entries(
     data_storage: DataStorage,
     user_id: UUID,
     date_from: dt.date | None = None,
     date_to: dt.date | None = None,
+    limit: int | None = None,
 ) -> list[WeightEntry]:
-    filtered_daily_entries = daily_entries = data_storage.get_weight_entries(user_id)
+    return data_storage.get_weight_entries(user_id, date_from, date_to, limit=limit)
 
-    if date_from is not None or date_to is not None:
-        filtered_daily_entries = utils.filter_daily_entries(
-            daily_entries, date_from, date_to
-        )
 
-    return filtered_daily_entries
+def encode_entries_cursor(last_entry_date: dt.date) -> str:
+    return base64.urlsafe_b64encode(last_entry_date.isoformat().encode()).decode()
+
+
+def decode_entries_cursor(cursor: str) -> dt.date:
+    try:
+        return dt.date.fromisoformat(base64.urlsafe_b64decode(cursor).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
 def get_filtered_weekly_entries(
-    daily_entries: Sequence[WeightEntry],
+    daily_entries: Sequence[WeightEntry] | WeightSeries,
+    goal: FitnessGoal,
+    weeks_limit: int | None,
+    stats: tuple[WeeklyStat, ...] = (),
+) -> list[WeeklyAggregateEntry]:
+    weekly_entries = analytics.get_weekly_aggregates(daily_entries, goal, stats)
+    return limit_weekly_entries(weekly_entries, weeks_limit)
+
+
+def get_weekly_entries(
+    data_storage: DataStorage,
+    user_id: UUID,
     goal: FitnessGoal,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
     weeks_limit: int | None,
+    stats: tuple[WeeklyStat, ...] = (),
 ) -> list[WeeklyAggregateEntry]:
-    weekly_entries = analytics.get_weekly_aggregates(daily_entries, goal)
-    if not weekly_entries:
+    # Rollups and SQL averages have no daily values, so statistics need daily entries
+    if not stats and can_use_weekly_rollups(data_storage, date_from, date_to):
+        return get_weekly_entries_from_rollups(
+            cast(DatabaseStorage, data_storage),
+            user_id,
+            goal,
+            date_from,
+            date_to,
+            weeks_limit,
+        )
+
+    if not stats and isinstance(data_storage, DatabaseStorage):
+        return get_weekly_entries_from_database(
+            data_storage, user_id, goal, date_from, date_to, weeks_limit
+        )
+
+    weight_series = get_filtered_weight_series(
+        data_storage, user_id, date_from, date_to, weeks_limit
+    )
+    return get_filtered_weekly_entries(weight_series, goal, weeks_limit, stats)
+
+
+def get_cached_weekly_entries(
+    analytics_cache: AnalyticsCache,
+    data_storage: DataStorage,
+    user_id: UUID,
+    goal: FitnessGoal,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+    weeks_limit: int | None,
+    stats: tuple[WeeklyStat, ...] = (),
+    data_version: int | None = None,
+) -> list[WeeklyAggregateEntry]:
+    return analytics_cache.get_or_compute(
+        AnalyticsQuery(
+            "weekly-aggregates",
+            user_id,
+            goal,
+            date_from,
+            date_to,
+            weeks_limit,
+            stats=stats,
+        ),
+        lambda: get_weekly_entries(
+            data_storage, user_id, goal, date_from, date_to, weeks_limit, stats
+        ),
+        data_version,
+    )
+
+
+async def get_weekly_entries_async(
+    async_storage: AsyncDataStorage,
+    user_id: UUID,
+    goal: FitnessGoal,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+    weeks_limit: int | None,
+) -> list[WeeklyAggregateEntry]:
+    if not isinstance(async_storage, AsyncDatabaseStorage):
+        weight_series = await async_storage.get_weight_series(
+            user_id, date_from, date_to
+        )
+        return get_filtered_weekly_entries(weight_series, goal, weeks_limit)
+
+    if covers_whole_weeks(date_from, date_to):
+        weekly_rollups = await async_storage.get_weekly_rollups(
+            user_id,
+            week_from=date_from,
+            week_to=utils.get_week_start(date_to) if date_to else None,
+        )
+        weekly_entries = analytics.get_weekly_aggregates_from_rollups(
+            weekly_rollups, goal
+        )
+    else:
+        weekly_averages = await async_storage.aggregate_weekly(
+            user_id, date_from, date_to, weeks_limit + 1 if weeks_limit else None
+        )
+        weekly_entries = analytics.get_weekly_aggregates_from_averages(
+            weekly_averages, goal
+        )
+    return limit_weekly_entries(weekly_entries, weeks_limit)
+
+
+async def get_cached_weekly_entries_async(
+    analytics_cache: AnalyticsCache,
+    async_storage: AsyncDataStorage,
+    user_id: UUID,
+    goal: FitnessGoal,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+    weeks_limit: int | None,
+    data_version: int | None = None,
+) -> list[WeeklyAggregateEntry]:
+    # Same cache entries as the sync reads
+    return await analytics_cache.get_or_compute_async(
+        AnalyticsQuery(
+            "weekly-aggregates", user_id, goal, date_from, date_to, weeks_limit
+        ),
+        lambda: get_weekly_entries_async(
+            async_storage, user_id, goal, date_from, date_to, weeks_limit
+        ),
+        data_version,
+    )
+
+
+def get_weekly_entries_without_outliers(
+    data_storage: DataStorage,
+    user_id: UUID,
+    goal: FitnessGoal,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+    weeks_limit: int | None,
+    stats: tuple[WeeklyStat, ...] = (),
+) -> tuple[list[WeeklyAggregateEntry], list[WeightEntry]]:
+    weight_series = get_filtered_weight_series(
+        data_storage, user_id, date_from, date_to, weeks_limit
+    )
+    regular_series, outlier_series = analytics.split_outliers(weight_series)
+    weekly_entries = get_filtered_weekly_entries(
+        regular_series, goal, weeks_limit, stats
+    )
+
+    # Only outliers within the returned weeks are reported
+    first_week_start = weekly_entries[-1].week_start if weekly_entries else None
+    return weekly_entries, outlier_series.between(first_week_start).to_entries()
+
+
+def can_use_weekly_rollups(
+    data_storage: DataStorage,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+) -> bool:
+    return isinstance(data_storage, DatabaseStorage) and covers_whole_weeks(
+        date_from, date_to
+    )
+
+
+def covers_whole_weeks(date_from: dt.date | None, date_to: dt.date | None) -> bool:
+    # Rollups can only serve date ranges made of whole weeks
+    return (date_from is None or date_from.weekday() == 0) and (
+        date_to is None or date_to.weekday() == 6
+    )
+
+
+def get_weekly_entries_from_rollups(
+    data_storage: DatabaseStorage,
+    user_id: UUID,
+    goal: FitnessGoal,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+    weeks_limit: int | None,
+) -> list[WeeklyAggregateEntry]:
+    weekly_rollups = data_storage.get_weekly_rollups(
+        user_id,
+        week_from=date_from,
+        week_to=utils.get_week_start(date_to) if date_to else None,
+    )
+    weekly_entries = analytics.get_weekly_aggregates_from_rollups(weekly_rollups, goal)
+    return limit_weekly_entries(weekly_entries, weeks_limit)
+
+
+def get_weekly_entries_from_database(
+    data_storage: DatabaseStorage,
+    user_id: UUID,
+    goal: FitnessGoal,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+    weeks_limit: int | None,
+) -> list[WeeklyAggregateEntry]:
+    weekly_averages = data_storage.aggregate_weekly(
+        user_id,
+        date_from,
+        date_to,
+        # One more week as the reference point
+        weeks_limit + 1 if weeks_limit else None,
+    )
+    weekly_entries = analytics.get_weekly_aggregates_from_averages(
+        weekly_averages, goal
+    )
+    return limit_weekly_entries(weekly_entries, weeks_limit)
+
+
+def limit_weekly_entries(
+    weekly_entries: list[WeeklyAggregateEntry],
+    weeks_limit: int | None,
+) -> list[WeeklyAggregateEntry]:
+    return limit_aggregate_entries(
+        weekly_entries, weeks_limit, lambda week: week.week_start
+    )
+
+
+def limit_aggregate_entries[T: (WeeklyAggregateEntry, PeriodAggregateEntry)](
+    aggregate_entries: list[T],
+    limit: int | None,
+    get_start: Callable[[T], dt.date],
+) -> list[T]:
+    if not aggregate_entries:
         return []
 
-    # Sort the weeks starting from the  most recent
+    # Sort the periods starting from the  most recent
     # so we can limit the return to N most recent:
-    weekly_entries.sort(key=lambda week: week.week_start, reverse=True)
+    aggregate_entries.sort(key=get_start, reverse=True)
 
-    if weeks_limit:
-        # Keeping N + 1 weeks because the last week
+    if limit:
+        # Keeping N + 1 periods because the last period
         # is used as reference point to compare against, as starting point
-        weekly_entries = weekly_entries[0 : weeks_limit + 1]
+        aggregate_entries = aggregate_entries[0 : limit + 1]
 
-    last_week = weekly_entries[-1]
-    reference_week = last_week.model_copy(
+    last_period = aggregate_entries[-1]
+    reference_period = last_period.model_copy(
         update={
             "weight_change": 0.0,
             "weight_change_prc": 0.0,
@@ -198,25 +544,82 @@ def get_filtered_weekly_entries(
             "result": None,
         }
     )
-    weekly_entries[-1] = reference_week
+    aggregate_entries[-1] = reference_period
+
+    return aggregate_entries
 
-    return weekly_entries
+
+def get_period_entries(
+    data_storage: DataStorage,
+    user_id: UUID,
+    goal: FitnessGoal,
+    period: AggregationPeriod,
+    week_start: WeekStart,
+    date_from: dt.date | None,
+    date_to: dt.date | None,
+    periods_limit: int | None,
+) -> list[PeriodAggregateEntry]:
+    weight_series = get_filtered_weight_series(
+        data_storage, user_id, date_from, date_to
+    )
+    period_entries = analytics.get_period_aggregates(
+        weight_series, goal, period, week_start
+    )
+    return limit_aggregate_entries(
+        period_entries, periods_limit, lambda entry: entry.period_start
+    )
 
 
+# With page_size, entries are returned in pages of ascending dates and
+# the X-Next-Cursor header holds the cursor of the next page, if any
 @router_v1.get("/daily-entries", response_model=list[WeightEntry])
-def get_daily_entries(
+async def get_daily_entries(
     user_id: UserDependency,
     data_storage: DataStorageDependency,
+    async_storage: AsyncDataStorageDependency,
+    response: Response,
     date_from: dt.date | None = None,
     date_to: dt.date | None = None,
+    page_size: Annotated[
+        int | None, Query(gt=0, le=MAX_DAILY_ENTRIES_PAGE_SIZE)
+    ] = None,
+    cursor: str | None = None,
 ) -> list[WeightEntry]:
     if date_from and date_to and date_from > date_to:
         raise HTTPException(
             status_code=422, detail="'Date To' must be after 'Date From'"
         )
-
+    if cursor is not None:
+        if page_size is None:
+            raise HTTPException(status_code=422, detail="'cursor' requires 'page_size'")
+        try:
+            # Keyset on entry_date, which is unique per user
+            next_date = decode_entries_cursor(cursor) + dt.timedelta(days=1)
+        except (ValueError, OverflowError) as e:
+            raise HTTPException(status_code=422, detail="Invalid cursor") from e
+        date_from = max(date_from or next_date, next_date)
+
+    # One extra entry tells whether there is a next page
+    limit = page_size + 1 if page_size is not None else None
     try:
-        body = get_filtered_daily_entries(data_storage, user_id, date_from, date_to)
+        if async_storage is not None:
+            body = await async_storage.get_weight_entries(
+                user_id, date_from, date_to, limit=limit
+            )
+        else:
+            body = await run_in_threadpool(
+                get_filtered_daily_entries,
+                data_storage,
+                user_id,
+                date_from,
+                date_to,
+                limit,
+            )
+        if page_size is not None and len(body) > page_size:
+            body = body[:page_size]
+            response.headers[NEXT_CURSOR_HEADER] = encode_entries_cursor(
+                body[-1].entry_date
+            )
         logger.info(f"Fetched {len(body)} daily weight entries")
         return body
     except Exception as e:
@@ -226,34 +629,93 @@ def get_daily_entries(
         ) from e
 
 
-@router_v1.get("/weekly-aggregates", response_model=WeeklyAggregateResponse)
-def get_weekly_aggregates(
+# Unset statistics fields are left out of the weekly entries
+@router_v1.get(
+    "/weekly-aggregates",
+    response_model=WeeklyAggregateResponse,
+    response_model_exclude_unset=True,
+)
+async def get_weekly_aggregates(
     data_storage: DataStorageDependency,
+    async_storage: AsyncDataStorageDependency,
     user_id: UserDependency,
+    analytics_cache: AnalyticsCacheDependency,
     date_from: dt.date | None = None,
     date_to: dt.date | None = None,
     weeks_limit: Annotated[int | None, Query(gt=0)] = None,
     goal: FitnessGoal | None = None,
+    stats: Annotated[list[WeeklyStat] | None, Query()] = None,
+    exclude_outliers: bool = False,
 ) -> WeeklyAggregateResponse:
     if date_from and date_to and date_from > date_to:
         raise HTTPException(
             status_code=422, detail="'Date To' must be after 'Date From'"
         )
     try:
-        daily_entries = get_filtered_daily_entries(
-            data_storage, user_id, date_from, date_to
-        )
         if not goal:
             goal = utils.DEFAULT_GOAL
 
-        weekly_entries: list[WeeklyAggregateEntry] = get_filtered_weekly_entries(
-            daily_entries, goal, weeks_limit
-        )
+        # Same statistics in any order share one cache entry
+        weekly_stats = tuple(sorted(set(stats or ())))
+
+        if exclude_outliers:
+            # Outliers are cached with the aggregates calculated without them
+            weekly_entries, outliers = await run_in_threadpool(
+                analytics_cache.get_or_compute,
+                AnalyticsQuery(
+                    "weekly-aggregates",
+                    user_id,
+                    goal,
+                    date_from,
+                    date_to,
+                    weeks_limit,
+                    stats=weekly_stats,
+                    exclude_outliers=True,
+                ),
+                lambda: get_weekly_entries_without_outliers(
+                    data_storage,
+                    user_id,
+                    goal,
+                    date_from,
+                    date_to,
+                    weeks_limit,
+                    weekly_stats,
+                ),
+            )
+            logger.info(f"Excluded {len(outliers)} outlier weight entries")
+            body = WeeklyAggregateResponse(
+                weekly_data=weekly_entries, goal=goal, outliers=outliers
+            )
+        elif async_storage is not None and not weekly_stats:
+            weekly_entries = await get_cached_weekly_entries_async(
+                analytics_cache,
+                async_storage,
+                user_id,
+                goal,
+                date_from,
+                date_to,
+                weeks_limit,
+            )
+            body = WeeklyAggregateResponse(weekly_data=weekly_entries, goal=goal)
+        else:
+            # Sync storage reads, and statistics that need daily values,
+            # run in the thread pool
+            weekly_entries = await run_in_threadpool(
+                get_cached_weekly_entries,
+                analytics_cache,
+                data_storage,
+                user_id,
+                goal,
+                date_from,
+                date_to,
+                weeks_limit,
+                weekly_stats,
+            )
+            body = WeeklyAggregateResponse(weekly_data=weekly_entries, goal=goal)
+
         logger.info(
             f"Calculated weekly weight aggregates for {len(weekly_entries)} + 1 weeks"
         )
-
-        body = WeeklyAggregateResponse(weekly_data=weekly_entries, goal=goal)
         return body
     except Exception as e:
         logger.exception("Calculating weekly aggregates failed")
@@ -262,31 +724,193 @@ def get_weekly_aggregates(
         ) from e
 
 
-@router_v1.get("/summary", response_model=ProgressSummary)
-def get_summary(
+@router_v1.get("/aggregates", response_model=PeriodAggregateResponse)
+def get_aggregates(
+    data_storage: DataStorageDependency,
+    user_id: UserDependency,
+    analytics_cache: AnalyticsCacheDependency,
+    period: AggregationPeriod = "week",
+    week_start: WeekStart = analytics.DEFAULT_WEEK_START,
+    date_from: dt.date | None = None,
+    date_to: dt.date | None = None,
+    periods_limit: Annotated[int | None, Query(gt=0)] = None,
+    goal: FitnessGoal | None = None,
+) -> PeriodAggregateResponse:
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=422, detail="'Date To' must be after 'Date From'"
+        )
+    try:
+        if not goal:
+            goal = utils.DEFAULT_GOAL
+
+        period_entries = analytics_cache.get_or_compute(
+            AnalyticsQuery(
+                "aggregates",
+                user_id,
+                goal,
+                date_from,
+                date_to,
+                periods_limit,
+                period,
+                week_start,
+            ),
+            lambda: get_period_entries(
+                data_storage,
+                user_id,
+                goal,
+                period,
+                week_start,
+                date_from,
+                date_to,
+                periods_limit,
+            ),
+        )
+        logger.info(
+            f"Calculated {period} weight aggregates for {len(period_entries)} periods"
+        )
+
+        return PeriodAggregateResponse(
+            data=period_entries, period=period, week_start=week_start, goal=goal
+        )
+    except Exception as e:
+        logger.exception("Calculating period aggregates failed")
+        raise HTTPException(
+            status_code=500, detail="Error while getting analytics data"
+        ) from e
+
+
+@router_v1.get("/trend", response_model=TrendResponse)
+def get_trend(
     user_id: UserDependency,
     data_storage: DataStorageDependency,
+    trend_tracker: TrendTrackerDependency,
     date_from: dt.date | None = None,
     date_to: dt.date | None = None,
-    weeks_limit: Annotated[int | None, Query(gt=0)] = None,
-) -> ProgressSummary:
+) -> TrendResponse:
     if date_from and date_to and date_from > date_to:
         raise HTTPException(
             status_code=422, detail="'Date To' must be after 'Date From'"
         )
 
     try:
-        daily_entries = get_filtered_daily_entries(
-            data_storage, user_id, date_from, date_to
+        trend_data = trend_tracker.get_trend(data_storage, user_id, date_from, date_to)
+        logger.info(f"Fetched weight trend of {len(trend_data)} daily entries")
+        return TrendResponse(trend_data=trend_data, smoothing=trend_tracker.smoothing)
+    except Exception as e:
+        logger.exception("Calculating weight trend failed")
+        raise HTTPException(
+            status_code=500, detail="Error while getting analytics data"
+        ) from e
+
+
+@router_v1.get("/forecast", response_model=(WeightForecast | None))
+def get_forecast(
+    user_id: UserDependency,
+    data_storage: DataStorageDependency,
+    analytics_cache: AnalyticsCacheDependency,
+    target_weight: Annotated[float, Query(gt=0)],
+    window_weeks: Annotated[
+        int, Query(ge=2, le=104)
+    ] = analytics.DEFAULT_FORECAST_WINDOW_WEEKS,
+) -> WeightForecast | None:
+    try:
+        # Only the fitted line is cached, projecting a target weight is cheap.
+        # The line and its weekly entries are cached under the same data version
+        data_version = analytics_cache.get_data_version(user_id)
+        trend_fit = analytics_cache.get_or_compute(
+            AnalyticsQuery("forecast", user_id, weeks_limit=window_weeks),
+            lambda: analytics.fit_weekly_trend(
+                get_cached_weekly_entries(
+                    analytics_cache,
+                    data_storage,
+                    user_id,
+                    utils.DEFAULT_GOAL,
+                    None,
+                    None,
+                    window_weeks,
+                    data_version=data_version,
+                ),
+                window_weeks,
+            ),
+            data_version,
+        )
+        if trend_fit is None:
+            logger.warning("Not enough weekly data for a weight forecast")
+            return None
+
+        forecast = analytics.get_forecast(trend_fit, target_weight)
+        logger.info(f"Weight forecast calculated: {forecast.model_dump()}")
+        return forecast
+    except Exception as e:
+        logger.exception("Calculating weight forecast failed")
+        raise HTTPException(
+            status_code=500, detail="Error while getting analytics data"
+        ) from e
+
+
+@router_v1.get(
+    "/summary", response_model=ProgressSummary, response_model_exclude_unset=True
+)
+async def get_summary(
+    user_id: UserDependency,
+    data_storage: DataStorageDependency,
+    async_storage: AsyncDataStorageDependency,
+    analytics_cache: AnalyticsCacheDependency,
+    date_from: dt.date | None = None,
+    date_to: dt.date | None = None,
+    weeks_limit: Annotated[int | None, Query(gt=0)] = None,
+) -> ProgressSummary:
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=422, detail="'Date To' must be after 'Date From'"
         )
 
-        weekly_entries = get_filtered_weekly_entries(
-            daily_entries, utils.DEFAULT_GOAL, weeks_limit
+    try:
+        # The metrics are calculated from the weekly entries, so both are cached
+        # under the data version read before the weekly entries
+        data_version = analytics_cache.get_data_version(user_id)
+        # Weekly entries are shared with the weekly aggregates of the default goal
+        if async_storage is not None:
+            weekly_entries = await get_cached_weekly_entries_async(
+                analytics_cache,
+                async_storage,
+                user_id,
+                utils.DEFAULT_GOAL,
+                date_from,
+                date_to,
+                weeks_limit,
+                data_version,
+            )
+        else:
+            weekly_entries = await run_in_threadpool(
+                get_cached_weekly_entries,
+                analytics_cache,
+                data_storage,
+                user_id,
+                utils.DEFAULT_GOAL,
+                date_from,
+                date_to,
+                weeks_limit,
+                data_version=data_version,
+            )
+        progress_metrics = analytics_cache.get_or_compute(
+            AnalyticsQuery(
+                "summary",
+                user_id,
+                utils.DEFAULT_GOAL,
+                date_from,
+                date_to,
+                weeks_limit,
+            ),
+            lambda: analytics.get_summary(weekly_entries),
+            data_version,
         )
-        progress_metrics = analytics.get_summary(weekly_entries)
         logger.info(
             f"Weight progress metrics calculated for {len(weekly_entries)} + 1 weeks"
         )
+        if not weekly_entries:
+            return ProgressSummary(metrics=None, latest_week=None)
 
         latest_week: WeeklyAggregateEntry = sorted(
             weekly_entries, key=lambda week: week.week_start, reverse=True
@@ -302,13 +926,24 @@ def get_summary(
 
 
 @router_v1.get("/latest-entry", response_model=(WeightEntry | None))
-def get_latest_entry(
+async def get_latest_entry(
     user_id: UserDependency,
     data_storage: DataStorageDependency,
+    async_storage: AsyncDataStorageDependency,
+    analytics_cache: AnalyticsCacheDependency,
 ) -> WeightEntry | None:
     try:
-        daily_entries = data_storage.get_weight_entries(user_id)
-        latest_daily_entry = utils.get_latest_daily_entry(daily_entries)
+        query = AnalyticsQuery("latest-entry", user_id)
+        if async_storage is not None:
+            latest_daily_entry = await analytics_cache.get_or_compute_async(
+                query, lambda: async_storage.get_latest_weight_entry(user_id)
+            )
+        else:
+            latest_daily_entry = await run_in_threadpool(
+                analytics_cache.get_or_compute,
+                query,
+                lambda: data_storage.get_latest_weight_entry(user_id),
+            )
         if latest_daily_entry:
             logger.info(
                 f"Latest weight entry fetched: {latest_daily_entry.model_dump()}"
@@ -450,3 +1085,19 @@ def delete_daily_entry(
 @router_v1.get("/healthz")
 def health_check() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@metrics_router.get("/analytics-cache", response_model=AnalyticsCacheStats)
+def get_analytics_cache_metrics(
+    analytics_cache: AnalyticsCacheDependency,
+) -> AnalyticsCacheStats:
+    return analytics_cache.stats()
+
+
+@metrics_router.get("/db-pool", response_model=(DBPoolStats | None))
+def get_db_pool_metrics(data_storage: DataStorageDependency) -> DBPoolStats | None:
+    # File storage has no connection pool
+    if not isinstance(data_storage, DatabaseStorage):
+        return None
+
+    return data_storage.pool_stats()
@@ -0,0 +1,159 @@
+import datetime as dt
+import logging
+import os
+from collections.abc import Callable
+from uuid import UUID
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .db_pool import get_pool_options_from_env
+from .db_storage import (
+    to_weekly_averages,
+    to_weight_entries,
+    weekly_averages_statement,
+    weekly_rollups_statement,
+    weight_entries_statement,
+)
+from .project_types import (
+    SortOrder,
+    WeeklyAverage,
+    WeeklyRollup,
+    WeightEntry,
+    WeightSeries,
+)
+
+logger = logging.getLogger(__name__)
+
+# asyncio drivers used in place of the sync DB_CONNECTION_STRING drivers
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_connection_string(connection_string: str) -> str:
+    url = make_url(connection_string)
+    async_driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if async_driver is None:
+        raise ValueError(f"No asyncio driver for {url.get_backend_name()} database")
+
+    return url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+class AsyncDatabaseStorage:
+    """
+    Reads weight data of DatabaseStorage tables with SQLAlchemy's asyncio engine,
+    so read routes don't block a thread pool thread while waiting on the database.
+    Reads go to the read replica when one is configured, except for users that
+    reads_primary (DatabaseStorage.reads_primary) sends to the primary
+    """
+
+    def __init__(
+        self,
+        connection_string: str | None = None,
+        read_connection_string: str | None = None,
+        reads_primary: Callable[[UUID], bool] | None = None,
+    ) -> None:
+        if connection_string is None:
+            connection_string = os.environ.get("ASYNC_DB_CONNECTION_STRING")
+        if connection_string is None:
+            sync_connection_string = os.environ.get("DB_CONNECTION_STRING")
+            if not sync_connection_string:
+                logger.error("Missing database connection string in environment")
+                raise Exception("Missing database connection string in environment")
+            connection_string = get_async_connection_string(sync_connection_string)
+
+        if read_connection_string is None:
+            read_connection_string = os.environ.get("ASYNC_DB_READ_CONNECTION_STRING")
+        if read_connection_string is None:
+            sync_read_connection_string = os.environ.get("DB_READ_CONNECTION_STRING")
+            if sync_read_connection_string:
+                read_connection_string = get_async_connection_string(
+                    sync_read_connection_string
+                )
+
+        # Tables are created by DatabaseStorage
+        self._engine = create_async_engine(
+            connection_string, **get_pool_options_from_env()
+        )
+        self._read_engine = (
+            create_async_engine(read_connection_string, **get_pool_options_from_env())
+            if read_connection_string
+            else self._engine
+        )
+        self._reads_primary = reads_primary
+
+    def _get_read_engine(self, user_id: UUID) -> AsyncEngine:
+        if self._reads_primary is not None and self._reads_primary(user_id):
+            return self._engine
+        return self._read_engine
+
+    async def get_weight_entries(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+        order: SortOrder = "asc",
+        limit: int | None = None,
+    ) -> list[WeightEntry]:
+        statement = weight_entries_statement(user_id, date_from, date_to, order, limit)
+        async with self._get_read_engine(user_id).connect() as connection:
+            return to_weight_entries(
+                user_id, (await connection.execute(statement)).tuples()
+            )
+
+    async def get_weight_series(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+    ) -> WeightSeries:
+        statement = weight_entries_statement(user_id, date_from, date_to)
+        async with self._get_read_engine(user_id).connect() as connection:
+            return WeightSeries.from_rows(
+                user_id, (await connection.execute(statement)).tuples()
+            )
+
+    async def get_latest_weight_entry(self, user_id: UUID) -> WeightEntry | None:
+        statement = weight_entries_statement(user_id, order="desc", limit=1)
+        async with self._get_read_engine(user_id).connect() as connection:
+            entries = to_weight_entries(
+                user_id, (await connection.execute(statement)).tuples()
+            )
+            return entries[0] if entries else None
+
+    async def get_weekly_rollups(
+        self,
+        user_id: UUID,
+        week_from: dt.date | None = None,
+        week_to: dt.date | None = None,
+    ) -> list[WeeklyRollup]:
+        statement = weekly_rollups_statement(user_id, week_from, week_to)
+        async with AsyncSession(self._get_read_engine(user_id)) as session:
+            results = await session.exec(statement)
+            return [
+                WeeklyRollup.model_validate(row, from_attributes=True)
+                for row in results.all()
+            ]
+
+    async def aggregate_weekly(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+        weeks_limit: int | None = None,
+    ) -> list[WeeklyAverage]:
+        engine = self._get_read_engine(user_id)
+        statement = weekly_averages_statement(
+            engine.dialect.name, user_id, date_from, date_to, weeks_limit
+        )
+        async with AsyncSession(engine) as session:
+            results = await session.exec(statement)
+            return to_weekly_averages(results.all())
+
+    async def close_connection(self) -> None:
+        if self._read_engine is not self._engine:
+            await self._read_engine.dispose()
+        await self._engine.dispose()
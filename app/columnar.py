@@ -0,0 +1,85 @@
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+# File header: magic and number of entries, followed by the day ordinal column
+# (int32) and the weight column (float64, 8-byte aligned), all little-endian
+MAGIC = b"WTC1"
+HEADER = struct.Struct("<4sI")
+DAY_ORDINAL_DTYPE = np.dtype("<i4")
+WEIGHT_DTYPE = np.dtype("<f8")
+
+type Columns = tuple[npt.NDArray[np.int32], npt.NDArray[np.float64]]
+
+
+class ColumnarFormatError(ValueError):
+    pass
+
+
+def _get_weights_offset(entries_count: int) -> int:
+    day_ordinals_end = HEADER.size + entries_count * DAY_ORDINAL_DTYPE.itemsize
+    return -(-day_ordinals_end // WEIGHT_DTYPE.itemsize) * WEIGHT_DTYPE.itemsize
+
+
+def read_columns(path: Path) -> Columns:
+    """
+    Read a columnar file into memory. The returned columns are read-only views
+    of the read bytes, sorted by day ordinal. Unlike a memory map, no file
+    descriptor stays open for each resident user
+    """
+    data = np.fromfile(path, dtype=np.uint8)
+    data.flags.writeable = False
+    if len(data) < HEADER.size:
+        raise ColumnarFormatError(f"Truncated columnar file header: {path}")
+    magic, entries_count = HEADER.unpack(data[: HEADER.size].tobytes())
+    weights_offset = _get_weights_offset(entries_count)
+    weights_end = weights_offset + entries_count * WEIGHT_DTYPE.itemsize
+    if magic != MAGIC or len(data) != weights_end:
+        raise ColumnarFormatError(f"Invalid columnar file: {path}")
+
+    day_ordinals = data[
+        HEADER.size : HEADER.size + entries_count * DAY_ORDINAL_DTYPE.itemsize
+    ].view(DAY_ORDINAL_DTYPE)
+    weights = data[weights_offset:weights_end].view(WEIGHT_DTYPE)
+    return day_ordinals, weights
+
+
+def write_columns(
+    path: Path, day_ordinals: npt.ArrayLike, weights: npt.ArrayLike
+) -> None:
+    day_ordinals_column = np.asarray(day_ordinals, dtype=DAY_ORDINAL_DTYPE)
+    weights_column = np.asarray(weights, dtype=WEIGHT_DTYPE)
+    if len(day_ordinals_column) != len(weights_column):
+        raise ValueError("Day ordinals and weights must have the same length")
+
+    entries_count = len(day_ordinals_column)
+    padding = (
+        _get_weights_offset(entries_count) - HEADER.size - day_ordinals_column.nbytes
+    )
+
+    # Replaced atomically, a concurrent read sees either the old or the new file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_file_path, "wb") as columnar_file:
+        columnar_file.write(HEADER.pack(MAGIC, entries_count))
+        columnar_file.write(day_ordinals_column.tobytes())
+        columnar_file.write(b"\0" * padding)
+        columnar_file.write(weights_column.tobytes())
+        columnar_file.flush()
+        os.fsync(columnar_file.fileno())
+    os.replace(tmp_file_path, path)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(path: Path) -> None:
+    # Makes the rename durable, directories can't be opened on Windows
+    if os.name != "posix":
+        return
+    dir_fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -51,12 +51,11 @@ class DataIntegrationService:
             self.store_raw_data(raw_data)
 
         daily_entries: list[WeightEntry] = self.convert_to_daily_entries(raw_data)
-        new_entries: list[WeightEntry] = self.filter_new_weight_entries(
+        # Storage skips entries that already exist, no need to read the history
+        new_entries: list[WeightEntry] = self.store_new_weight_entries(
             user_id, daily_entries
         )
 
-        self.store_new_weight_entries(user_id, new_entries)
-
         return new_entries
 
     # Depending on data source we may need params here
@@ -90,33 +89,20 @@ class DataIntegrationService:
         return daily_entries
 
     @raises_sync_error
-    def get_existing_weight_entries(self, user_id: UUID) -> list[WeightEntry]:
-        return self.storage.get_weight_entries(user_id)
-
-    @raises_sync_error
-    def filter_new_weight_entries(
+    def store_new_weight_entries(
         self, user_id: UUID, source_entries: Sequence[WeightEntry]
     ) -> list[WeightEntry]:
-        existing_dates = {
-            entry.entry_date for entry in self.get_existing_weight_entries(user_id)
-        }
-        return [
-            entry
-            for entry in source_entries
-            if entry.entry_date not in existing_dates and entry.user_id == user_id
-        ]
-
-    @raises_sync_error
-    def store_new_weight_entries(
-        self, user_id: UUID, new_entries: list[WeightEntry]
-    ) -> None:
-        self.storage.create_weight_entries(new_entries)
+        new_entries = self.storage.create_weight_entries(
+            entry for entry in source_entries if entry.user_id == user_id
+        )
         logger.info(f"Inserted {len(new_entries)} new weight entries for {user_id}")
 
         # Only need this step to persist the data if we're using file storage
         if isinstance(self.storage, FileStorage):
             self.storage.save()
 
+        return new_entries
+
 
 class SourceFetchError(Exception):
     pass
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import exc
+from sqlalchemy.pool import PoolProxiedConnection, QueuePool
+
+from .utils import get_env_flag
+
+# SQLAlchemy defaults. Sync routes run on a thread pool of up to 40 threads,
+# so size + overflow should be raised to match the expected concurrency
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT_SECONDS = 30.0
+DEFAULT_POOL_RECYCLE_SECONDS = -1
+
+
+class PoolStats(BaseModel):
+    pool_size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class DBPoolStats(BaseModel):
+    primary: PoolStats
+    # None without a read replica
+    replica: PoolStats | None = None
+
+
+class MeasuredQueuePool(QueuePool):
+    """
+    QueuePool that counts checkouts and measures how long each checkout waited
+    for a connection (including opening a new one and the pre-ping)
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._metrics_lock = threading.Lock()
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+
+        wait_seconds = time.perf_counter() - started
+        with self._metrics_lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        return connection
+
+    def stats(self) -> PoolStats:
+        with self._metrics_lock:
+            return PoolStats(
+                pool_size=self.size(),
+                checked_out=self.checkedout(),
+                # Negative while the pool has not opened all of its connections
+                overflow=max(self.overflow(), 0),
+                checkouts=self.checkouts,
+                timeouts=self.timeouts,
+                wait_seconds_total=self.wait_seconds_total,
+                wait_seconds_max=self.wait_seconds_max,
+            )
+
+
+# Shared by the sync and asyncio engines, which need different pool classes
+def get_pool_options_from_env() -> dict[str, Any]:
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        "max_overflow": int(
+            os.environ.get("DB_POOL_MAX_OVERFLOW", DEFAULT_POOL_MAX_OVERFLOW)
+        ),
+        "pool_timeout": float(
+            os.environ.get("DB_POOL_TIMEOUT_SECONDS", DEFAULT_POOL_TIMEOUT_SECONDS)
+        ),
+        "pool_recycle": int(
+            os.environ.get("DB_POOL_RECYCLE_SECONDS", DEFAULT_POOL_RECYCLE_SECONDS)
+        ),
+        "pool_pre_ping": get_env_flag("DB_POOL_PRE_PING"),
+    }
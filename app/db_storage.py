@@ -2,25 +2,51 @@ import datetime as dt
 import json
 import logging
 import os
-from collections.abc import Iterable
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from itertools import batched
 from pathlib import Path
 from uuid import UUID
 
 import pandas as pd
+import sqlalchemy as sa
 from google.oauth2.credentials import Credentials
+from sqlalchemy import ColumnElement, Date, Engine, cast, delete, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import (
     Field,
     Session,
     SQLModel,
+    col,
     create_engine,
     select,
 )
-
-from .project_types import DuplicateEntryError, EntryNotFoundError, WeightEntry
+from sqlmodel.sql.expression import Select, SelectOfScalar
+
+from . import migrations, utils
+from .db_pool import (
+    DBPoolStats,
+    MeasuredQueuePool,
+    PoolStats,
+    get_pool_options_from_env,
+)
+from .project_types import (
+    DuplicateEntryError,
+    EntryNotFoundError,
+    SortOrder,
+    WeeklyAverage,
+    WeeklyRollup,
+    WeightEntry,
+    WeightSeries,
+)
 
 logger = logging.getLogger(__name__)
 
+# Rows per bulk INSERT statement, well below the bind parameter limits
+BULK_INSERT_CHUNK_SIZE = 1000
+
 
 class DBWeightEntry(SQLModel, table=True):
     __tablename__ = "weight_entries"
@@ -31,6 +57,17 @@ class DBWeightEntry(SQLModel, table=True):
     weight: float = Field(nullable=False, default=None)
 
 
+# Running weight sum and entry count per user per week (Monday start).
+# Kept in sync with weight_entries so weekly analytics don't need daily rows
+class DBWeeklyRollup(SQLModel, table=True):
+    __tablename__ = "weekly_rollups"
+
+    user_id: UUID = Field(primary_key=True, default=None)
+    week_start: dt.date = Field(primary_key=True, default=None)
+    weight_sum: float = Field(nullable=False, default=0.0)
+    entry_count: int = Field(nullable=False, default=0)
+
+
 # Model for storing Google OAuth2 access tokens for users
 class DBGoogleCredentials(SQLModel, table=True):
     __tablename__ = "google_credentials"
@@ -85,7 +122,119 @@ class DBGoogleCredentials(SQLModel, table=True):
         )
 
 
-class DatabaseStorage:
+# Read statements are shared with AsyncDatabaseStorage.
+# Weight entries are read as plain (entry_date, weight) rows on a Core
+# connection, without ORM objects, identity map or per-row validation
+def weight_entries_statement(
+    user_id: UUID,
+    date_from: dt.date | None = None,
+    date_to: dt.date | None = None,
+    order: SortOrder = "asc",
+    limit: int | None = None,
+) -> sa.Select[tuple[dt.date, float]]:
+    entry_date = col(DBWeightEntry.entry_date)
+    statement = sa.select(entry_date, col(DBWeightEntry.weight)).where(
+        col(DBWeightEntry.user_id) == user_id
+    )
+    if date_from is not None:
+        statement = statement.where(entry_date >= date_from)
+    if date_to is not None:
+        statement = statement.where(entry_date <= date_to)
+    statement = statement.order_by(entry_date.desc() if order == "desc" else entry_date)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def to_weight_entries(
+    user_id: UUID, rows: Iterable[tuple[dt.date, float]]
+) -> list[WeightEntry]:
+    # Values come from the typed table columns, so models are built without validation
+    return [
+        WeightEntry.model_construct(
+            user_id=user_id, entry_date=entry_date, weight=weight
+        )
+        for entry_date, weight in rows
+    ]
+
+
+def weekly_rollups_statement(
+    user_id: UUID,
+    week_from: dt.date | None = None,
+    week_to: dt.date | None = None,
+) -> SelectOfScalar[DBWeeklyRollup]:
+    statement = select(DBWeeklyRollup).where(DBWeeklyRollup.user_id == user_id)
+    if week_from is not None:
+        statement = statement.where(DBWeeklyRollup.week_start >= week_from)
+    if week_to is not None:
+        statement = statement.where(DBWeeklyRollup.week_start <= week_to)
+    return statement.order_by(col(DBWeeklyRollup.week_start))
+
+
+def week_start_expression(dialect_name: str) -> ColumnElement[dt.date]:
+    # Monday of the weight entry's week, calculated in the database
+    if dialect_name == "sqlite":
+        return func.date(DBWeightEntry.entry_date, "weekday 0", "-6 days", type_=Date)
+
+    return cast(func.date_trunc("week", DBWeightEntry.entry_date), Date)
+
+
+def weekly_averages_statement(
+    dialect_name: str,
+    user_id: UUID,
+    date_from: dt.date | None = None,
+    date_to: dt.date | None = None,
+    weeks_limit: int | None = None,
+) -> Select[tuple[dt.date, float, float | None]]:
+    week_start = week_start_expression(dialect_name).label("week_start")
+    avg_weight = func.avg(DBWeightEntry.weight)
+    statement = (
+        select(
+            week_start,
+            avg_weight,
+            func.lag(avg_weight).over(order_by=week_start),
+        )
+        .where(DBWeightEntry.user_id == user_id)
+        .group_by(week_start)
+        .order_by(week_start.desc())
+    )
+    if date_from is not None:
+        statement = statement.where(DBWeightEntry.entry_date >= date_from)
+    if date_to is not None:
+        statement = statement.where(DBWeightEntry.entry_date <= date_to)
+    if weeks_limit is not None:
+        statement = statement.limit(weeks_limit)
+    return statement
+
+
+def to_weekly_averages(
+    rows: Sequence[tuple[dt.date, float, float | None]],
+) -> list[WeeklyAverage]:
+    # Rows are read from the most recent week
+    return [
+        WeeklyAverage(
+            week_start=week,
+            avg_weight=float(average),
+            previous_avg_weight=(
+                float(previous_average) if previous_average is not None else None
+            ),
+        )
+        for week, average, previous_average in reversed(rows)
+    ]
+
+
+# How long reads of a user go to the primary after the user's last write,
+# so the user sees their own changes before the replica catches up
+DEFAULT_READ_YOUR_WRITES_SECONDS = 5.0
+
+
+class DatabaseStorage(utils.MutationNotifier):
+    """
+    Reads go to the read replica of DB_READ_CONNECTION_STRING when it is set,
+    except for users who wrote within the read-your-writes window.
+    Writes and migrations always go to the primary
+    """
+
     BASE_DIR: Path = Path(__file__).resolve().parent
     DATA_DIR = "data"
 
@@ -93,26 +242,114 @@ class DatabaseStorage:
     DAILY_ENTRIES_CSV_DIR: Path = Path.joinpath(BASE_DIR, DATA_DIR, "csv")
 
     def __init__(self) -> None:
+        super().__init__()
         connection_string = os.environ.get("DB_CONNECTION_STRING")
         if not connection_string:
             logger.error("Missing database connection string in environment")
             raise Exception("Missing database connection string in environment")
-        self._engine = create_engine(connection_string)
+        self._engine = create_engine(
+            connection_string,
+            poolclass=MeasuredQueuePool,
+            **get_pool_options_from_env(),
+        )
+        read_connection_string = os.environ.get("DB_READ_CONNECTION_STRING")
+        self._read_engine = (
+            create_engine(
+                read_connection_string,
+                poolclass=MeasuredQueuePool,
+                **get_pool_options_from_env(),
+            )
+            if read_connection_string
+            else self._engine
+        )
+        self.read_your_writes_seconds = float(
+            os.environ.get(
+                "DB_READ_YOUR_WRITES_SECONDS", DEFAULT_READ_YOUR_WRITES_SECONDS
+            )
+        )
+        # Monotonic time until which each recently writing user reads the primary
+        self._primary_reads_until: dict[UUID, float] = {}
+        self._primary_reads_lock = threading.Lock()
+        self._clock = time.monotonic
 
         # Set up the database when initializing storage
         self._setup_database()
 
     def _setup_database(self) -> None:
-        SQLModel.metadata.create_all(self._engine)
-
-    def get_weight_entries(self, user_id: UUID) -> list[WeightEntry]:
-        with Session(self._engine) as session:
-            statement = select(DBWeightEntry).where(DBWeightEntry.user_id == user_id)
-            results = session.exec(statement)
-            return [
-                WeightEntry.model_validate(row, from_attributes=True)
-                for row in results.all()
-            ]
+        # Only the schema version is read on startup when the schema is current
+        schema_version = migrations.get_schema_version(self._engine)
+        if schema_version >= migrations.LATEST_SCHEMA_VERSION:
+            return
+
+        # Deployments run `python -m app.manage migrate` before starting the app
+        logger.warning(
+            f"Database schema version {schema_version} is behind "
+            f"{migrations.LATEST_SCHEMA_VERSION}, applying migrations"
+        )
+        migrations.migrate(self._engine)
+
+    def reads_primary(self, user_id: UUID) -> bool:
+        """
+        Whether reads of the user go to the primary, always without a replica.
+        Also used by AsyncDatabaseStorage to route its reads the same way
+        """
+        if self._read_engine is self._engine:
+            return True
+
+        now = self._clock()
+        with self._primary_reads_lock:
+            primary_reads_until = self._primary_reads_until.get(user_id)
+            if primary_reads_until is None:
+                return False
+            if primary_reads_until > now:
+                return True
+
+            del self._primary_reads_until[user_id]
+            return False
+
+    def _get_read_engine(self, user_id: UUID) -> Engine:
+        return self._engine if self.reads_primary(user_id) else self._read_engine
+
+    def _mark_user_write(self, user_id: UUID) -> None:
+        if self._read_engine is self._engine:
+            return
+
+        now = self._clock()
+        with self._primary_reads_lock:
+            # Users are kept in the order their windows end, so the windows
+            # that have passed are dropped from the front
+            while self._primary_reads_until:
+                oldest_user_id = next(iter(self._primary_reads_until))
+                if self._primary_reads_until[oldest_user_id] > now:
+                    break
+                del self._primary_reads_until[oldest_user_id]
+
+            self._primary_reads_until.pop(user_id, None)
+            self._primary_reads_until[user_id] = now + self.read_your_writes_seconds
+
+    def get_weight_entries(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+        order: SortOrder = "asc",
+        limit: int | None = None,
+    ) -> list[WeightEntry]:
+        statement = weight_entries_statement(user_id, date_from, date_to, order, limit)
+        with self._get_read_engine(user_id).connect() as connection:
+            return to_weight_entries(user_id, connection.execute(statement).tuples())
+
+    def get_weight_series(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+    ) -> WeightSeries:
+        statement = weight_entries_statement(user_id, date_from, date_to)
+        with self._get_read_engine(user_id).connect() as connection:
+            return WeightSeries.from_rows(
+                user_id, connection.execute(statement).tuples()
+            )
 
     def create_weight_entry(
         self, user_id: UUID, entry_date: dt.date, weight: float | int
@@ -123,7 +360,11 @@ class DatabaseStorage:
                     user_id=user_id, entry_date=entry_date, weight=weight
                 )
                 session.add(new_entry)
+                self._update_weekly_rollups(
+                    session, [(user_id, entry_date, float(weight), 1)]
+                )
                 session.commit()
+                self._notify_mutation(user_id, entry_date)
             except IntegrityError as e:
                 logger.warning(
                     f"Duplicate weight entry creation attempted "
@@ -136,59 +377,297 @@ class DatabaseStorage:
                     f"Use update method to replace it."
                 ) from e
 
-    def create_weight_entries(self, entries: Iterable[WeightEntry]) -> None:
-        entries_db = [
-            DBWeightEntry(
-                user_id=entry.user_id,
-                entry_date=entry.entry_date,
-                weight=entry.weight,
-            )
-            for entry in entries
-        ]
+    def create_weight_entries(
+        self, entries: Iterable[WeightEntry]
+    ) -> list[WeightEntry]:
+        """
+        Bulk insert weight entries in chunks, skipping entries that already exist
+        Return value: list of actually inserted weight entries
+        """
+        # Repeated dates in the batch are skipped like existing entries
+        rows: dict[tuple[UUID, dt.date], float] = {}
+        for entry in entries:
+            rows.setdefault((entry.user_id, entry.entry_date), entry.weight)
+
+        inserted_entries: list[WeightEntry] = []
         with Session(self._engine) as session:
-            session.add_all(entries_db)
+            for chunk in batched(rows.items(), BULK_INSERT_CHUNK_SIZE):
+                statement = (
+                    self._insert_statement(DBWeightEntry)
+                    .values(
+                        [
+                            {
+                                "user_id": user_id,
+                                "entry_date": entry_date,
+                                "weight": weight,
+                            }
+                            for (user_id, entry_date), weight in chunk
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=["user_id", "entry_date"])
+                    .returning(
+                        col(DBWeightEntry.user_id),
+                        col(DBWeightEntry.entry_date),
+                        col(DBWeightEntry.weight),
+                    )
+                )
+                inserted_entries.extend(
+                    WeightEntry.model_construct(
+                        user_id=user_id, entry_date=entry_date, weight=weight
+                    )
+                    for user_id, entry_date, weight in session.exec(statement)
+                )
+
+            self._update_weekly_rollups(
+                session,
+                [
+                    (entry.user_id, entry.entry_date, entry.weight, 1)
+                    for entry in inserted_entries
+                ],
+            )
             session.commit()
 
+        self._notify_entries_mutation(
+            (entry.user_id, entry.entry_date) for entry in inserted_entries
+        )
+        return inserted_entries
+
     def get_weight_entry(
         self, user_id: UUID, entry_date: dt.date
     ) -> WeightEntry | None:
-        with Session(self._engine) as session:
+        with Session(self._get_read_engine(user_id)) as session:
             result = session.get(DBWeightEntry, (user_id, entry_date))
             if not result:
                 return None
 
             return WeightEntry.model_validate(result, from_attributes=True)
 
+    def get_latest_weight_entry(self, user_id: UUID) -> WeightEntry | None:
+        # Reads one row backwards over the (user_id, entry_date) primary key
+        statement = weight_entries_statement(user_id, order="desc", limit=1)
+        with self._get_read_engine(user_id).connect() as connection:
+            entries = to_weight_entries(user_id, connection.execute(statement).tuples())
+            return entries[0] if entries else None
+
     def update_weight_entry(
         self, user_id: UUID, entry_date: dt.date, weight: float | int
     ) -> None:
         with Session(self._engine) as session:
-            entry = session.get(DBWeightEntry, (user_id, entry_date))
-            if not entry:
-                logger.warning(
-                    f"Update on non-existing weight entry attempted. date: {entry_date}"
-                )
-                raise EntryNotFoundError(
-                    "Weight entry doesn't exist for this date. "
-                    "Use create method to create it."
+            while True:
+                old_weight = self._get_locked_weight(session, user_id, entry_date)
+                if old_weight is None:
+                    logger.warning(
+                        "Update on non-existing weight entry attempted. "
+                        f"date: {entry_date}"
+                    )
+                    raise EntryNotFoundError(
+                        "Weight entry doesn't exist for this date. "
+                        "Use create method to create it."
+                    )
+
+                result = session.exec(
+                    sa.update(DBWeightEntry)
+                    .where(*self._entry_condition(user_id, entry_date, old_weight))
+                    .values(weight=weight)
                 )
+                if result.rowcount:
+                    break
+                # Changed since it was read, retried with the new weight
+                session.rollback()
 
-            entry.weight = weight
-            session.add(entry)
+            self._update_weekly_rollups(
+                session, [(user_id, entry_date, float(weight) - old_weight, 0)]
+            )
             session.commit()
-            session.refresh(entry)
+        self._notify_mutation(user_id, entry_date)
 
     def delete_weight_entry(self, user_id: UUID, entry_date: dt.date) -> None:
         with Session(self._engine) as session:
-            entry = session.get(DBWeightEntry, (user_id, entry_date))
-            if not entry:
-                logger.warning(
-                    f"Delete on non-existing weight entry attempted. date: {entry_date}"
+            while True:
+                old_weight = self._get_locked_weight(session, user_id, entry_date)
+                if old_weight is None:
+                    logger.warning(
+                        "Delete on non-existing weight entry attempted. "
+                        f"date: {entry_date}"
+                    )
+                    raise EntryNotFoundError(
+                        "Weight entry doesn't exist for this date."
+                    )
+
+                result = session.exec(
+                    delete(DBWeightEntry).where(
+                        *self._entry_condition(user_id, entry_date, old_weight)
+                    )
                 )
-                raise EntryNotFoundError("Weight entry doesn't exist for this date.")
+                if result.rowcount:
+                    break
+                session.rollback()
+
+            self._update_weekly_rollups(
+                session, [(user_id, entry_date, -old_weight, -1)]
+            )
+            session.commit()
+        self._notify_mutation(user_id, entry_date)
+
+    @staticmethod
+    def _get_locked_weight(
+        session: Session, user_id: UUID, entry_date: dt.date
+    ) -> float | None:
+        """
+        Weight of an entry, locked until the end of the transaction on Postgres.
+        SQLite ignores the lock, so the changes are also conditional on the
+        weight read here (_entry_condition), otherwise two concurrent changes
+        would both apply their rollup delta from the same old weight
+        """
+        entry = session.get(
+            DBWeightEntry,
+            (user_id, entry_date),
+            with_for_update=True,
+            populate_existing=True,
+        )
+        return entry.weight if entry else None
+
+    @staticmethod
+    def _entry_condition(
+        user_id: UUID, entry_date: dt.date, weight: float
+    ) -> tuple[ColumnElement[bool], ...]:
+        return (
+            col(DBWeightEntry.user_id) == user_id,
+            col(DBWeightEntry.entry_date) == entry_date,
+            col(DBWeightEntry.weight) == weight,
+        )
+
+    def get_weekly_rollups(
+        self,
+        user_id: UUID,
+        week_from: dt.date | None = None,
+        week_to: dt.date | None = None,
+    ) -> list[WeeklyRollup]:
+        statement = weekly_rollups_statement(user_id, week_from, week_to)
+        with Session(self._get_read_engine(user_id)) as session:
+            results = session.exec(statement)
+            return [
+                WeeklyRollup.model_validate(row, from_attributes=True)
+                for row in results.all()
+            ]
+
+    def aggregate_weekly(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+        weeks_limit: int | None = None,
+    ) -> list[WeeklyAverage]:
+        """
+        Average weight of each week with entries, with the previous week's average,
+        grouped in the database so only one row per week is read.
+        weeks_limit keeps only the most recent weeks, still compared
+        against the week before them. Returned in ascending order
+        """
+        statement = weekly_averages_statement(
+            self._engine.dialect.name, user_id, date_from, date_to, weeks_limit
+        )
+        with Session(self._get_read_engine(user_id)) as session:
+            return to_weekly_averages(session.exec(statement).all())
+
+    def rebuild_weekly_rollups(self, user_id: UUID | None = None) -> int:
+        """
+        Recalculate weekly rollups from weight entries of one or all users.
+        Used to backfill rollups for data that existed before they were added
+        Return value: number of weekly rollups written
+        """
+        week_start = self._week_start_expression()
+        source = select(
+            DBWeightEntry.user_id,
+            week_start,
+            func.sum(DBWeightEntry.weight),
+            func.count(),
+        ).group_by(col(DBWeightEntry.user_id), week_start)
+
+        clear_statement = delete(DBWeeklyRollup)
+        if user_id is not None:
+            source = source.where(DBWeightEntry.user_id == user_id)
+            clear_statement = clear_statement.where(
+                col(DBWeeklyRollup.user_id) == user_id
+            )
 
-            session.delete(entry)
+        with Session(self._engine) as session:
+            session.exec(clear_statement)
+            result = session.exec(
+                insert(DBWeeklyRollup).from_select(
+                    ["user_id", "week_start", "weight_sum", "entry_count"], source
+                )
+            )
             session.commit()
+            return int(result.rowcount)
+
+    def _update_weekly_rollups(
+        self, session: Session, changes: Iterable[tuple[UUID, dt.date, float, int]]
+    ) -> None:
+        """
+        Apply weight sum and entry count changes of weight entries
+        to their weekly rollups, as part of the caller's transaction
+        """
+        deltas: dict[tuple[UUID, dt.date], tuple[float, int]] = {}
+        for user_id, entry_date, weight_delta, count_delta in changes:
+            key = (user_id, utils.get_week_start(entry_date))
+            weight_sum, entry_count = deltas.get(key, (0.0, 0))
+            deltas[key] = (weight_sum + weight_delta, entry_count + count_delta)
+
+        if not deltas:
+            return
+
+        # Upsert keeps concurrent updates of the same week atomic
+        statement = self._insert_statement(DBWeeklyRollup).values(
+            [
+                {
+                    "user_id": user_id,
+                    "week_start": week_start,
+                    "weight_sum": weight_sum,
+                    "entry_count": entry_count,
+                }
+                for (user_id, week_start), (weight_sum, entry_count) in deltas.items()
+            ]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "week_start"],
+            set_={
+                "weight_sum": DBWeeklyRollup.weight_sum + statement.excluded.weight_sum,
+                "entry_count": (
+                    DBWeeklyRollup.entry_count + statement.excluded.entry_count
+                ),
+            },
+        )
+        session.exec(statement)
+
+        # Weeks left without entries are removed
+        user_ids = {user_id for user_id, _ in deltas}
+        session.exec(
+            delete(DBWeeklyRollup).where(
+                col(DBWeeklyRollup.user_id).in_(user_ids),
+                col(DBWeeklyRollup.entry_count) <= 0,
+            )
+        )
+
+    def _insert_statement(
+        self, table: type[SQLModel]
+    ) -> postgresql.Insert | sqlite.Insert:
+        # Dialect specific insert that supports ON CONFLICT clauses
+        dialect = self._engine.dialect.name
+        match dialect:
+            case "postgresql":
+                return postgresql.insert(table)
+            case "sqlite":
+                return sqlite.insert(table)
+            case _:
+                raise ValueError(f"Unsupported database dialect {dialect}")
+
+    def _week_start_expression(self) -> ColumnElement[dt.date]:
+        return week_start_expression(self._engine.dialect.name)
+
+    def _notify_mutation(self, user_id: UUID, changed_from: dt.date) -> None:
+        self._mark_user_write(user_id)
+        super()._notify_mutation(user_id, changed_from)
 
     def export_to_csv(self, user_id: UUID) -> None:
         filepath = self.DAILY_ENTRIES_CSV_DIR / str(user_id) / self.CSV_FILE_NAME
@@ -221,6 +700,7 @@ class DatabaseStorage:
 
                 session.add(creds_entry)
                 session.commit()
+                self._mark_user_write(user_id)
 
             except Exception:
                 logger.error(
@@ -230,7 +710,7 @@ class DatabaseStorage:
                 raise
 
     def load_google_credentials(self, user_id: UUID) -> Credentials | None:
-        with Session(self._engine) as session:
+        with Session(self._get_read_engine(user_id)) as session:
             try:
                 creds_entry = session.get(DBGoogleCredentials, user_id)
                 if not creds_entry:
@@ -241,6 +721,28 @@ class DatabaseStorage:
                 logger.error("Loading credentials from DB failed")
                 return None
 
+    def pool_stats(self) -> DBPoolStats | None:
+        # None for engines created without the measured pool
+        primary_stats = self._get_pool_stats(self._engine)
+        if primary_stats is None:
+            return None
+
+        replica_stats = (
+            self._get_pool_stats(self._read_engine)
+            if self._read_engine is not self._engine
+            else None
+        )
+        return DBPoolStats(primary=primary_stats, replica=replica_stats)
+
+    @staticmethod
+    def _get_pool_stats(engine: Engine) -> PoolStats | None:
+        pool = engine.pool
+        if not isinstance(pool, MeasuredQueuePool):
+            return None
+        return pool.stats()
+
     def close_connection(self) -> None:
+        if self._read_engine is not self._engine:
+            self._read_engine.dispose()
         if self._engine:
             self._engine.dispose()
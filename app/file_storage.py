@@ -1,21 +1,241 @@
 import datetime as dt
 import json
 import logging
-from collections.abc import Iterable
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from typing import cast
 from uuid import UUID
 
+import numpy as np
 import pandas as pd
 from google.oauth2.credentials import Credentials
 from pydantic import TypeAdapter
 
-from .project_types import DuplicateEntryError, EntryNotFoundError, WeightEntry
+from . import utils
+from .columnar import Columns, read_columns, write_columns
+from .project_types import (
+    DuplicateEntryError,
+    EntryNotFoundError,
+    SortOrder,
+    WeightEntry,
+    WeightSeries,
+)
+from .wal import WalRecord, WriteAheadLog
 
 logger = logging.getLogger(__name__)
 
+# Log records of a user after which the next save() compacts them into the user file
+DEFAULT_WAL_COMPACTION_RECORDS = 10_000
+# Memory budget of the users' entries kept loaded, in number of entries
+DEFAULT_MAX_RESIDENT_ENTRIES = 200_000
+# Time the flusher waits after a mutation, so that mutations are written together
+DEFAULT_FLUSH_INTERVAL_SECONDS = 5.0
+
+
+def _put_record(entry: WeightEntry) -> WalRecord:
+    return WalRecord(
+        op="put",
+        user_id=entry.user_id,
+        entry_date=entry.entry_date,
+        weight=entry.weight,
+    )
+
+
+class _UserShard:
+    """
+    One user's entries, stored in the user's columnar file and log.
+    Reads are served from the user file's columns until the first
+    mutation, which loads the entries by date (O(1) point operations) and
+    their sorted dates (O(log n + k) range reads)
+    """
+
+    __slots__ = (
+        "_dates",
+        "_entries_by_date",
+        "columns",
+        "lock",
+        "pins",
+        "user_id",
+        "wal",
+    )
+
+    def __init__(
+        self,
+        user_id: UUID,
+        wal: WriteAheadLog,
+        entries: Iterable[WeightEntry] = (),
+        columns: Columns | None = None,
+    ) -> None:
+        self.user_id = user_id
+        self.wal = wal
+        self.columns = columns
+        # Held by reads, mutations and while the user file is written, so that
+        # a mutation can't land between the written file and the log reset and
+        # reads don't see the entries halfway through a mutation
+        self.lock = threading.Lock()
+        # Operations in flight on the shard, which keep it from being evicted.
+        # Guarded by FileStorage._shards_lock
+        self.pins = 0
+        self._entries_by_date: dict[dt.date, WeightEntry] | None = None
+        self._dates: list[dt.date] | None = None
+        if columns is None:
+            self._set_entries(entries)
+
+    def __len__(self) -> int:
+        if self.columns is not None:
+            return len(self.columns[0])
+        return len(self.dates)
+
+    @property
+    def entries_by_date(self) -> dict[dt.date, WeightEntry]:
+        if self._entries_by_date is None:
+            self._load_entries()
+        assert self._entries_by_date is not None
+        return self._entries_by_date
+
+    @property
+    def dates(self) -> list[dt.date]:
+        if self._dates is None:
+            self._load_entries()
+        assert self._dates is not None
+        return self._dates
+
+    def _set_entries(self, entries: Iterable[WeightEntry]) -> None:
+        self._entries_by_date = {entry.entry_date: entry for entry in entries}
+        self._dates = sorted(self._entries_by_date)
+
+    def _load_entries(self) -> None:
+        # Values come from the user file, so models are built without validation
+        self._set_entries(self.get_entries(0, len(self)))
+
+    def set_columns(self, columns: Columns) -> None:
+        # The loaded entries are dropped, the file holds all of them
+        self.columns = columns
+        self._entries_by_date = None
+        self._dates = None
+
+    def get_bounds(
+        self, date_from: dt.date | None = None, date_to: dt.date | None = None
+    ) -> tuple[int, int]:
+        # Slice bounds of the date range in the user's sorted entries
+        if self.columns is None:
+            start = bisect_left(self.dates, date_from) if date_from else 0
+            end = bisect_right(self.dates, date_to) if date_to else len(self.dates)
+            return start, end
+
+        day_ordinals = self.columns[0]
+        start = (
+            int(np.searchsorted(day_ordinals, date_from.toordinal(), side="left"))
+            if date_from
+            else 0
+        )
+        end = (
+            int(np.searchsorted(day_ordinals, date_to.toordinal(), side="right"))
+            if date_to
+            else len(day_ordinals)
+        )
+        return start, end
+
+    def get_entries(self, start: int, end: int) -> list[WeightEntry]:
+        if self.columns is None:
+            return [
+                self.entries_by_date[entry_date] for entry_date in self.dates[start:end]
+            ]
+
+        day_ordinals, weights = self.columns
+        return [
+            WeightEntry.model_construct(
+                user_id=self.user_id,
+                entry_date=dt.date.fromordinal(day_ordinal),
+                weight=weight,
+            )
+            for day_ordinal, weight in zip(
+                day_ordinals[start:end].tolist(),
+                weights[start:end].tolist(),
+                strict=True,
+            )
+        ]
+
+    def get_series(self, start: int, end: int) -> WeightSeries:
+        series = WeightSeries(self.user_id)
+        if self.columns is None:
+            for entry in self.get_entries(start, end):
+                series.day_ordinals.append(entry.entry_date.toordinal())
+                series.weights.append(entry.weight)
+            return series
+
+        # One copy of each column slice, the series doesn't share the columns
+        day_ordinals, weights = self.columns
+        series.day_ordinals.frombytes(
+            day_ordinals[start:end].astype(np.intc, copy=False).tobytes()
+        )
+        series.weights.frombytes(
+            weights[start:end].astype(np.float64, copy=False).tobytes()
+        )
+        return series
+
+    def get_entry(self, entry_date: dt.date) -> WeightEntry | None:
+        if self.columns is None:
+            return self.entries_by_date.get(entry_date)
+
+        start, end = self.get_bounds(entry_date, entry_date)
+        return self.get_entries(start, end)[0] if start < end else None
+
+    def get_latest_entry(self) -> WeightEntry | None:
+        entries_count = len(self)
+        if not entries_count:
+            return None
+        return self.get_entries(entries_count - 1, entries_count)[0]
+
+    def index_entry(self, entry: WeightEntry) -> None:
+        dates, entries_by_date = self.dates, self.entries_by_date
+        self.columns = None
+        if entry.entry_date not in entries_by_date:
+            # New entries are usually the latest ones, which skips the binary search
+            if not dates or dates[-1] < entry.entry_date:
+                dates.append(entry.entry_date)
+            else:
+                insort(dates, entry.entry_date)
+        entries_by_date[entry.entry_date] = entry
+
+    def remove_entry(self, entry_date: dt.date) -> None:
+        dates, entries_by_date = self.dates, self.entries_by_date
+        self.columns = None
+        if entries_by_date.pop(entry_date, None) is not None:
+            del dates[bisect_left(dates, entry_date)]
+
+    def apply(self, record: WalRecord) -> None:
+        # Idempotent, records may already be part of the user file
+        if record.op == "delete":
+            self.remove_entry(record.entry_date)
+        elif record.weight is not None:
+            self.index_entry(
+                WeightEntry(
+                    user_id=record.user_id,
+                    entry_date=record.entry_date,
+                    weight=record.weight,
+                )
+            )
+
+    def replay_wal(self) -> None:
+        for record in self.wal.replay():
+            self.apply(record)
+
+
+class FileStorage(utils.MutationNotifier):
+    """
+    Weight entries are stored in one columnar file per user
+    (data/users/<uuid>.bin) plus the user's write-ahead log, loaded on first
+    access into an LRU of resident users bounded by FILE_STORAGE_MAX_RESIDENT_ENTRIES.
+    Once started, a background flusher compacts the logs of changed users into
+    their files FILE_STORAGE_FLUSH_INTERVAL_SECONDS after their mutations
+    """
 
-class FileStorage:
     BASE_DIR: Path = Path(__file__).resolve().parent
     DATA_DIR = "data"
 
@@ -23,6 +243,11 @@ class FileStorage:
     DAILY_ENTRIES_MAIN_FILE_PATH: Path = Path.joinpath(
         BASE_DIR, DATA_DIR, MAIN_FILE_NAME
     )
+    WAL_FILE_SUFFIX = ".wal"
+    USER_FILE_SUFFIX = ".bin"
+    # User files written before the columnar format
+    LEGACY_USER_FILE_SUFFIX = ".json"
+    USERS_DIR_NAME = "users"
 
     CSV_FILE_NAME = "daily_history.csv"
     DAILY_ENTRIES_CSV_DIR: Path = Path.joinpath(BASE_DIR, DATA_DIR, "csv")
@@ -32,113 +257,428 @@ class FileStorage:
     CREDS_FILE_DIR: Path = Path.joinpath(BASE_DIR, AUTH_DIR)
 
     def __init__(self) -> None:
-        self._data: list[WeightEntry] = FileStorage._load_weights_from_file()
+        super().__init__()
+        self.wal_compaction_records = int(
+            os.environ.get(
+                "FILE_STORAGE_WAL_COMPACTION_RECORDS", DEFAULT_WAL_COMPACTION_RECORDS
+            )
+        )
+        self.max_resident_entries = int(
+            os.environ.get(
+                "FILE_STORAGE_MAX_RESIDENT_ENTRIES", DEFAULT_MAX_RESIDENT_ENTRIES
+            )
+        )
+        self.flush_interval_seconds = float(
+            os.environ.get(
+                "FILE_STORAGE_FLUSH_INTERVAL_SECONDS", DEFAULT_FLUSH_INTERVAL_SECONDS
+            )
+        )
+        # LRU of the users' shards loaded in memory, least recently used first
+        self._shards: OrderedDict[UUID, _UserShard] = OrderedDict()
+        # Sync routes run in a thread pool
+        self._shards_lock = threading.Lock()
+        # Users with logged mutations not yet written to their file
+        self._dirty_users: set[UUID] = set()
+        self._flush_requested = threading.Event()
+        self._flusher_stopped = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._migrate_main_file()
 
-    def get_weight_entries(self, user_id: UUID) -> list[WeightEntry]:
-        filtered = [entry for entry in self._data if entry.user_id == user_id]
+    @property
+    def users_dir(self) -> Path:
+        return self.DAILY_ENTRIES_MAIN_FILE_PATH.parent / self.USERS_DIR_NAME
+
+    def get_weight_entries(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+        order: SortOrder = "asc",
+        limit: int | None = None,
+    ) -> list[WeightEntry]:
+        with self._use_shard(user_id) as shard, shard.lock:
+            start, end = shard.get_bounds(date_from, date_to)
+            # Only the returned entries are looked up, so a limited read costs O(limit)
+            if limit is not None and order == "desc":
+                start = max(start, end - limit)
+            elif limit is not None:
+                end = min(end, start + limit)
+            filtered = shard.get_entries(start, end)
+        if order == "desc":
+            filtered.reverse()
         return filtered
 
+    def get_weight_series(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+    ) -> WeightSeries:
+        with self._use_shard(user_id) as shard, shard.lock:
+            return shard.get_series(*shard.get_bounds(date_from, date_to))
+
     def get_weight_entry(
         self, user_id: UUID, entry_date: dt.date
     ) -> WeightEntry | None:
-        filtered: list[WeightEntry] = [
-            entry
-            for entry in self._data
-            if entry.entry_date == entry_date and entry.user_id == user_id
-        ]
-        return filtered[0] if filtered else None
+        with self._use_shard(user_id) as shard, shard.lock:
+            return shard.get_entry(entry_date)
+
+    def get_latest_weight_entry(self, user_id: UUID) -> WeightEntry | None:
+        # Last of the sorted entries, no copy of the user's entries
+        with self._use_shard(user_id) as shard, shard.lock:
+            return shard.get_latest_entry()
 
     def create_weight_entry(
         self, user_id: UUID, entry_date: dt.date, weight: float | int
     ) -> None:
-        existing: list[WeightEntry] = [
-            entry
-            for entry in self._data
-            if entry.entry_date == entry_date and entry.user_id == user_id
-        ]
-        if existing:
-            logger.warning(
-                "Duplicate weight entry creation attempted "
-                f"| Date: {entry_date} | User: {user_id}"
-            )
-            raise DuplicateEntryError(
-                f"Weight entry already exists for date"
-                f" {entry_date.strftime('%Y-%m-%d')}."
-                f"Use update method to replace it."
+        with self._use_shard(user_id) as shard, shard.lock:
+            if shard.get_entry(entry_date) is not None:
+                logger.warning(
+                    "Duplicate weight entry creation attempted "
+                    f"| Date: {entry_date} | User: {user_id}"
+                )
+                raise DuplicateEntryError(
+                    f"Weight entry already exists for date"
+                    f" {entry_date.strftime('%Y-%m-%d')}."
+                    f"Use update method to replace it."
+                )
+
+            new_entry = WeightEntry(
+                user_id=user_id, entry_date=entry_date, weight=float(weight)
             )
+            shard.wal.append([_put_record(new_entry)])
+            shard.index_entry(new_entry)
+            self._mark_user_dirty(user_id)
+        self._notify_mutation(user_id, entry_date)
+
+    def create_weight_entries(
+        self, entries: Iterable[WeightEntry]
+    ) -> list[WeightEntry]:
+        entries_by_user: dict[UUID, list[WeightEntry]] = {}
+        for entry in entries:
+            entries_by_user.setdefault(entry.user_id, []).append(entry)
+
+        new_entries: list[WeightEntry] = []
+        for user_id, user_entries in entries_by_user.items():
+            with self._use_shard(user_id) as shard, shard.lock:
+                new_entries_by_date: dict[dt.date, WeightEntry] = {}
+                for entry in user_entries:
+                    if (
+                        entry.entry_date in new_entries_by_date
+                        or shard.get_entry(entry.entry_date) is not None
+                    ):
+                        logger.warning(
+                            f"({entry.user_id, entry.entry_date}) pair already exists. "
+                            "Skipping"
+                        )
+                        continue
+
+                    new_entries_by_date[entry.entry_date] = entry
+
+                # One append per user for the whole batch, indexed once it's durable
+                new_user_entries = list(new_entries_by_date.values())
+                shard.wal.append(_put_record(entry) for entry in new_user_entries)
+                for entry in new_user_entries:
+                    shard.index_entry(entry)
+                if new_user_entries:
+                    self._mark_user_dirty(user_id)
+            new_entries.extend(new_user_entries)
 
-        self._data.append(
-            WeightEntry(user_id=user_id, entry_date=entry_date, weight=float(weight))
+        self._notify_entries_mutation(
+            (entry.user_id, entry.entry_date) for entry in new_entries
         )
+        return new_entries
 
-    def create_weight_entries(self, entries: Iterable[WeightEntry]) -> None:
-        existing: set[tuple[UUID, dt.date]] = {
-            (entry.user_id, entry.entry_date) for entry in self._data
-        }
+    def delete_weight_entry(self, user_id: UUID, entry_date: dt.date) -> None:
+        with self._use_shard(user_id) as shard, shard.lock:
+            if shard.get_entry(entry_date) is None:
+                logger.warning(
+                    f"Delete on non-existing weight entry attempted."
+                    f"Date: {entry_date} User: {user_id}"
+                )
+                raise EntryNotFoundError("Weight entry doesn't exist for this date.")
 
-        for entry in entries:
-            if (entry.user_id, entry.entry_date) in existing:
+            shard.wal.append(
+                [WalRecord(op="delete", user_id=user_id, entry_date=entry_date)]
+            )
+            shard.remove_entry(entry_date)
+            self._mark_user_dirty(user_id)
+        self._notify_mutation(user_id, entry_date)
+
+    def update_weight_entry(
+        self, user_id: UUID, entry_date: dt.date, weight: float | int
+    ) -> None:
+        with self._use_shard(user_id) as shard, shard.lock:
+            if shard.get_entry(entry_date) is None:
                 logger.warning(
-                    f"({entry.user_id, entry.entry_date}) pair already exists. Skipping"
+                    "Update on non-existing weight entry attempted."
+                    f"Date: {entry_date}. User: {user_id}"
+                )
+                raise EntryNotFoundError(
+                    "Weight entry doesn't exist for this date. ' \
+                'Use create method to create it."
                 )
+
+            shard.wal.append(
+                [
+                    WalRecord(
+                        op="put", user_id=user_id, entry_date=entry_date, weight=weight
+                    )
+                ]
+            )
+            # Replaced rather than changed in place, it may be backed by the user file
+            shard.index_entry(
+                WeightEntry(
+                    user_id=user_id, entry_date=entry_date, weight=float(weight)
+                )
+            )
+            self._mark_user_dirty(user_id)
+        self._notify_mutation(user_id, entry_date)
+
+    @contextmanager
+    def _use_shard(self, user_id: UUID) -> Iterator[_UserShard]:
+        # The shard stays resident while it's used, so that each user has only
+        # one shard whose mutations and log resets can't interleave with another
+        shard = self._pin_shard(user_id)
+        try:
+            yield shard
+        finally:
+            self._unpin_shards([shard])
+
+    def _pin_shard(self, user_id: UUID) -> _UserShard:
+        with self._shards_lock:
+            shard = self._shards.get(user_id)
+            if shard is not None:
+                self._shards.move_to_end(user_id)
+                shard.pins += 1
+                return shard
+
+            shard = self._load_shard(user_id)
+            shard.pins += 1
+            self._shards[user_id] = shard
+            self._evict_shards()
+            return shard
+
+    def _unpin_shards(self, shards: Iterable[_UserShard]) -> None:
+        with self._shards_lock:
+            for shard in shards:
+                shard.pins -= 1
+
+    def _evict_shards(self) -> None:
+        # Evicted shards are fully stored in their snapshot and log. Shards in use
+        # and shards of changed users waiting for the flusher stay resident
+        resident_entries = sum(len(shard) for shard in self._shards.values())
+        for user_id, shard in list(self._shards.items()):
+            if resident_entries <= self.max_resident_entries:
+                return
+            if shard.pins or user_id in self._dirty_users:
                 continue
+            del self._shards[user_id]
+            resident_entries -= len(shard)
 
-            self._data.append(entry)
+    def _get_shard_path(self, user_id: UUID) -> Path:
+        return self.users_dir / f"{user_id}{self.USER_FILE_SUFFIX}"
 
-    def delete_weight_entry(self, user_id: UUID, entry_date: dt.date) -> None:
-        existing: list[WeightEntry] = [
-            entry
-            for entry in self._data
-            if entry.entry_date == entry_date and entry.user_id == user_id
-        ]
-        if not existing:
-            logger.warning(
-                f"Delete on non-existing weight entry attempted."
-                f"Date: {entry_date} User: {user_id}"
-            )
-            raise EntryNotFoundError("Weight entry doesn't exist for this date.")
+    def _load_shard(self, user_id: UUID) -> _UserShard:
+        shard_path = self._get_shard_path(user_id)
+        try:
+            shard = self._new_shard(user_id, columns=read_columns(shard_path))
+        except FileNotFoundError:
+            legacy_path = shard_path.with_suffix(self.LEGACY_USER_FILE_SUFFIX)
+            if not legacy_path.exists():
+                shard = self._new_shard(user_id)
+            else:
+                shard = self._convert_legacy_shard(user_id, legacy_path)
 
-        self._data = [
-            entry
-            for entry in self._data
-            if entry.entry_date != entry_date or entry.user_id != user_id
-        ]
+        shard.replay_wal()
+        return shard
 
-    def update_weight_entry(
-        self, user_id: UUID, entry_date: dt.date, weight: float | int
+    def _convert_legacy_shard(self, user_id: UUID, legacy_path: Path) -> _UserShard:
+        entries = TypeAdapter(list[WeightEntry]).validate_json(legacy_path.read_bytes())
+        shard = self._new_shard(user_id, entries)
+        # The log still applies on top of the converted file
+        self._write_shard(user_id, shard, reset_wal=False)
+        legacy_path.unlink()
+        return shard
+
+    def _new_shard(
+        self,
+        user_id: UUID,
+        entries: Iterable[WeightEntry] = (),
+        columns: Columns | None = None,
+    ) -> _UserShard:
+        wal_path = self._get_shard_path(user_id).with_suffix(self.WAL_FILE_SUFFIX)
+        return _UserShard(user_id, WriteAheadLog(wal_path), entries, columns)
+
+    def _write_shard(
+        self, user_id: UUID, shard: _UserShard, reset_wal: bool = True
     ) -> None:
-        existing: list[WeightEntry] = [
-            entry
-            for entry in self._data
-            if entry.entry_date == entry_date and entry.user_id == user_id
-        ]
-        if not existing:
-            logger.warning(
-                "Update on non-existing weight entry attempted."
-                f"Date: {entry_date}. User: {user_id}"
+        with shard.lock:
+            series = shard.get_series(0, len(shard))
+
+            # Replaced atomically, a crash leaves the previous user file and the log
+            shard_path = self._get_shard_path(user_id)
+            write_columns(
+                shard_path,
+                np.frombuffer(series.day_ordinals, dtype=np.intc),
+                np.frombuffer(series.weights, dtype=np.float64),
             )
-            raise EntryNotFoundError(
-                "Weight entry doesn't exist for this date. ' \
-            'Use create method to create it."
+            if reset_wal:
+                shard.wal.reset()
+                shard.set_columns(read_columns(shard_path))
+
+    def convert_user_files(self) -> int:
+        """
+        Convert the JSON user files of earlier versions to the columnar format,
+        which is otherwise done when a user is first loaded
+        """
+        converted_count = 0
+        for legacy_path in self.users_dir.glob(f"*{self.LEGACY_USER_FILE_SUFFIX}"):
+            try:
+                user_id = UUID(legacy_path.stem)
+            except ValueError:
+                logger.warning(f"Skipping file without a user id: {legacy_path}")
+                continue
+            self._load_shard(user_id)
+            converted_count += 1
+        return converted_count
+
+    def _migrate_main_file(self) -> None:
+        # Entries of the single data file (and its log) used before sharding
+        entries = FileStorage._load_weights_from_file()
+        main_wal = WriteAheadLog(
+            self.DAILY_ENTRIES_MAIN_FILE_PATH.with_suffix(self.WAL_FILE_SUFFIX)
+        )
+        records = main_wal.replay()
+        if not entries and not records:
+            return
+
+        shards: dict[UUID, _UserShard] = {}
+        for entry in entries:
+            if entry.user_id not in shards:
+                shards[entry.user_id] = self._new_shard(entry.user_id)
+            shards[entry.user_id].index_entry(entry)
+        for record in records:
+            if record.user_id not in shards:
+                shards[record.user_id] = self._new_shard(record.user_id)
+            shards[record.user_id].apply(record)
+        for user_id, shard in shards.items():
+            self._write_shard(user_id, shard)
+
+        logger.info(f"Moved weight entries of {len(shards)} users into user files")
+        if self.DAILY_ENTRIES_MAIN_FILE_PATH.exists():
+            os.replace(
+                self.DAILY_ENTRIES_MAIN_FILE_PATH,
+                self.DAILY_ENTRIES_MAIN_FILE_PATH.with_suffix(".json.migrated"),
             )
+            self.DAILY_ENTRIES_MAIN_FILE_PATH.write_text(json.dumps([]))
+        main_wal.reset()
+
+    def _mark_user_dirty(self, user_id: UUID) -> None:
+        # Called while the shard is pinned, so that it can't be evicted before
+        # it's marked. Without the flusher, save() compacts the resident shards
+        if self._flusher is None:
+            return
 
-        row_to_update: WeightEntry = existing[0]
-        row_to_update.weight = float(weight)
+        with self._shards_lock:
+            self._dirty_users.add(user_id)
+        self._flush_requested.set()
 
     def save(self) -> None:
-        json_data = TypeAdapter(list[WeightEntry]).dump_json(self._data)
+        # Mutations are already durable in the users' logs. The flusher compacts
+        # them in the background, otherwise they are compacted into the user
+        # files once they have grown past the threshold
+        if self._flusher is None:
+            self._compact_shards(self.wal_compaction_records)
+
+    def flush(self) -> None:
+        """
+        Compact the logs of the users changed since the last flush into their
+        files. Changed users stay resident until then
+        """
+        with self._shards_lock:
+            dirty_shards = [
+                self._shards[user_id]
+                for user_id in self._dirty_users
+                if user_id in self._shards
+            ]
+            for shard in dirty_shards:
+                shard.pins += 1
+            self._dirty_users.clear()
+        written_count = 0
+        try:
+            for shard in dirty_shards:
+                if shard.wal.record_count:
+                    self._write_shard(shard.user_id, shard)
+                written_count += 1
+        except Exception:
+            # The changes are still in the logs. Users that weren't written
+            # stay changed, so the next flush writes them again
+            with self._shards_lock:
+                self._dirty_users.update(
+                    shard.user_id for shard in dirty_shards[written_count:]
+                )
+            self._flush_requested.set()
+            raise
+        finally:
+            self._unpin_shards(dirty_shards)
 
-        FileStorage.DAILY_ENTRIES_MAIN_FILE_PATH.parent.mkdir(
-            parents=True, exist_ok=True
+    def start_flusher(self) -> None:
+        if self._flusher is not None or self.flush_interval_seconds <= 0:
+            return
+
+        self._flusher_stopped.clear()
+        self._flusher = threading.Thread(
+            target=self._run_flusher, name="file-storage-flusher", daemon=True
         )
-        FileStorage.DAILY_ENTRIES_MAIN_FILE_PATH.write_bytes(json_data)
+        self._flusher.start()
+
+    def stop_flusher(self) -> None:
+        if self._flusher is None:
+            return
+
+        self._flusher_stopped.set()
+        self._flush_requested.set()
+        self._flusher.join()
+        self._flusher = None
+        # Mutations of the last interval
+        self.flush()
+
+    def _run_flusher(self) -> None:
+        while not self._flusher_stopped.is_set():
+            self._flush_requested.wait()
+            # Mutations within the interval are written by the same flush
+            self._flusher_stopped.wait(self.flush_interval_seconds)
+            self._flush_requested.clear()
+            if self._flusher_stopped.is_set():
+                return
+            try:
+                self.flush()
+            except Exception:
+                # Retried after the next interval, the changes are still in the logs
+                logger.exception("Flushing file storage user files failed")
+
+    def compact(self) -> None:
+        self._compact_shards(1)
+
+    def _compact_shards(self, min_records: int) -> None:
+        with self._shards_lock:
+            shards = list(self._shards.values())
+            for shard in shards:
+                shard.pins += 1
+        try:
+            for shard in shards:
+                if shard.wal.record_count >= min_records:
+                    self._write_shard(shard.user_id, shard)
+        finally:
+            self._unpin_shards(shards)
 
     def export_to_csv(self, user_id: UUID) -> None:
         try:
             filepath = self.DAILY_ENTRIES_CSV_DIR / str(user_id) / self.CSV_FILE_NAME
             filepath.parent.mkdir(parents=True, exist_ok=True)
 
-            entries = [entry.model_dump() for entry in self._data]
+            entries = [entry.model_dump() for entry in self.get_weight_entries(user_id)]
             pd.DataFrame(entries).set_index(  # pyright: ignore[reportUnknownMemberType]
                 "entry_date"
             ).to_csv(filepath)
@@ -188,4 +728,4 @@ class FileStorage:
             return None
 
     def close_connection(self) -> None:
-        pass
+        self.stop_flusher()
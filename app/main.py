@@ -9,11 +9,16 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from supabase import Client, create_client
 
+from . import analytics, utils
+from .analytics_cache import AnalyticsCache
+from .api import NEXT_CURSOR_HEADER, metrics_router
 from .api import router_v1 as api_router
+from .async_db_storage import AsyncDatabaseStorage
 from .db_storage import DatabaseStorage
 from .file_storage import FileStorage
 from .google_fit import router as auth_router
 from .project_types import DataStorage
+from .trend import TrendTracker
 
 
 def configure_logging() -> None:
@@ -31,7 +36,35 @@ def log_dotenv_configuration() -> None:
     logger.info("=== Application Configuration ===")
     logger.info(f"APP_ENV: {os.environ.get('APP_ENV')}")
     logger.info(f"STORAGE_TYPE: {os.environ.get('STORAGE_TYPE')}")
+    logger.info(f"ANALYTICS_ENGINE: {os.environ.get('ANALYTICS_ENGINE')}")
+    logger.info(f"ANALYTICS_CACHE_SIZE: {os.environ.get('ANALYTICS_CACHE_SIZE')}")
+    logger.info(
+        f"ANALYTICS_CACHE_TTL_SECONDS: {os.environ.get('ANALYTICS_CACHE_TTL_SECONDS')}"
+    )
+    logger.info(f"DB_POOL_SIZE: {os.environ.get('DB_POOL_SIZE')}")
+    logger.info(f"DB_POOL_MAX_OVERFLOW: {os.environ.get('DB_POOL_MAX_OVERFLOW')}")
+    logger.info(f"DB_READ_REPLICA: {bool(os.environ.get('DB_READ_CONNECTION_STRING'))}")
+    logger.info(
+        f"DB_READ_YOUR_WRITES_SECONDS: {os.environ.get('DB_READ_YOUR_WRITES_SECONDS')}"
+    )
+    logger.info(f"DB_REPLICA_LAG_SECONDS: {os.environ.get('DB_REPLICA_LAG_SECONDS')}")
+    logger.info(f"ASYNC_DB_READS: {os.environ.get('ASYNC_DB_READS')}")
+    logger.info(
+        "FILE_STORAGE_WAL_COMPACTION_RECORDS: "
+        f"{os.environ.get('FILE_STORAGE_WAL_COMPACTION_RECORDS')}"
+    )
+    logger.info(
+        "FILE_STORAGE_MAX_RESIDENT_ENTRIES: "
+        f"{os.environ.get('FILE_STORAGE_MAX_RESIDENT_ENTRIES')}"
+    )
+    logger.info(
+        "FILE_STORAGE_FLUSH_INTERVAL_SECONDS: "
+        f"{os.environ.get('FILE_STORAGE_FLUSH_INTERVAL_SECONDS')}"
+    )
+    logger.info(f"TREND_SMOOTHING: {os.environ.get('TREND_SMOOTHING')}")
+    logger.info(f"TREND_TTL_SECONDS: {os.environ.get('TREND_TTL_SECONDS')}")
     logger.info(f"FRONTEND_URL: {os.environ.get('FRONTEND_URL')}")
+    logger.info(f"ADMIN_USER_IDS: {len(utils.get_env_uuids('ADMIN_USER_IDS'))} users")
     logger.info("=================================")
 
     if os.environ.get("DEMO_USER_ID") is None:
@@ -52,12 +85,40 @@ def create_data_storage() -> DataStorage:
 # Instantiating auth service, storage and logging config as part of app startup
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # type: ignore
+    logger.info(f"Analytics engine: {analytics.get_analytics_engine()}")
     data_storage = create_data_storage()
     app.state.data_storage = data_storage
     logger.info(
         f"App started with {data_storage.__class__.__name__} as Storage Backend"
     )
 
+    # Mutations are durable in the file storage logs when the request returns,
+    # the user files are rewritten in the background and on shutdown
+    if isinstance(data_storage, FileStorage):
+        data_storage.start_flusher()
+
+    # Read routes await the database instead of blocking thread pool threads
+    async_data_storage: AsyncDatabaseStorage | None = None
+    if isinstance(data_storage, DatabaseStorage) and utils.get_env_flag(
+        "ASYNC_DB_READS"
+    ):
+        async_data_storage = AsyncDatabaseStorage(
+            reads_primary=data_storage.reads_primary
+        )
+        app.state.async_data_storage = async_data_storage
+        logger.info("Read routes use AsyncDatabaseStorage")
+
+    # Any change of a user's weight entries invalidates their cached analytics
+    analytics_cache = AnalyticsCache.from_env()
+    analytics_cache.watch(data_storage)
+    app.state.analytics_cache = analytics_cache
+
+    trend_tracker = TrendTracker.from_env()
+    trend_tracker.watch(data_storage)
+    app.state.trend_tracker = trend_tracker
+
+    app.state.admin_user_ids = utils.get_env_uuids("ADMIN_USER_IDS")
+
     url: str | None = os.environ.get("SUPABASE_URL")
     key: str | None = os.environ.get("SUPABASE_KEY")
     if url and key:
@@ -69,9 +130,14 @@ async def lifespan(app: FastAPI):  # type: ignore
 
     yield
 
+    logger.info(f"Analytics cache stats: {analytics_cache.stats().model_dump()}")
+    if isinstance(data_storage, DatabaseStorage):
+        logger.info(f"DB pool stats: {data_storage.pool_stats()}")
     if app.state.data_storage:
         app.state.data_storage.close_connection()
         logger.info(f"{data_storage.__class__.__name__} closed")
+    if async_data_storage is not None:
+        await async_data_storage.close_connection()
 
 
 def create_app() -> FastAPI:
@@ -99,10 +165,12 @@ def create_app() -> FastAPI:
         allow_origins=cors_origins,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
         allow_credentials=False,
     )
 
     app.include_router(api_router)
+    app.include_router(metrics_router)
     app.include_router(auth_router, prefix="/auth")
 
     return app
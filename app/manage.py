@@ -0,0 +1,97 @@
+"""
+Maintenance commands for the app storage.
+Run from the project root: python -m app.manage <command>
+"""
+
+import argparse
+import logging
+import os
+from collections.abc import Sequence
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlmodel import create_engine
+
+from . import migrations
+from .db_storage import DatabaseStorage
+from .file_storage import FileStorage
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_rollups(args: argparse.Namespace) -> None:
+    storage = DatabaseStorage()
+    try:
+        rollups_count = storage.rebuild_weekly_rollups(args.user_id)
+        logger.info(f"Rebuilt {rollups_count} weekly rollups")
+    finally:
+        storage.close_connection()
+
+
+def migrate(args: argparse.Namespace) -> None:
+    # Without DatabaseStorage, which would apply pending migrations on startup
+    connection_string = os.environ.get("DB_CONNECTION_STRING")
+    if not connection_string:
+        logger.error("Missing database connection string in environment")
+        raise Exception("Missing database connection string in environment")
+    engine = create_engine(connection_string)
+    try:
+        applied = migrations.migrate(engine)
+        if applied:
+            logger.info(
+                f"Applied {len(applied)} migrations, schema version "
+                f"{applied[-1].version}"
+            )
+        else:
+            logger.info("Database schema is up to date")
+    finally:
+        engine.dispose()
+
+
+def convert_file_storage(args: argparse.Namespace) -> None:
+    # FileStorage moves the single data file of older versions into user files
+    storage = FileStorage()
+    converted_count = storage.convert_user_files()
+    logger.info(f"Converted {converted_count} JSON user files to the columnar format")
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Weight Tracker maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-rollups",
+        help="Rebuild weekly rollups from the stored weight entries",
+    )
+    backfill.add_argument(
+        "--user-id",
+        type=UUID,
+        default=None,
+        help="Only rebuild rollups of this user (default: all users)",
+    )
+    backfill.set_defaults(handler=backfill_rollups)
+
+    migrate_command = commands.add_parser(
+        "migrate", help="Apply pending database schema migrations"
+    )
+    migrate_command.set_defaults(handler=migrate)
+
+    convert_command = commands.add_parser(
+        "convert-file-storage",
+        help="Convert the file storage JSON data files to columnar user files",
+    )
+    convert_command.set_defaults(handler=convert_file_storage)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    logging.basicConfig(
+        format="[{levelname}] - {asctime} - {name}: {message}",
+        style="{",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=logging.INFO,
+    )
+    main()
@@ -0,0 +1,206 @@
+"""
+Versioned schema migrations of the database storage.
+Applied in order with: python -m app.manage migrate
+"""
+
+import datetime as dt
+import logging
+from collections.abc import Callable
+from typing import NamedTuple
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    Date,
+    DateTime,
+    Engine,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Uuid,
+    func,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlmodel import Field, SQLModel, col
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock key, so app instances starting together migrate once
+MIGRATIONS_LOCK_KEY = 7_310_417
+
+
+class DBSchemaVersion(SQLModel, table=True):
+    __tablename__ = "schema_version"
+
+    version: int = Field(primary_key=True, default=None)
+    description: str = Field(nullable=False)
+    applied_at: dt.datetime = Field(nullable=False)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+# Tables as they were created with create_all before versioned migrations.
+# Pinned here instead of using the models, which follow the latest schema
+BASE_TABLES_METADATA = MetaData()
+Table(
+    "weight_entries",
+    BASE_TABLES_METADATA,
+    Column("user_id", Uuid, primary_key=True),
+    Column("entry_date", Date, primary_key=True),
+    Column("weight", Float, nullable=False),
+)
+Table(
+    "weekly_rollups",
+    BASE_TABLES_METADATA,
+    Column("user_id", Uuid, primary_key=True),
+    Column("week_start", Date, primary_key=True),
+    Column("weight_sum", Float, nullable=False),
+    Column("entry_count", Integer, nullable=False),
+)
+Table(
+    "google_credentials",
+    BASE_TABLES_METADATA,
+    Column("user_id", Uuid, primary_key=True),
+    Column("token", String, nullable=False),
+    Column("refresh_token", String, nullable=False),
+    Column("scopes", String, nullable=False),
+    Column("token_uri", String, nullable=False),
+    Column("expiry", DateTime, nullable=True),
+)
+
+
+def create_base_tables(connection: Connection) -> None:
+    # Skips the tables that already exist
+    BASE_TABLES_METADATA.create_all(connection)
+
+
+def add_weight_entries_covering_index(connection: Connection) -> None:
+    # Weight series, weekly averages and range reads only need
+    # (entry_date, weight) of one user, so they become index-only scans
+    if connection.dialect.name == "postgresql":
+        statement = (
+            "CREATE INDEX IF NOT EXISTS ix_weight_entries_user_date_weight "
+            "ON weight_entries (user_id, entry_date) INCLUDE (weight)"
+        )
+    else:
+        statement = (
+            "CREATE INDEX IF NOT EXISTS ix_weight_entries_user_date_weight "
+            "ON weight_entries (user_id, entry_date, weight)"
+        )
+    connection.execute(text(statement))
+
+
+def add_weekly_rollups_covering_index(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        statement = (
+            "CREATE INDEX IF NOT EXISTS ix_weekly_rollups_user_week_totals "
+            "ON weekly_rollups (user_id, week_start) INCLUDE (weight_sum, entry_count)"
+        )
+    else:
+        statement = (
+            "CREATE INDEX IF NOT EXISTS ix_weekly_rollups_user_week_totals "
+            "ON weekly_rollups (user_id, week_start, weight_sum, entry_count)"
+        )
+    connection.execute(text(statement))
+
+
+def backfill_weekly_rollups(connection: Connection) -> None:
+    # Rollups are only updated by writes, so weeks with entries stored before
+    # they were added are rebuilt from the weight entries. Weeks written since
+    # then may only count the new entries, so all rollups are rebuilt
+    if connection.dialect.name == "sqlite":
+        week_start = "date(entry_date, 'weekday 0', '-6 days')"
+    else:
+        week_start = "CAST(date_trunc('week', entry_date) AS DATE)"
+    connection.execute(text("DELETE FROM weekly_rollups"))
+    result = connection.execute(
+        text(
+            "INSERT INTO weekly_rollups (user_id, week_start, weight_sum, entry_count) "
+            f"SELECT user_id, {week_start}, SUM(weight), COUNT(*) "
+            f"FROM weight_entries GROUP BY user_id, {week_start}"
+        )
+    )
+    logger.info(f"Backfilled {result.rowcount} weekly rollups")
+
+
+# Append only: applied migrations are never changed or reordered
+MIGRATIONS: list[Migration] = [
+    Migration(1, "Create base tables", create_base_tables),
+    Migration(
+        2,
+        "Add covering index for weight entry reads",
+        add_weight_entries_covering_index,
+    ),
+    Migration(
+        3,
+        "Add covering index for weekly rollup reads",
+        add_weekly_rollups_covering_index,
+    ),
+    Migration(
+        4,
+        "Backfill weekly rollups of existing weight entries",
+        backfill_weekly_rollups,
+    ),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _read_schema_version(connection: Connection) -> int:
+    version = connection.execute(
+        select(func.max(col(DBSchemaVersion.version)))
+    ).scalar()
+    return int(version) if version is not None else 0
+
+
+def get_schema_version(engine: Engine) -> int:
+    try:
+        with engine.connect() as connection:
+            return _read_schema_version(connection)
+    except (OperationalError, ProgrammingError):
+        # schema_version table is created by the first migration run
+        return 0
+
+
+def migrate(engine: Engine) -> list[Migration]:
+    """
+    Apply pending migrations in order, in a single transaction
+    Return value: list of applied migrations
+    """
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY}
+            )
+        SQLModel.metadata.create_all(
+            connection, tables=[SQLModel.metadata.tables["schema_version"]]
+        )
+
+        # Read after taking the lock, another instance may have just migrated
+        current_version = _read_schema_version(connection)
+        pending = [
+            migration for migration in MIGRATIONS if migration.version > current_version
+        ]
+        for migration in pending:
+            logger.info(
+                f"Applying schema migration {migration.version}: "
+                f"{migration.description}"
+            )
+            migration.apply(connection)
+            connection.execute(
+                insert(DBSchemaVersion).values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=dt.datetime.now(dt.UTC),
+                )
+            )
+
+    return pending
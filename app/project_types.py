@@ -1,5 +1,7 @@
 import datetime as dt
-from collections.abc import Iterable
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable, Iterator
 from typing import Any, Literal, Protocol
 from uuid import UUID
 
@@ -9,6 +11,13 @@ from pydantic import BaseModel
 type FitnessGoal = Literal["gain", "lose", "maintain"]
 type Result = Literal["positive", "negative"] | None
 type DataSourceName = Literal["gfit", "mfp"]
+type AnalyticsEngine = Literal["pandas", "numpy"]
+type AggregationPeriod = Literal["day", "week", "month", "quarter"]
+type WeekStart = Literal["monday", "sunday"]
+type WeeklyStat = Literal["median", "min", "max", "std", "count"]
+type SortOrder = Literal["asc", "desc"]
+# Called after weight entries of a user change, with the earliest changed date
+type MutationListener = Callable[[UUID, dt.date], None]
 
 
 class WeightEntry(BaseModel):
@@ -17,6 +26,101 @@ class WeightEntry(BaseModel):
     weight: float
 
 
+class WeightSeries:
+    """
+    Weight history of a single user stored as two parallel arrays
+    (day ordinals and weights) sorted by date, instead of a WeightEntry per day.
+    Converted to WeightEntry models only when returned by the API.
+    """
+
+    __slots__ = ("day_ordinals", "user_id", "weights")
+
+    def __init__(
+        self,
+        user_id: UUID,
+        day_ordinals: array[int] | None = None,
+        weights: array[float] | None = None,
+    ) -> None:
+        self.user_id = user_id
+        self.day_ordinals: array[int] = (
+            day_ordinals if day_ordinals is not None else array("i")
+        )
+        self.weights: array[float] = weights if weights is not None else array("d")
+        if len(self.day_ordinals) != len(self.weights):
+            raise ValueError("Day ordinals and weights must have the same length")
+
+    @classmethod
+    def from_rows(
+        cls, user_id: UUID, rows: Iterable[tuple[dt.date, float]]
+    ) -> "WeightSeries":
+        series = cls(user_id)
+        for entry_date, weight in sorted(rows, key=lambda row: row[0]):
+            series.day_ordinals.append(entry_date.toordinal())
+            series.weights.append(weight)
+        return series
+
+    @classmethod
+    def from_entries(
+        cls, user_id: UUID, entries: Iterable[WeightEntry]
+    ) -> "WeightSeries":
+        return cls.from_rows(
+            user_id, ((entry.entry_date, entry.weight) for entry in entries)
+        )
+
+    def __len__(self) -> int:
+        return len(self.day_ordinals)
+
+    def __iter__(self) -> Iterator[tuple[dt.date, float]]:
+        for day_ordinal, weight in zip(self.day_ordinals, self.weights, strict=True):
+            yield dt.date.fromordinal(day_ordinal), weight
+
+    def between(
+        self, date_from: dt.date | None = None, date_to: dt.date | None = None
+    ) -> "WeightSeries":
+        start = (
+            bisect_left(self.day_ordinals, date_from.toordinal()) if date_from else 0
+        )
+        end = (
+            bisect_right(self.day_ordinals, date_to.toordinal())
+            if date_to
+            else len(self)
+        )
+        if start == 0 and end == len(self):
+            return self
+
+        return WeightSeries(
+            self.user_id, self.day_ordinals[start:end], self.weights[start:end]
+        )
+
+    def to_entries(self) -> list[WeightEntry]:
+        # Values come from storage, so models are built without validation
+        return [
+            WeightEntry.model_construct(
+                user_id=self.user_id, entry_date=entry_date, weight=weight
+            )
+            for entry_date, weight in self
+        ]
+
+
+class TrendPoint(BaseModel):
+    entry_date: dt.date
+    weight: float
+    trend: float
+
+
+class WeeklyRollup(BaseModel):
+    week_start: dt.date
+    weight_sum: float
+    entry_count: int
+
+
+class WeeklyAverage(BaseModel):
+    week_start: dt.date
+    avg_weight: float
+    # Average of the previous week with entries, None for the first week
+    previous_avg_weight: float | None
+
+
 class WeeklyAggregateEntry(BaseModel):
     week_start: dt.date
     avg_weight: float
@@ -24,6 +128,21 @@ class WeeklyAggregateEntry(BaseModel):
     weight_change_prc: float
     net_calories: int
     result: Result
+    # Optional statistics, only set when requested
+    median_weight: float | None = None
+    min_weight: float | None = None
+    max_weight: float | None = None
+    std_weight: float | None = None
+    entries_count: int | None = None
+
+
+class PeriodAggregateEntry(BaseModel):
+    period_start: dt.date
+    avg_weight: float
+    weight_change: float
+    weight_change_prc: float
+    net_calories: int
+    result: Result
 
 
 class ProgressMetrics(BaseModel):
@@ -33,19 +152,63 @@ class ProgressMetrics(BaseModel):
     avg_net_calories: int
 
 
+class ProgressReport(BaseModel):
+    weekly_data: list[WeeklyAggregateEntry]
+    metrics: ProgressMetrics | None = None
+
+
+class WeeklyTrendFit(BaseModel):
+    # Least-squares line over weekly averages, x in weeks from last_week_start
+    last_week_start: dt.date
+    intercept: float
+    slope: float
+    slope_std_error: float | None
+    weeks_count: int
+
+
+class WeightForecast(BaseModel):
+    target_weight: float
+    current_weight: float
+    weekly_change: float
+    weekly_change_low: float | None = None
+    weekly_change_high: float | None = None
+    target_date: dt.date | None = None
+    earliest_target_date: dt.date | None = None
+    latest_target_date: dt.date | None = None
+    weeks_count: int
+
+
 class ProgressSummary(BaseModel):
     metrics: ProgressMetrics | None = None
     latest_week: WeeklyAggregateEntry | None = None
 
 
 class DataStorage(Protocol):
-    def get_weight_entries(self, user_id: UUID) -> list[WeightEntry]: ...
+    def get_weight_entries(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+        order: SortOrder = "asc",
+        limit: int | None = None,
+    ) -> list[WeightEntry]: ...
+
+    def get_weight_series(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+    ) -> WeightSeries: ...
 
     def get_weight_entry(
         self, user_id: UUID, entry_date: dt.date
     ) -> WeightEntry | None: ...
 
-    def create_weight_entries(self, entries: Iterable[WeightEntry]) -> None: ...
+    def get_latest_weight_entry(self, user_id: UUID) -> WeightEntry | None: ...
+
+    def create_weight_entries(
+        self, entries: Iterable[WeightEntry]
+    ) -> list[WeightEntry]: ...
 
     def create_weight_entry(
         self, user_id: UUID, entry_date: dt.date, weight: float | int
@@ -59,6 +222,8 @@ class DataStorage(Protocol):
 
     def export_to_csv(self, user_id: UUID) -> None: ...
 
+    def add_mutation_listener(self, listener: MutationListener) -> None: ...
+
     def store_google_credentials(self, user_id: UUID, creds: Credentials) -> None: ...
 
     def load_google_credentials(self, user_id: UUID) -> Credentials | None: ...
@@ -66,6 +231,30 @@ class DataStorage(Protocol):
     def close_connection(self) -> None: ...
 
 
+# Asyncio variant of the DataStorage reads, used by the async read routes.
+# Writes still go through DataStorage, which notifies the mutation listeners
+class AsyncDataStorage(Protocol):
+    async def get_weight_entries(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+        order: SortOrder = "asc",
+        limit: int | None = None,
+    ) -> list[WeightEntry]: ...
+
+    async def get_weight_series(
+        self,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+    ) -> WeightSeries: ...
+
+    async def get_latest_weight_entry(self, user_id: UUID) -> WeightEntry | None: ...
+
+    async def close_connection(self) -> None: ...
+
+
 class DataSourceClient(Protocol):
     def get_raw_data(
         self, date_from: str | None = None, date_to: str | None = None
@@ -0,0 +1,201 @@
+import datetime as dt
+import os
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Callable
+from uuid import UUID
+
+from . import utils
+from .project_types import DataStorage, TrendPoint, WeightSeries
+
+# Hacker's Diet smoothing: each entry moves the trend 10% towards its weight
+DEFAULT_TREND_SMOOTHING = 0.1
+DEFAULT_MAX_TRACKED_USERS = 1024
+# Trends are reloaded after this time, which bounds staleness after a missed change
+DEFAULT_TREND_TTL_SECONDS = 300.0
+FIRST_DAY_ORDINAL = dt.date.min.toordinal()
+
+
+class UserTrend:
+    """
+    Weight history of one user with the smoothed trend value of each entry.
+    dirty_from holds the earliest day ordinal changed since the last refresh,
+    loaded_at the time of the last full load (None until loaded)
+    """
+
+    __slots__ = (
+        "day_ordinals",
+        "dirty_from",
+        "loaded_at",
+        "lock",
+        "trends",
+        "weights",
+    )
+
+    def __init__(self) -> None:
+        self.day_ordinals: array[int] = array("i")
+        self.weights: array[float] = array("d")
+        self.trends: array[float] = array("d")
+        self.dirty_from: int | None = None
+        self.loaded_at: float | None = None
+        # Held while the trend is read from the storage and refreshed
+        self.lock = threading.Lock()
+
+    def mark_dirty(self, day_ordinal: int) -> None:
+        if self.dirty_from is None or day_ordinal < self.dirty_from:
+            self.dirty_from = day_ordinal
+
+    def truncate(self, day_ordinal: int) -> None:
+        index = bisect_left(self.day_ordinals, day_ordinal)
+        del self.day_ordinals[index:]
+        del self.weights[index:]
+        del self.trends[index:]
+
+    def extend(self, series: WeightSeries, smoothing: float) -> None:
+        # Continues from the last trend value, so appends are O(new entries)
+        trend = self.trends[-1] if self.trends else None
+        for day_ordinal, weight in zip(
+            series.day_ordinals, series.weights, strict=True
+        ):
+            trend = weight if trend is None else trend + smoothing * (weight - trend)
+            self.day_ordinals.append(day_ordinal)
+            self.weights.append(weight)
+            self.trends.append(trend)
+
+    def get_points(
+        self, date_from: dt.date | None = None, date_to: dt.date | None = None
+    ) -> list[TrendPoint]:
+        start = (
+            bisect_left(self.day_ordinals, date_from.toordinal()) if date_from else 0
+        )
+        end = (
+            bisect_right(self.day_ordinals, date_to.toordinal())
+            if date_to
+            else len(self.day_ordinals)
+        )
+        return [
+            TrendPoint.model_construct(
+                entry_date=dt.date.fromordinal(day_ordinal),
+                weight=weight,
+                trend=round(trend, 2),
+            )
+            for day_ordinal, weight, trend in zip(
+                self.day_ordinals[start:end],
+                self.weights[start:end],
+                self.trends[start:end],
+                strict=True,
+            )
+        ]
+
+
+class TrendTracker:
+    """
+    Keeps the exponentially smoothed weight trend of recently active users.
+    Storage mutations only mark the changed date. On the next read the trend
+    is recomputed from that date onwards, reading only that part of the history.
+    Reads within replica_lag_seconds of a change may come from a replica
+    without it, so the change stays marked until a read after that time
+    """
+
+    def __init__(
+        self,
+        smoothing: float = DEFAULT_TREND_SMOOTHING,
+        max_users: int = DEFAULT_MAX_TRACKED_USERS,
+        ttl_seconds: float = DEFAULT_TREND_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        replica_lag_seconds: float = 0.0,
+    ) -> None:
+        if not 0 < smoothing <= 1:
+            raise ValueError("Trend smoothing must be between 0 and 1")
+
+        self.smoothing = smoothing
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._users: OrderedDict[UUID, UserTrend] = OrderedDict()
+        # Also kept for users without a trend, whose first load may be stale
+        self._recent_changes = utils.RecentChanges(replica_lag_seconds)
+        self._watched_storages: weakref.WeakSet[DataStorage] = weakref.WeakSet()
+        # Guards the tracked users and their dirty dates, never held during reads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TrendTracker":
+        return cls(
+            smoothing=float(os.environ.get("TREND_SMOOTHING", DEFAULT_TREND_SMOOTHING)),
+            ttl_seconds=float(
+                os.environ.get("TREND_TTL_SECONDS", DEFAULT_TREND_TTL_SECONDS)
+            ),
+            replica_lag_seconds=utils.get_replica_lag_seconds(),
+        )
+
+    def watch(self, data_storage: DataStorage) -> None:
+        with self._lock:
+            if data_storage in self._watched_storages:
+                return
+            self._watched_storages.add(data_storage)
+
+        data_storage.add_mutation_listener(self.mark_changed)
+
+    def mark_changed(self, user_id: UUID, changed_from: dt.date) -> None:
+        now = self._clock()
+        with self._lock:
+            self._recent_changes.add(user_id, now)
+            user_trend = self._users.get(user_id)
+            if user_trend is not None:
+                user_trend.mark_dirty(changed_from.toordinal())
+
+    def get_trend(
+        self,
+        data_storage: DataStorage,
+        user_id: UUID,
+        date_from: dt.date | None = None,
+        date_to: dt.date | None = None,
+    ) -> list[TrendPoint]:
+        now = self._clock()
+        with self._lock:
+            user_trend = self._users.get(user_id)
+            if user_trend is None or (
+                user_trend.loaded_at is not None
+                and now - user_trend.loaded_at > self.ttl_seconds
+            ):
+                # Requests still refreshing an expired trend keep their own copy
+                user_trend = UserTrend()
+                self._users[user_id] = user_trend
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            self._users.move_to_end(user_id)
+
+        # Storage reads only block requests for the same user
+        with user_trend.lock:
+            with self._lock:
+                dirty_from, user_trend.dirty_from = user_trend.dirty_from, None
+
+            reloaded_from: int | None = None
+            if user_trend.loaded_at is None:
+                user_trend.extend(
+                    data_storage.get_weight_series(user_id), self.smoothing
+                )
+                user_trend.loaded_at = now
+                reloaded_from = FIRST_DAY_ORDINAL
+            elif dirty_from is not None:
+                # Entries before the changed date keep their trend values
+                user_trend.truncate(dirty_from)
+                user_trend.extend(
+                    data_storage.get_weight_series(
+                        user_id, date_from=dt.date.fromordinal(dirty_from)
+                    ),
+                    self.smoothing,
+                )
+                reloaded_from = dirty_from
+
+            if reloaded_from is not None:
+                with self._lock:
+                    # Read again once a lagging replica has caught up
+                    if self._recent_changes.get(user_id, now) is not None:
+                        user_trend.mark_dirty(reloaded_from)
+            return user_trend.get_points(date_from, date_to)
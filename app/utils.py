@@ -1,61 +1,110 @@
 import datetime as dt
 import logging
-from collections.abc import Sequence
+import os
+from collections import OrderedDict
+from collections.abc import Iterable
+from uuid import UUID
 
-from .project_types import (
-    FitnessGoal,
-    WeightEntry,
-)
+from .project_types import FitnessGoal, MutationListener
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_GOAL: FitnessGoal = "lose"
+# Upper bound of the read replica's lag behind the primary
+DEFAULT_REPLICA_LAG_SECONDS = 30.0
 
 
-def filter_daily_entries(
-    daily_entries: Sequence[WeightEntry],
-    date_from: dt.date | None = None,
-    date_to: dt.date | None = None,
-) -> list[WeightEntry]:
-    if date_from:
-        daily_entries = [
-            entry for entry in daily_entries if entry.entry_date >= date_from
-        ]
-    if date_to:
-        daily_entries = [
-            entry for entry in daily_entries if entry.entry_date <= date_to
-        ]
-    return list(daily_entries)
-
-
-def get_latest_entry_date(
-    daily_entries: Sequence[WeightEntry],
-) -> dt.date | None:
-    if not daily_entries:
-        return None
-
-    try:
-        return sorted(daily_entries, key=lambda x: x.entry_date)[-1].entry_date
-    except Exception:
-        logger.warning(
-            "Failed to get the date of the latest weight entry"
-            f"Entries count: {len(daily_entries)}",
-            exc_info=True,
-        )
-        return None
-
-
-def get_latest_daily_entry(
-    daily_entries: Sequence[WeightEntry],
-) -> WeightEntry | None:
-    if not daily_entries:
-        return None
-
-    try:
-        return sorted(daily_entries, key=lambda x: x.entry_date)[-1]
-    except Exception:
-        logger.warning(
-            f"Failed to get the latest weight entryEntries count: {len(daily_entries)}",
-            exc_info=True,
-        )
-        return None
+def get_env_flag(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_env_uuids(name: str) -> frozenset[UUID]:
+    # Comma separated, an invalid id fails on startup rather than in a request
+    value = os.environ.get(name, "")
+    return frozenset(UUID(item.strip()) for item in value.split(",") if item.strip())
+
+
+def get_replica_lag_seconds() -> float:
+    # Without a read replica every read sees the latest changes
+    if not os.environ.get("DB_READ_CONNECTION_STRING"):
+        return 0.0
+
+    return float(os.environ.get("DB_REPLICA_LAG_SECONDS", DEFAULT_REPLICA_LAG_SECONDS))
+
+
+def get_week_start(entry_date: dt.date) -> dt.date:
+    return entry_date - dt.timedelta(days=entry_date.weekday())
+
+
+def get_earliest_dates_by_user(
+    user_dates: Iterable[tuple[UUID, dt.date]],
+) -> dict[UUID, dt.date]:
+    earliest_dates: dict[UUID, dt.date] = {}
+    for user_id, entry_date in user_dates:
+        if user_id not in earliest_dates or entry_date < earliest_dates[user_id]:
+            earliest_dates[user_id] = entry_date
+    return earliest_dates
+
+
+class MutationNotifier:
+    """
+    Mutation listeners of a DataStorage, notified after weight entries
+    of a user are stored
+    """
+
+    def __init__(self) -> None:
+        self._mutation_listeners: list[MutationListener] = []
+
+    def add_mutation_listener(self, listener: MutationListener) -> None:
+        self._mutation_listeners.append(listener)
+
+    def _notify_mutation(self, user_id: UUID, changed_from: dt.date) -> None:
+        # The change is already stored, so listener failures are only logged
+        for listener in self._mutation_listeners:
+            try:
+                listener(user_id, changed_from)
+            except Exception:
+                logger.exception(f"Weight entries mutation listener failed: {listener}")
+
+    def _notify_entries_mutation(
+        self, user_dates: Iterable[tuple[UUID, dt.date]]
+    ) -> None:
+        earliest_dates = get_earliest_dates_by_user(user_dates)
+        for user_id, changed_from in earliest_dates.items():
+            self._notify_mutation(user_id, changed_from)
+
+
+class RecentChanges:
+    """
+    Time of the latest change of each user within the last max_age seconds.
+    Users are kept in the order of their changes, so older ones are dropped
+    from the front. Not thread safe, callers hold their own lock
+    """
+
+    def __init__(self, max_age: float) -> None:
+        self.max_age = max_age
+        self._changed_at: OrderedDict[UUID, float] = OrderedDict()
+
+    def add(self, user_id: UUID, now: float) -> None:
+        if self.max_age <= 0:
+            return
+
+        while self._changed_at:
+            oldest_user_id, changed_at = next(iter(self._changed_at.items()))
+            if now - changed_at < self.max_age:
+                break
+            del self._changed_at[oldest_user_id]
+
+        self._changed_at.pop(user_id, None)
+        self._changed_at[user_id] = now
+
+    def get(self, user_id: UUID, now: float) -> float | None:
+        # Time of the user's change, if it's more recent than max_age
+        changed_at = self._changed_at.get(user_id)
+        if changed_at is None or now - changed_at >= self.max_age:
+            return None
+        return changed_at
@@ -0,0 +1,103 @@
+import datetime as dt
+import logging
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Literal
+from uuid import UUID
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class WalRecord(BaseModel):
+    op: Literal["put", "delete"]
+    user_id: UUID
+    entry_date: dt.date
+    weight: float | None = None
+
+
+class WriteAheadLog:
+    """
+    Append-only log of weight entry mutations, one JSON record per line.
+    Records are applied on top of the last snapshot when the storage starts,
+    so applying them must be idempotent (put overwrites, delete ignores missing)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.record_count = 0
+        # Bytes of the log replayed or appended through this object
+        self.size = 0
+
+    def append(self, records: Iterable[WalRecord]) -> None:
+        data = b"".join(
+            record.model_dump_json(exclude_none=True).encode() + b"\n"
+            for record in records
+        )
+        if not data:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as wal_file:
+            wal_file.write(data)
+            wal_file.flush()
+            os.fsync(wal_file.fileno())
+        self.record_count += data.count(b"\n")
+        self.size += len(data)
+
+    def replay(self) -> list[WalRecord]:
+        """
+        Read all complete records. A torn or corrupt record (e.g. after a crash
+        in the middle of an append) and everything after it is truncated
+        """
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            self.record_count = 0
+            self.size = 0
+            return []
+
+        records: list[WalRecord] = []
+        offset = 0
+        while offset < len(data):
+            line_end = data.find(b"\n", offset)
+            try:
+                if line_end == -1:
+                    raise ValueError("Record without line end")
+                records.append(WalRecord.model_validate_json(data[offset:line_end]))
+            except ValueError:
+                logger.warning(
+                    f"Truncating torn write-ahead log record at byte {offset} "
+                    f"of {self.path}"
+                )
+                with open(self.path, "r+b") as wal_file:
+                    wal_file.truncate(offset)
+                break
+            offset = line_end + 1
+
+        self.record_count = len(records)
+        self.size = offset
+        return records
+
+    def reset(self) -> None:
+        """
+        Called once the records replayed or appended through this object are
+        part of a snapshot. Records appended to the file by anyone else aren't,
+        so then the whole log is kept and replayed on top of the snapshot, which
+        is safe because records are applied in order and idempotently
+        """
+        try:
+            file_size = self.path.stat().st_size
+        except FileNotFoundError:
+            file_size = 0
+        if file_size > self.size:
+            logger.warning(
+                f"Keeping write-ahead log {self.path} with records missing from "
+                "the snapshot"
+            )
+        else:
+            self.path.unlink(missing_ok=True)
+        self.record_count = 0
+        self.size = 0
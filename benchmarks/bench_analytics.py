@@ -0,0 +1,63 @@
+"""
+Compare the pandas and NumPy weekly aggregation engines.
+
+Run from the project root: python -m benchmarks.bench_analytics
+"""
+
+import datetime as dt
+import timeit
+from collections.abc import Callable
+from functools import partial
+from uuid import UUID
+
+import numpy as np
+from app.analytics import get_weekly_aggregates_numpy, get_weekly_aggregates_pandas
+from app.project_types import WeightEntry
+
+BENCH_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
+HISTORY_SIZES = [1_000, 100_000, 1_000_000]
+
+# pandas timestamps can't go past year 2262, so large histories
+# repeat dates over a 20 year period instead of one entry per day
+HISTORY_START = dt.date(2005, 1, 1)
+HISTORY_DAYS = 20 * 365
+
+
+def make_daily_entries(size: int) -> list[WeightEntry]:
+    rng = np.random.default_rng(0)
+    day_offsets = np.sort(rng.integers(0, min(size, HISTORY_DAYS), size=size))
+    weights = np.round(85 - day_offsets * 0.002 + rng.normal(0, 0.5, size=size), 2)
+    return [
+        WeightEntry.model_construct(
+            user_id=BENCH_USER_ID,
+            entry_date=HISTORY_START + dt.timedelta(days=offset),
+            weight=weight,
+        )
+        for offset, weight in zip(day_offsets.tolist(), weights.tolist(), strict=True)
+    ]
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    print(f"{'entries':>10} {'pandas (s)':>12} {'numpy (s)':>12} {'speedup':>9}")
+    for size in HISTORY_SIZES:
+        daily_entries = make_daily_entries(size)
+        repeat = 5 if size < 1_000_000 else 2
+
+        pandas_time = best_time(
+            partial(get_weekly_aggregates_pandas, daily_entries, "lose"), repeat
+        )
+        numpy_time = best_time(
+            partial(get_weekly_aggregates_numpy, daily_entries, "lose"), repeat
+        )
+        print(
+            f"{size:>10} {pandas_time:>12.4f} {numpy_time:>12.4f}"
+            f" {pandas_time / numpy_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare batch progress reports of many users against calling
+get_weekly_aggregates and get_summary for each user in a loop.
+
+Run from the project root: python -m benchmarks.bench_batch_analytics
+"""
+
+import datetime as dt
+import os
+import timeit
+import uuid
+from collections.abc import Callable
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from app.analytics import get_progress_reports, get_summary, get_weekly_aggregates
+from app.project_types import WeightEntry
+
+USER_COUNTS = [100, 1_000, 5_000]
+ENTRIES_PER_USER = 365
+HISTORY_START = dt.date(2024, 1, 1)
+
+
+def make_entries_frame(users_count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    user_ids = [uuid.UUID(int=user) for user in range(users_count)]
+    days = np.arange(ENTRIES_PER_USER)
+    return pd.DataFrame(
+        {
+            "user_id": np.repeat(np.array(user_ids, dtype=object), ENTRIES_PER_USER),
+            "entry_date": np.tile(
+                [HISTORY_START + dt.timedelta(days=int(day)) for day in days],
+                users_count,
+            ),
+            "weight": np.round(
+                rng.normal(80, 8, size=(users_count, 1))
+                - days * 0.01
+                + rng.normal(0, 0.5, size=(users_count, ENTRIES_PER_USER)),
+                2,
+            ).ravel(),
+        }
+    )
+
+
+def group_entries_by_user(frame: pd.DataFrame) -> list[list[WeightEntry]]:
+    entries: dict[uuid.UUID, list[WeightEntry]] = {}
+    for user_id, entry_date, weight in frame.itertuples(index=False):
+        entries.setdefault(user_id, []).append(
+            WeightEntry.model_construct(
+                user_id=user_id, entry_date=entry_date, weight=weight
+            )
+        )
+    return list(entries.values())
+
+
+def loop_reports(users_entries: list[list[WeightEntry]]) -> None:
+    for daily_entries in users_entries:
+        weekly_entries = get_weekly_aggregates(daily_entries, "lose")
+        get_summary(weekly_entries)
+
+
+def best_time(fn: Callable[[], object], repeat: int = 3) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    print(
+        f"{'users':>7} {'loop pandas (s)':>16} {'loop numpy (s)':>15}"
+        f" {'batch (s)':>10} {'vs pandas':>10}"
+    )
+    for users_count in USER_COUNTS:
+        frame = make_entries_frame(users_count)
+        users_entries = group_entries_by_user(frame)
+
+        os.environ["ANALYTICS_ENGINE"] = "pandas"
+        pandas_time = best_time(partial(loop_reports, users_entries), repeat=1)
+        os.environ["ANALYTICS_ENGINE"] = "numpy"
+        numpy_time = best_time(partial(loop_reports, users_entries))
+        batch_time = best_time(partial(get_progress_reports, frame, "lose"))
+
+        print(
+            f"{users_count:>7} {pandas_time:>16.3f} {numpy_time:>15.3f}"
+            f" {batch_time:>10.3f} {pandas_time / batch_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
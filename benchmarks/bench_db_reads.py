@@ -0,0 +1,79 @@
+"""
+Compare reading a user's weight entries through ORM objects validated one by one
+against the Core tuple read path of DatabaseStorage.get_weight_entries.
+
+Uses a temporary SQLite database file.
+Run from the project root: python -m benchmarks.bench_db_reads
+"""
+
+import datetime as dt
+import os
+import tempfile
+import timeit
+import uuid
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from app.db_storage import DatabaseStorage, DBWeightEntry
+from app.project_types import WeightEntry
+from sqlmodel import Session, col, select
+
+ENTRIES_COUNT = 100_000
+HISTORY_START = dt.date(1750, 1, 1)
+USER_ID = uuid.UUID(int=1)
+
+
+def make_entries() -> list[WeightEntry]:
+    rng = np.random.default_rng(0)
+    weights = np.round(80 + rng.normal(0, 0.5, ENTRIES_COUNT), 2)
+    return [
+        WeightEntry.model_construct(
+            user_id=USER_ID,
+            entry_date=HISTORY_START + dt.timedelta(days=day),
+            weight=float(weight),
+        )
+        for day, weight in enumerate(weights)
+    ]
+
+
+# Read path before the Core tuple reads
+def read_orm_entries(storage: DatabaseStorage) -> list[WeightEntry]:
+    statement = (
+        select(DBWeightEntry)
+        .where(DBWeightEntry.user_id == USER_ID)
+        .order_by(col(DBWeightEntry.entry_date))
+    )
+    with Session(storage._engine) as session:
+        return [
+            WeightEntry.model_validate(row, from_attributes=True)
+            for row in session.exec(statement).all()
+        ]
+
+
+def best_time(fn: Callable[[], object], repeat: int = 5) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DB_CONNECTION_STRING"] = f"sqlite:///{Path(tmp_dir) / 'bench.db'}"
+        storage = DatabaseStorage()
+        try:
+            storage.create_weight_entries(make_entries())
+            assert read_orm_entries(storage) == storage.get_weight_entries(USER_ID)
+
+            orm_time = best_time(partial(read_orm_entries, storage))
+            core_time = best_time(partial(storage.get_weight_entries, USER_ID))
+        finally:
+            storage.close_connection()
+
+    print(f"{'read path':>10} {'time (s)':>9} {'rows/s':>11}")
+    for name, seconds in (("orm", orm_time), ("core", core_time)):
+        print(f"{name:>10} {seconds:>9.3f} {ENTRIES_COUNT / seconds:>11,.0f}")
+    print(f"speedup: {orm_time / core_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare loading a user's weight series from a JSON user file (parsed and
+validated entry by entry) against the binary columnar user file read
+by FileStorage.get_weight_series.
+
+Uses temporary files.
+Run from the project root: python -m benchmarks.bench_file_reads
+"""
+
+import datetime as dt
+import tempfile
+import timeit
+import uuid
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from app.columnar import write_columns
+from app.file_storage import FileStorage
+from app.project_types import WeightEntry, WeightSeries
+from pydantic import TypeAdapter
+
+ENTRIES_COUNT = 100_000
+HISTORY_START = dt.date(1750, 1, 1)
+USER_ID = uuid.UUID(int=1)
+
+
+def make_entries() -> list[WeightEntry]:
+    rng = np.random.default_rng(0)
+    weights = np.round(80 + rng.normal(0, 0.5, ENTRIES_COUNT), 2)
+    return [
+        WeightEntry.model_construct(
+            user_id=USER_ID,
+            entry_date=HISTORY_START + dt.timedelta(days=day),
+            weight=float(weight),
+        )
+        for day, weight in enumerate(weights)
+    ]
+
+
+# Read path before the columnar user files
+def read_json_series(json_path: Path) -> WeightSeries:
+    entries = TypeAdapter(list[WeightEntry]).validate_json(json_path.read_bytes())
+    return WeightSeries.from_entries(USER_ID, entries)
+
+
+def read_columnar_series(storage: FileStorage) -> WeightSeries:
+    # Cold read, the user is loaded from its file every time
+    storage._shards.clear()
+    return storage.get_weight_series(USER_ID)
+
+
+def best_time(fn: Callable[[], object], repeat: int = 5) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main() -> None:
+    entries = make_entries()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        FileStorage.DAILY_ENTRIES_MAIN_FILE_PATH = Path(tmp_dir) / "daily_data.json"
+        storage = FileStorage()
+
+        json_path = Path(tmp_dir) / f"{USER_ID}.json"
+        json_path.write_bytes(TypeAdapter(list[WeightEntry]).dump_json(entries))
+        write_columns(
+            storage.users_dir / f"{USER_ID}{storage.USER_FILE_SUFFIX}",
+            [entry.entry_date.toordinal() for entry in entries],
+            [entry.weight for entry in entries],
+        )
+        assert list(read_json_series(json_path)) == list(read_columnar_series(storage))
+
+        json_time = best_time(partial(read_json_series, json_path))
+        columnar_time = best_time(partial(read_columnar_series, storage))
+
+    print(f"{'user file':>10} {'time (s)':>9} {'rows/s':>11}")
+    for name, seconds in (("json", json_time), ("columnar", columnar_time)):
+        print(f"{name:>10} {seconds:>9.4f} {ENTRIES_COUNT / seconds:>11,.0f}")
+    print(f"speedup: {json_time / columnar_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -75,7 +75,9 @@ def storage_sample(sample_daily_entries):
     SQLModel.metadata.create_all(engine)
     try:
         _insert_daily_entries(engine, sample_daily_entries)
-        yield DatabaseStorage()
+        storage = DatabaseStorage()
+        storage.rebuild_weekly_rollups()
+        yield storage
     finally:
         SQLModel.metadata.drop_all(engine)
 
@@ -161,7 +163,7 @@ class TestDemoGetData:
         expected_json = {
             "goal": "lose",
             "weekly_data": TypeAdapter(list[WeeklyAggregateEntry]).dump_python(
-                weekly_data, mode="json"
+                weekly_data, mode="json", exclude_unset=True
             ),
         }
 
@@ -199,7 +201,7 @@ class TestDemoGetData:
         )[0]
 
         expected_json = {
-            "latest_week": latest_week.model_dump(mode="json"),
+            "latest_week": latest_week.model_dump(mode="json", exclude_unset=True),
             "metrics": metrics_data.model_dump(mode="json"),
         }
 
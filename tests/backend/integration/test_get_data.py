@@ -85,7 +85,9 @@ def get_test_storage(request, mocker, sample_daily_entries, tmp_path):
         SQLModel.metadata.create_all(engine)
         try:
             _insert_daily_entries(engine, sample_daily_entries)
-            yield DatabaseStorage()
+            storage = DatabaseStorage()
+            storage.rebuild_weekly_rollups()
+            yield storage
         finally:
             SQLModel.metadata.drop_all(engine)
 
@@ -1,6 +1,33 @@
 # Make sure all environment vars are loaded before the tests are executed
 from pathlib import Path
+
+import pytest
 from dotenv import load_dotenv
 
+from app.file_storage import FileStorage
+
 env_path = Path(__file__).parent.parent.parent.parent / "app" / ".env"
 load_dotenv(env_path)
+
+
+# FileStorage appends every mutation to a log next to its data file,
+# which must not end up in the app's data directory
+@pytest.fixture(autouse=True)
+def file_storage_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        FileStorage, "DAILY_ENTRIES_MAIN_FILE_PATH", tmp_path / "daily_data.json"
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# Monotonic clock for the TTLs and time windows, moved by setting clock.now
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -1,23 +1,50 @@
 # type: ignore
 import datetime as dt
+import numpy as np
+import pandas as pd
 import pytest
 from pydantic import TypeAdapter
 from typing import Any
 from uuid import UUID
 
 from app.analytics import (
+    detect_outliers,
+    fit_weekly_trend,
+    fit_weekly_trends,
+    get_analytics_engine,
+    get_forecast,
+    get_forecasts,
+    get_period_aggregates,
+    get_progress_reports,
     get_weekly_aggregates,
+    get_weekly_aggregates_from_rollups,
+    get_weekly_aggregates_numpy,
+    get_weekly_aggregates_pandas,
     get_summary,
     calculate_result,
+    calculate_results,
+    split_outliers,
 )
 from app.project_types import (
+    PeriodAggregateEntry,
     WeightEntry,
+    WeightSeries,
     WeeklyAggregateEntry,
+    WeeklyRollup,
     ProgressMetrics,
     ProgressSummary,
 )
 
 TEST_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
+RANDOM_UUID = UUID("5ebcce4b-e597-406e-9d93-8de7072bbc34")
+
+
+@pytest.fixture(params=["pandas", "numpy"])
+def analytics_engine(request, monkeypatch):
+    monkeypatch.setenv("ANALYTICS_ENGINE", request.param)
+    get_analytics_engine.cache_clear()
+    yield request.param
+    get_analytics_engine.cache_clear()
 
 
 @pytest.fixture
@@ -41,7 +68,7 @@ def sample_daily_entries() -> Any:
     return TypeAdapter(list[WeightEntry]).validate_python(data)
 
 
-def test_weekly_aggregates(sample_daily_entries):
+def test_weekly_aggregates(sample_daily_entries, analytics_engine):
     goal = "lose"
     expected = TypeAdapter(list[WeeklyAggregateEntry]).validate_python(
         [
@@ -75,12 +102,22 @@ def test_weekly_aggregates(sample_daily_entries):
     assert weekly_aggregates == expected
 
 
-def test_weekly_aggregates_empty_dataset():
+def test_weekly_aggregates_from_series(sample_daily_entries, analytics_engine):
+    series = WeightSeries.from_entries(TEST_USER_ID, sample_daily_entries)
+    for goal in ["lose", "gain", "maintain"]:
+        assert get_weekly_aggregates(series, goal) == get_weekly_aggregates(
+            sample_daily_entries, goal
+        )
+
+    assert get_weekly_aggregates(WeightSeries(TEST_USER_ID), "lose") == []
+
+
+def test_weekly_aggregates_empty_dataset(analytics_engine):
     entries = get_weekly_aggregates([], "lose")
     assert len(entries) == 0
 
 
-def test_weekly_aggregates_single_week():
+def test_weekly_aggregates_single_week(analytics_engine):
     daily_entries = TypeAdapter(list[WeightEntry]).validate_python(
         [
             {
@@ -136,7 +173,7 @@ def test_weekly_aggregates_single_week():
     assert get_weekly_aggregates(daily_entries=daily_entries, goal=goal) == expected
 
 
-def test_weekly_aggregates_single_day():
+def test_weekly_aggregates_single_day(analytics_engine):
     daily_entries = TypeAdapter(list[WeightEntry]).validate_python(
         [{"entry_date": dt.date(2025, 8, 27), "weight": 72.18, "user_id": TEST_USER_ID}]
     )
@@ -156,6 +193,470 @@ def test_weekly_aggregates_single_day():
     assert get_weekly_aggregates(daily_entries=daily_entries, goal=goal) == expected
 
 
+def test_weekly_aggregates_engines_match():
+    rng = np.random.default_rng(42)
+    start = dt.date(2023, 1, 1)
+    # Random gaps between entries so some weeks are missing
+    day_offsets = np.cumsum(rng.integers(1, 5, size=400))
+    weights = np.round(80 - day_offsets * 0.01 + rng.normal(0, 0.6, size=400), 2)
+    daily_entries = [
+        WeightEntry(
+            user_id=TEST_USER_ID,
+            entry_date=start + dt.timedelta(days=int(offset)),
+            weight=float(weight),
+        )
+        for offset, weight in zip(day_offsets, weights)
+    ]
+
+    for goal in ["lose", "gain", "maintain"]:
+        assert get_weekly_aggregates_numpy(
+            daily_entries, goal
+        ) == get_weekly_aggregates_pandas(daily_entries, goal)
+
+    all_stats = ["median", "min", "max", "std", "count"]
+    assert get_weekly_aggregates_numpy(
+        daily_entries, "lose", all_stats
+    ) == get_weekly_aggregates_pandas(daily_entries, "lose", all_stats)
+
+
+def make_random_entries(rng, user_id=TEST_USER_ID, size=60):
+    start = dt.date(2023, 1, 1) + dt.timedelta(days=int(rng.integers(0, 7)))
+    day_offsets = np.cumsum(rng.integers(1, 3, size=size))
+    weights = np.round(rng.uniform(50, 120) + rng.normal(0, 1.5, size=size), 2)
+    return [
+        WeightEntry(
+            user_id=user_id,
+            entry_date=start + dt.timedelta(days=int(offset)),
+            weight=float(weight),
+        )
+        for offset, weight in zip(day_offsets, weights)
+    ]
+
+
+def test_weekly_aggregates_engines_match_random_histories():
+    # Rounded weekly means of summed weights differ in the last digit
+    # for a few histories unless both engines sum the same way
+    rng = np.random.default_rng(2024)
+    for _ in range(100):
+        daily_entries = make_random_entries(rng)
+        assert get_weekly_aggregates_numpy(
+            daily_entries, "lose"
+        ) == get_weekly_aggregates_pandas(daily_entries, "lose")
+
+
+def test_weekly_aggregates_stats(analytics_engine):
+    daily_entries = TypeAdapter(list[WeightEntry]).validate_python(
+        [
+            {
+                "entry_date": dt.date(2025, 8, 20),
+                "weight": 74.0,
+                "user_id": TEST_USER_ID,
+            },
+            {
+                "entry_date": dt.date(2025, 8, 18),
+                "weight": 73.0,
+                "user_id": TEST_USER_ID,
+            },
+            {
+                "entry_date": dt.date(2025, 8, 21),
+                "weight": 71.0,
+                "user_id": TEST_USER_ID,
+            },
+            {
+                "entry_date": dt.date(2025, 8, 19),
+                "weight": 72.0,
+                "user_id": TEST_USER_ID,
+            },
+            {
+                "entry_date": dt.date(2025, 8, 25),
+                "weight": 70.0,
+                "user_id": TEST_USER_ID,
+            },
+        ]
+    )
+
+    weekly_entries = get_weekly_aggregates(
+        daily_entries, "lose", ["median", "min", "max", "std", "count"]
+    )
+
+    assert [
+        entry.model_dump(
+            include={
+                "median_weight",
+                "min_weight",
+                "max_weight",
+                "std_weight",
+                "entries_count",
+            }
+        )
+        for entry in weekly_entries
+    ] == [
+        {
+            "median_weight": 72.5,
+            "min_weight": 71.0,
+            "max_weight": 74.0,
+            "std_weight": 1.29,
+            "entries_count": 4,
+        },
+        # Standard deviation needs at least two readings
+        {
+            "median_weight": 70.0,
+            "min_weight": 70.0,
+            "max_weight": 70.0,
+            "std_weight": None,
+            "entries_count": 1,
+        },
+    ]
+
+
+def test_weekly_aggregates_stats_only_requested(analytics_engine, sample_daily_entries):
+    weekly_entries = get_weekly_aggregates(sample_daily_entries, "lose", ["count"])
+    default_entries = get_weekly_aggregates(sample_daily_entries, "lose")
+
+    assert [entry.entries_count for entry in weekly_entries] == [5, 6, 3]
+    assert all(entry.median_weight is None for entry in weekly_entries)
+    assert "entries_count" in weekly_entries[0].model_fields_set
+    assert "median_weight" not in weekly_entries[0].model_fields_set
+    assert "entries_count" not in default_entries[0].model_fields_set
+
+
+def test_detect_outliers():
+    rng = np.random.default_rng(7)
+    weights = np.round(80 - np.arange(365) * 0.01 + rng.normal(0, 0.6, size=365), 2)
+    # Someone else stepping on the scale, including at both ends of the history
+    weights[[0, 100, 101, 364]] = [25.0, 31.5, 110.0, 24.0]
+
+    assert np.flatnonzero(detect_outliers(weights)).tolist() == [0, 100, 101, 364]
+
+
+def test_detect_outliers_keeps_weight_changes():
+    # A steady 2 kg drop followed by a sudden but lasting 3 kg jump
+    weights = np.concatenate(
+        [np.linspace(80, 78, 30), np.full(10, 81.0), np.full(10, 81.2)]
+    )
+
+    assert not detect_outliers(weights).any()
+
+
+def test_detect_outliers_short_history():
+    assert not detect_outliers(np.array([70.0, 30.0, 70.0])).any()
+    assert not detect_outliers(np.array([])).any()
+
+
+def test_split_outliers(sample_daily_entries):
+    entries = [*sample_daily_entries]
+    entries[3] = entries[3].model_copy(update={"weight": 31.2})
+    series = WeightSeries.from_entries(TEST_USER_ID, entries)
+
+    regular_series, outlier_series = split_outliers(series)
+
+    assert outlier_series.to_entries() == [entries[3]]
+    assert regular_series.to_entries() == entries[:3] + entries[4:]
+    assert split_outliers(regular_series)[0] is regular_series
+    assert len(split_outliers(regular_series)[1]) == 0
+
+
+def test_period_aggregates_weeks_match_weekly_aggregates(sample_daily_entries):
+    for goal in ["lose", "gain", "maintain"]:
+        weekly_entries = get_weekly_aggregates_pandas(sample_daily_entries, goal)
+        period_entries = get_period_aggregates(sample_daily_entries, goal, "week")
+        assert [
+            {
+                "week_start": entry.period_start,
+                **entry.model_dump(exclude={"period_start"}),
+            }
+            for entry in period_entries
+        ] == [entry.model_dump(exclude_unset=True) for entry in weekly_entries]
+
+
+def test_period_aggregates_sunday_week_start(sample_daily_entries):
+    period_entries = get_period_aggregates(
+        sample_daily_entries, "lose", "week", "sunday"
+    )
+    assert [entry.period_start for entry in period_entries] == [
+        dt.date(2025, 8, 17),
+        dt.date(2025, 8, 24),
+        dt.date(2025, 8, 31),
+    ]
+    # 2025-08-31 (Sunday) moves to the week of September
+    assert period_entries[2].avg_weight == round((72.5 + 73 + 72 + 72.5) / 4, 2)
+
+
+def test_period_aggregates_months():
+    daily_entries = [
+        WeightEntry(user_id=TEST_USER_ID, entry_date=entry_date, weight=weight)
+        for entry_date, weight in [
+            (dt.date(2025, 1, 5), 80.0),
+            (dt.date(2025, 1, 25), 79.0),
+            (dt.date(2025, 2, 10), 78.5),
+            (dt.date(2025, 4, 30), 77.0),
+        ]
+    ]
+
+    period_entries = get_period_aggregates(daily_entries, "lose", "month")
+
+    assert period_entries == [
+        PeriodAggregateEntry(
+            period_start=dt.date(2025, 1, 1),
+            avg_weight=79.5,
+            weight_change=0.0,
+            weight_change_prc=0.0,
+            net_calories=0,
+            result="negative",
+        ),
+        PeriodAggregateEntry(
+            period_start=dt.date(2025, 2, 1),
+            avg_weight=78.5,
+            weight_change=-1.0,
+            weight_change_prc=-1.26,
+            # Daily net calories over the 28 days of February
+            net_calories=round(-1.0 * 500 / 0.45 * 7 / 28),
+            result="positive",
+        ),
+        PeriodAggregateEntry(
+            period_start=dt.date(2025, 4, 1),
+            avg_weight=77.0,
+            weight_change=-1.5,
+            weight_change_prc=-1.91,
+            net_calories=round(-1.5 * 500 / 0.45 * 7 / 30),
+            result="positive",
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "period, expected_starts",
+    [
+        (
+            "day",
+            [dt.date(2024, 12, 31), dt.date(2025, 1, 1), dt.date(2025, 3, 31)],
+        ),
+        ("quarter", [dt.date(2024, 10, 1), dt.date(2025, 1, 1)]),
+    ],
+)
+def test_period_aggregates_starts(period, expected_starts):
+    series = WeightSeries.from_rows(
+        TEST_USER_ID,
+        [
+            (dt.date(2025, 3, 31), 70.0),
+            (dt.date(2024, 12, 31), 71.0),
+            (dt.date(2025, 1, 1), 70.5),
+        ],
+    )
+    period_entries = get_period_aggregates(series, "maintain", period)
+    assert [entry.period_start for entry in period_entries] == expected_starts
+
+
+def test_period_aggregates_empty_dataset():
+    assert get_period_aggregates([], "lose", "month") == []
+    assert get_period_aggregates(WeightSeries(TEST_USER_ID), "lose", "day") == []
+
+
+def test_weekly_aggregates_from_rollups(sample_daily_entries):
+    rollups = [
+        WeeklyRollup(week_start=dt.date(2025, 9, 1), weight_sum=217.5, entry_count=3),
+        WeeklyRollup(week_start=dt.date(2025, 8, 18), weight_sum=363.4, entry_count=5),
+        WeeklyRollup(week_start=dt.date(2025, 8, 25), weight_sum=440.3, entry_count=6),
+    ]
+    assert get_weekly_aggregates_from_rollups(
+        rollups, "lose"
+    ) == get_weekly_aggregates_pandas(sample_daily_entries, "lose")
+
+
+def test_weekly_aggregates_from_empty_rollups():
+    assert get_weekly_aggregates_from_rollups([], "lose") == []
+
+
+def test_progress_reports_match_single_user_analytics(sample_daily_entries):
+    other_user_entries = [
+        WeightEntry(
+            user_id=RANDOM_UUID,
+            entry_date=dt.date(2025, 8, 10) + dt.timedelta(days=day),
+            weight=round(90 - day * 0.15, 2),
+        )
+        for day in range(0, 30, 2)
+    ]
+    single_week_user = UUID("a1b2c3d4-0000-4000-8000-000000000000")
+    single_week_entries = [
+        WeightEntry(
+            user_id=single_week_user, entry_date=dt.date(2025, 9, 2), weight=65.4
+        )
+    ]
+    all_entries = sample_daily_entries + other_user_entries + single_week_entries
+    frame = pd.DataFrame([entry.model_dump() for entry in all_entries])
+
+    reports = get_progress_reports(frame, "lose")
+
+    assert set(reports) == {TEST_USER_ID, RANDOM_UUID, single_week_user}
+    for user_id, user_entries in [
+        (TEST_USER_ID, sample_daily_entries),
+        (RANDOM_UUID, other_user_entries),
+        (single_week_user, single_week_entries),
+    ]:
+        weekly_entries = get_weekly_aggregates_pandas(user_entries, "lose")
+        assert reports[user_id].weekly_data == weekly_entries
+        assert reports[user_id].metrics == get_summary(weekly_entries)
+
+
+def test_progress_reports_match_random_histories():
+    rng = np.random.default_rng(2024)
+    entries_by_user = {
+        UUID(int=user): make_random_entries(rng, UUID(int=user)) for user in range(100)
+    }
+    frame = pd.DataFrame(
+        [
+            entry.model_dump()
+            for entries in entries_by_user.values()
+            for entry in entries
+        ]
+    )
+
+    reports = get_progress_reports(frame, "lose")
+
+    for user_id, user_entries in entries_by_user.items():
+        assert reports[user_id].weekly_data == get_weekly_aggregates_pandas(
+            user_entries, "lose"
+        )
+
+
+def test_progress_reports_empty_frame():
+    frame = pd.DataFrame(columns=["user_id", "entry_date", "weight"])
+    assert get_progress_reports(frame, "lose") == {}
+
+
+def make_weeks(avg_weights, first_week=dt.date(2025, 6, 2), skip=()):
+    week_starts = [
+        first_week + dt.timedelta(weeks=week)
+        for week in range(len(avg_weights) + len(skip))
+        if week not in skip
+    ]
+    return [
+        WeeklyAggregateEntry(
+            week_start=week_start,
+            avg_weight=avg_weight,
+            weight_change=0.0,
+            weight_change_prc=0.0,
+            net_calories=0,
+            result=None,
+        )
+        for week_start, avg_weight in zip(week_starts, avg_weights)
+    ]
+
+
+def test_forecast_exact_line():
+    weekly_entries = make_weeks([80.0, 79.5, 79.0, 78.5])
+
+    fit = fit_weekly_trend(weekly_entries, window_weeks=8)
+    forecast = get_forecast(fit, 75.0)
+
+    assert fit.last_week_start == dt.date(2025, 6, 23)
+    assert fit.slope == pytest.approx(-0.5)
+    assert fit.intercept == pytest.approx(78.5)
+    assert forecast.weekly_change == -0.5
+    assert forecast.current_weight == 78.5
+    assert forecast.weeks_count == 4
+    # 3.5 kg at 0.5 kg per week
+    assert forecast.target_date == dt.date(2025, 6, 23) + dt.timedelta(weeks=7)
+    assert forecast.earliest_target_date == forecast.target_date
+    assert forecast.latest_target_date == forecast.target_date
+
+
+def test_forecast_uses_last_weeks_and_gaps():
+    weekly_entries = make_weeks([90.0, 90.0, 80.0, 79.0, 77.0], skip=(3,))
+
+    fit = fit_weekly_trend(weekly_entries, window_weeks=3)
+
+    # Last 3 weeks are at x = -3, -1, 0 because of the missing week
+    expected_slope, expected_intercept = np.polyfit([-3, -1, 0], [80, 79, 77], 1)
+    assert fit.weeks_count == 3
+    assert fit.slope == pytest.approx(expected_slope)
+    assert fit.intercept == pytest.approx(expected_intercept)
+    assert fit.slope_std_error > 0
+
+
+def test_forecast_confidence_band():
+    weekly_entries = make_weeks([80.0, 79.8, 79.1, 79.0, 78.2, 78.1, 77.4, 77.3])
+
+    forecast = get_forecast(fit_weekly_trend(weekly_entries), 75.0)
+
+    assert forecast.weekly_change_low < forecast.weekly_change
+    assert forecast.weekly_change < forecast.weekly_change_high < 0
+    assert (
+        forecast.earliest_target_date
+        < forecast.target_date
+        < forecast.latest_target_date
+    )
+
+
+@pytest.mark.parametrize(
+    "avg_weights, target_weight",
+    [
+        # Moving away from the target
+        ([80.0, 80.5, 81.0], 75.0),
+        # Flat line
+        ([80.0, 80.0, 80.0], 75.0),
+        # Target already passed
+        ([80.0, 79.0, 78.0], 79.5),
+    ],
+)
+def test_forecast_unreachable_target(avg_weights, target_weight):
+    forecast = get_forecast(fit_weekly_trend(make_weeks(avg_weights)), target_weight)
+
+    assert forecast.target_date is None
+    assert forecast.earliest_target_date is None
+    assert forecast.latest_target_date is None
+
+
+@pytest.mark.parametrize("avg_weights", [[], [80.0]])
+def test_forecast_not_enough_weeks(avg_weights):
+    assert fit_weekly_trend(make_weeks(avg_weights)) is None
+
+
+def test_batch_forecasts_match_single_user_forecasts():
+    rng = np.random.default_rng(7)
+    weekly_entries_by_user = {
+        UUID(int=user): make_weeks(
+            np.round(85 - np.arange(weeks) * 0.4 + rng.normal(0, 0.3, weeks), 2)
+        )
+        for user, weeks in enumerate([12, 6, 3, 2, 1])
+    }
+    target_weights = {user_id: 78.0 for user_id in weekly_entries_by_user}
+
+    fits = fit_weekly_trends(weekly_entries_by_user, window_weeks=8)
+    forecasts = get_forecasts(weekly_entries_by_user, target_weights, window_weeks=8)
+
+    for user_id, weekly_entries in weekly_entries_by_user.items():
+        single_fit = fit_weekly_trend(weekly_entries, window_weeks=8)
+        assert fits[user_id] == single_fit
+        assert forecasts[user_id] == (
+            get_forecast(single_fit, 78.0) if single_fit else None
+        )
+    assert forecasts[UUID(int=4)] is None
+
+
+def test_default_analytics_engine(monkeypatch):
+    monkeypatch.delenv("ANALYTICS_ENGINE", raising=False)
+    get_analytics_engine.cache_clear()
+    assert get_analytics_engine() == "pandas"
+
+
+def test_invalid_analytics_engine(monkeypatch):
+    monkeypatch.setenv("ANALYTICS_ENGINE", "polars")
+    get_analytics_engine.cache_clear()
+    with pytest.raises(ValueError):
+        get_analytics_engine()
+
+
+def test_analytics_engine_read_once(monkeypatch):
+    monkeypatch.setenv("ANALYTICS_ENGINE", "numpy")
+    get_analytics_engine.cache_clear()
+    assert get_analytics_engine() == "numpy"
+
+    monkeypatch.setenv("ANALYTICS_ENGINE", "polars")
+    assert get_analytics_engine() == "numpy"
+    get_analytics_engine.cache_clear()
+
+
 @pytest.mark.parametrize(
     "weight_change, goal, expected_result",
     [
@@ -197,6 +698,14 @@ def test_calculate_maintain_result(
     )
 
 
+@pytest.mark.parametrize("goal", ["lose", "gain", "maintain", "bulk"])
+def test_calculate_results_vectorized(goal):
+    weight_changes = np.array([0.25, 0, -0.01, -1.5, 2.5, 0.2, -0.2, 0.3])
+    assert calculate_results(weight_changes, goal) == [
+        calculate_result(change, goal) for change in weight_changes
+    ]
+
+
 def test_calculate_result_invalid_goal():
     assert calculate_result(weight_change=1.2, goal="bulk") == None
     assert calculate_result(weight_change=1.2, goal="stabiliZe") == None
@@ -0,0 +1,193 @@
+# type: ignore
+
+import asyncio
+import datetime as dt
+from uuid import UUID
+
+import pytest
+
+from app.analytics_cache import AnalyticsCache, AnalyticsQuery
+
+TEST_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
+RANDOM_UUID = UUID("5ebcce4b-e597-406e-9d93-8de7072bbc34")
+
+
+@pytest.fixture
+def cache(clock):
+    return AnalyticsCache(max_size=2, ttl_seconds=10, clock=clock)
+
+
+def weekly_query(user_id=TEST_USER_ID, weeks_limit=None):
+    return AnalyticsQuery(
+        "weekly-aggregates", user_id, "lose", dt.date(2025, 1, 6), None, weeks_limit
+    )
+
+
+def test_cache_hit_and_miss(cache, mocker):
+    compute = mocker.Mock(return_value=["week"])
+
+    assert cache.get_or_compute(weekly_query(), compute) == ["week"]
+    assert cache.get_or_compute(weekly_query(), compute) == ["week"]
+
+    compute.assert_called_once()
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+
+
+def test_cache_key_includes_query_params(cache, mocker):
+    compute = mocker.Mock(return_value=[])
+
+    cache.get_or_compute(weekly_query(), compute)
+    cache.get_or_compute(weekly_query(weeks_limit=4), compute)
+    cache.get_or_compute(AnalyticsQuery("summary", TEST_USER_ID, "lose"), compute)
+
+    assert compute.call_count == 3
+
+
+def test_cache_invalidate_user(cache, mocker):
+    compute = mocker.Mock(return_value=[])
+    other_user_compute = mocker.Mock(return_value=[])
+    cache.get_or_compute(weekly_query(), compute)
+    cache.get_or_compute(weekly_query(RANDOM_UUID), other_user_compute)
+
+    cache.invalidate(TEST_USER_ID, dt.date(2025, 1, 1))
+
+    cache.get_or_compute(weekly_query(), compute)
+    cache.get_or_compute(weekly_query(RANDOM_UUID), other_user_compute)
+    assert compute.call_count == 2
+    assert other_user_compute.call_count == 1
+    assert cache.get_data_version(TEST_USER_ID) == 1
+    assert cache.get_data_version(RANDOM_UUID) == 0
+
+
+def test_cache_skips_values_of_older_data_versions(cache, mocker):
+    compute = mocker.Mock(return_value=["week"])
+    data_version = cache.get_data_version(TEST_USER_ID)
+    # Inputs read before a mutation and calculated after it
+    cache.invalidate(TEST_USER_ID)
+
+    cache.get_or_compute(weekly_query(), compute, data_version)
+    cache.get_or_compute(weekly_query(), compute)
+
+    assert compute.call_count == 2
+    assert cache.stats().size == 1
+
+
+def test_cache_skips_values_computed_during_mutation(cache, mocker):
+    def compute():
+        cache.invalidate(TEST_USER_ID)
+        return ["week"]
+
+    cache.get_or_compute(weekly_query(), compute)
+
+    assert cache.stats().size == 0
+
+
+def test_cache_ttl_expiry(cache, clock, mocker):
+    compute = mocker.Mock(return_value=[])
+    cache.get_or_compute(weekly_query(), compute)
+
+    clock.now = 9.9
+    cache.get_or_compute(weekly_query(), compute)
+    assert compute.call_count == 1
+
+    clock.now = 10.0
+    cache.get_or_compute(weekly_query(), compute)
+    assert compute.call_count == 2
+
+
+def test_cache_expires_values_within_replica_lag(clock, mocker):
+    cache = AnalyticsCache(ttl_seconds=300, clock=clock, replica_lag_seconds=30)
+    compute = mocker.Mock(return_value=[])
+    cache.invalidate(TEST_USER_ID)
+
+    # May have been read from a replica that doesn't have the change yet
+    clock.now = 10.0
+    cache.get_or_compute(weekly_query(), compute)
+    clock.now = 29.9
+    cache.get_or_compute(weekly_query(), compute)
+    assert compute.call_count == 1
+
+    clock.now = 30.0
+    cache.get_or_compute(weekly_query(), compute)
+    clock.now = 300.0
+    cache.get_or_compute(weekly_query(), compute)
+    assert compute.call_count == 2
+
+
+def test_cache_lru_eviction(cache, mocker):
+    compute = mocker.Mock(return_value=[])
+    first, second, third = (weekly_query(weeks_limit=limit) for limit in (1, 2, 3))
+
+    cache.get_or_compute(first, compute)
+    cache.get_or_compute(second, compute)
+    # Using the first query makes the second one least recently used
+    cache.get_or_compute(first, compute)
+    cache.get_or_compute(third, compute)
+    assert cache.stats().size == 2
+
+    cache.get_or_compute(first, compute)
+    assert compute.call_count == 3
+    cache.get_or_compute(second, compute)
+    assert compute.call_count == 4
+
+
+def test_cache_get_or_compute_async(cache, mocker):
+    compute = mocker.AsyncMock(return_value=["week"])
+
+    assert asyncio.run(cache.get_or_compute_async(weekly_query(), compute)) == ["week"]
+    assert asyncio.run(cache.get_or_compute_async(weekly_query(), compute)) == ["week"]
+    # Async and sync reads share cache entries
+    assert cache.get_or_compute(weekly_query(), mocker.Mock()) == ["week"]
+
+    compute.assert_awaited_once()
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (2, 1)
+
+
+def test_cache_caches_none_values(cache, mocker):
+    compute = mocker.Mock(return_value=None)
+
+    assert cache.get_or_compute(weekly_query(), compute) is None
+    assert cache.get_or_compute(weekly_query(), compute) is None
+    compute.assert_called_once()
+
+
+def test_disabled_cache(mocker):
+    cache = AnalyticsCache(max_size=0)
+    compute = mocker.Mock(return_value=[])
+
+    cache.get_or_compute(weekly_query(), compute)
+    cache.get_or_compute(weekly_query(), compute)
+
+    assert compute.call_count == 2
+    assert cache.stats().size == 0
+
+
+def test_cache_watch_storage_once(cache, mocker):
+    storage = mocker.MagicMock()
+
+    cache.watch(storage)
+    cache.watch(storage)
+
+    storage.add_mutation_listener.assert_called_once_with(cache.invalidate)
+
+
+def test_cache_from_env(monkeypatch):
+    monkeypatch.delenv("DB_READ_CONNECTION_STRING", raising=False)
+    monkeypatch.setenv("ANALYTICS_CACHE_SIZE", "10")
+    monkeypatch.setenv("ANALYTICS_CACHE_TTL_SECONDS", "2.5")
+
+    cache = AnalyticsCache.from_env()
+
+    assert cache.max_size == 10
+    assert cache.ttl_seconds == 2.5
+    assert cache.replica_lag_seconds == 0
+
+
+def test_cache_from_env_with_replica(monkeypatch):
+    monkeypatch.setenv("DB_READ_CONNECTION_STRING", "sqlite:///replica.db")
+    assert AnalyticsCache.from_env().replica_lag_seconds == 30
+
+    monkeypatch.setenv("DB_REPLICA_LAG_SECONDS", "12.5")
+    assert AnalyticsCache.from_env().replica_lag_seconds == 12.5
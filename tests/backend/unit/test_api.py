@@ -8,19 +8,31 @@ from fastapi.testclient import TestClient
 from pydantic import TypeAdapter
 
 from app.api import (
+    can_use_weekly_rollups,
+    decode_entries_cursor,
+    encode_entries_cursor,
     get_current_user,
     get_filtered_daily_entries,
     get_filtered_weekly_entries,
+    get_filtered_weight_series,
+    get_async_data_storage,
     get_data_storage,
+    get_weekly_entries,
     NoCredentialsError,
 )
+from app.async_db_storage import AsyncDatabaseStorage
+from app.db_pool import DBPoolStats, PoolStats
+from app.db_storage import DatabaseStorage
+from app.file_storage import FileStorage
 from app.data_integration import DataSyncError, SourceFetchError, SourceNoDataError
 from app.main import app
 from app.project_types import (
     DuplicateEntryError,
     EntryNotFoundError,
     WeightEntry,
+    WeightSeries,
     WeeklyAggregateEntry,
+    WeeklyAverage,
     ProgressMetrics,
 )
 from app.utils import DEFAULT_GOAL
@@ -232,19 +244,77 @@ class TestHelperFunctions:
     def test_get_filtered_daily_entries(
         self, mocker, sample_daily_entries, date_from, date_to, expected_entries
     ) -> None:
-        mock_storage = mocker.MagicMock()
-        mock_storage.get_weight_entries.return_value = sample_daily_entries
-        app.dependency_overrides[get_data_storage] = lambda: mock_storage
+        # Date filters are applied by the storage
+        mocker.patch(
+            "app.file_storage.FileStorage._load_weights_from_file"
+        ).return_value = sample_daily_entries
+        storage = FileStorage()
+        read_entries = mocker.spy(storage, "get_weight_entries")
 
         daily_entries = get_filtered_daily_entries(
-            mock_storage, TEST_USER_ID, date_from, date_to
+            storage, TEST_USER_ID, date_from, date_to
         )
         expected_entries = TypeAdapter(list[WeightEntry]).validate_python(
             expected_entries
         )
         assert daily_entries == expected_entries
+        read_entries.assert_called_once_with(
+            TEST_USER_ID, date_from, date_to, limit=None
+        )
 
-        app.dependency_overrides.pop(get_data_storage, None)
+    def test_entries_cursor_round_trip(self):
+        cursor = encode_entries_cursor(dt.date(2025, 9, 1))
+
+        assert decode_entries_cursor(cursor) == dt.date(2025, 9, 1)
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "", "MjAyNS0xMy0wMQ=="])
+    def test_decode_invalid_entries_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_entries_cursor(cursor)
+
+    def test_get_filtered_weight_series(self, mocker, sample_daily_entries):
+        mock_storage = mocker.MagicMock()
+        mock_storage.get_weight_series.return_value = WeightSeries.from_entries(
+            TEST_USER_ID, sample_daily_entries
+        )
+
+        series = get_filtered_weight_series(
+            mock_storage, TEST_USER_ID, dt.date(2024, 10, 1), None
+        )
+
+        mock_storage.get_weight_series.assert_called_once_with(
+            TEST_USER_ID, dt.date(2024, 10, 1), None
+        )
+        assert series is mock_storage.get_weight_series.return_value
+
+    @pytest.mark.parametrize(
+        "weeks_limit, expected_date_from",
+        [
+            # Last 2 + 1 calendar weeks hold entries in every week
+            (2, dt.date(2025, 8, 18)),
+            # Some of the last 3 + 1 weeks have no entries, so all weeks are read
+            (3, None),
+        ],
+    )
+    def test_get_filtered_weight_series_weeks_limit(
+        self, mocker, sample_daily_entries_extended, weeks_limit, expected_date_from
+    ):
+        mocker.patch(
+            "app.file_storage.FileStorage._load_weights_from_file"
+        ).return_value = sample_daily_entries_extended
+        storage = FileStorage()
+        read_series = mocker.spy(storage, "get_weight_series")
+
+        series = get_filtered_weight_series(
+            storage, TEST_USER_ID, None, None, weeks_limit
+        )
+
+        assert read_series.call_args.args == (TEST_USER_ID, expected_date_from, None)
+        assert series.to_entries() == [
+            entry
+            for entry in sample_daily_entries_extended
+            if expected_date_from is None or entry.entry_date >= expected_date_from
+        ]
 
     @pytest.mark.parametrize(
         "weeks_limit, expected_entries",
@@ -347,6 +417,72 @@ class TestHelperFunctions:
         daily_entries = []
         assert get_filtered_weekly_entries(daily_entries, "lose", 2) == []
 
+    @pytest.mark.parametrize(
+        "date_from, date_to, expected",
+        [
+            (None, None, True),
+            (dt.date(2025, 8, 18), None, True),
+            (None, dt.date(2025, 8, 31), True),
+            (dt.date(2025, 8, 18), dt.date(2025, 8, 31), True),
+            (dt.date(2025, 8, 19), None, False),
+            (None, dt.date(2025, 8, 30), False),
+        ],
+    )
+    def test_can_use_weekly_rollups(self, mocker, date_from, date_to, expected):
+        db_storage = mocker.MagicMock(spec=DatabaseStorage)
+        assert can_use_weekly_rollups(db_storage, date_from, date_to) == expected
+        assert not can_use_weekly_rollups(mocker.MagicMock(), date_from, date_to)
+
+    def test_get_weekly_entries_from_database(self, mocker):
+        db_storage = mocker.MagicMock(spec=DatabaseStorage)
+        db_storage.aggregate_weekly.return_value = [
+            WeeklyAverage(
+                week_start=dt.date(2025, 8, 25),
+                avg_weight=73.375,
+                previous_avg_weight=72.5,
+            ),
+            WeeklyAverage(
+                week_start=dt.date(2025, 9, 1),
+                avg_weight=72.5,
+                previous_avg_weight=73.375,
+            ),
+        ]
+
+        weekly_entries = get_weekly_entries(
+            db_storage, TEST_USER_ID, "lose", dt.date(2025, 8, 20), None, 1
+        )
+
+        # Date range isn't made of whole weeks, so rollups can't be used
+        db_storage.get_weekly_rollups.assert_not_called()
+        db_storage.aggregate_weekly.assert_called_once_with(
+            TEST_USER_ID, dt.date(2025, 8, 20), None, 2
+        )
+        assert [
+            (week.week_start, week.avg_weight, week.weight_change, week.result)
+            for week in weekly_entries
+        ] == [
+            (dt.date(2025, 9, 1), 72.5, -0.88, "positive"),
+            (dt.date(2025, 8, 25), 73.38, 0.0, None),
+        ]
+
+    def test_get_weekly_entries_stats_read_daily_entries(
+        self, mocker, sample_daily_entries
+    ):
+        db_storage = mocker.MagicMock(spec=DatabaseStorage)
+        db_storage.get_weight_series.return_value = WeightSeries.from_entries(
+            TEST_USER_ID, sample_daily_entries
+        )
+
+        weekly_entries = get_weekly_entries(
+            db_storage, TEST_USER_ID, "lose", None, None, None, ("count",)
+        )
+
+        db_storage.aggregate_weekly.assert_not_called()
+        db_storage.get_weekly_rollups.assert_not_called()
+        assert sum(week.entries_count for week in weekly_entries) == len(
+            sample_daily_entries
+        )
+
 
 class TestAPIEndpoints:
     def mock_get_user(self):
@@ -357,7 +493,12 @@ class TestAPIEndpoints:
         "daily-entries": app.url_path_for("get_daily_entries"),
         "weekly-aggregates": app.url_path_for("get_weekly_aggregates"),
         "summary": app.url_path_for("get_summary"),
+        "aggregates": app.url_path_for("get_aggregates"),
+        "trend": app.url_path_for("get_trend"),
+        "forecast": app.url_path_for("get_forecast"),
         "sync-data": app.url_path_for("sync_data"),
+        "db-pool-metrics": app.url_path_for("get_db_pool_metrics"),
+        "analytics-cache-metrics": app.url_path_for("get_analytics_cache_metrics"),
         "post-daily-entry": app.url_path_for("create_daily_entry"),
         "delete-daily-entry": app.url_path_for("delete_daily_entry"),
     }
@@ -371,6 +512,11 @@ class TestAPIEndpoints:
         finally:
             app.dependency_overrides.clear()
 
+    @pytest.fixture
+    def admin_client(self, client):
+        client.app.state.admin_user_ids = frozenset({TEST_USER_ID})
+        return client
+
     @pytest.fixture
     def mock_storage(self, mocker):
         mock_storage = mocker.MagicMock()
@@ -394,18 +540,20 @@ class TestAPIEndpoints:
             (None, None),
         ],
     )
-    def test_get_latest_entry(self, client, mocker, latest_entry, expected_return):
-        mocker.patch("app.api.utils.get_latest_daily_entry").return_value = latest_entry
+    def test_get_latest_entry(
+        self, client, mock_storage, latest_entry, expected_return
+    ):
+        mock_storage.get_latest_weight_entry.return_value = latest_entry
 
         response = client.get(self.ENDPOINT_URLS["latest-entry"])
 
         assert response.status_code == 200
         assert response.json() == expected_return
+        mock_storage.get_latest_weight_entry.assert_called_once_with(TEST_USER_ID)
+        mock_storage.get_weight_series.assert_not_called()
 
-    def test_get_latest_entry_error(self, client, mocker):
-        mocker.patch("app.api.utils.get_latest_daily_entry").side_effect = Exception(
-            "Random Error"
-        )
+    def test_get_latest_entry_error(self, client, mock_storage):
+        mock_storage.get_latest_weight_entry.side_effect = Exception("Random Error")
 
         response = client.get(self.ENDPOINT_URLS["latest-entry"])
 
@@ -422,7 +570,13 @@ class TestAPIEndpoints:
         date_to,
         sample_weekly_entries,
     ):
-        fetch_daily_fn = mocker.patch("app.api.get_filtered_daily_entries")
+        # Analytics endpoints read the compact series instead of entry models
+        fetch_fn_name = (
+            "get_filtered_daily_entries"
+            if endpoint_name == "daily-entries"
+            else "get_filtered_weight_series"
+        )
+        fetch_daily_fn = mocker.patch(f"app.api.{fetch_fn_name}")
         mocker.patch(
             "app.api.get_filtered_weekly_entries"
         ).return_value = sample_weekly_entries
@@ -437,12 +591,15 @@ class TestAPIEndpoints:
         response = client.get(endpoint_url, params=params)
 
         assert response.status_code == 200
-        fetch_daily_fn.assert_called_once_with(
+        expected_args = [
             mock_storage,
             TEST_USER_ID,
             dt.date.fromisoformat(date_from) if date_from else None,
             dt.date.fromisoformat(date_to) if date_to else None,
-        )
+        ]
+        # No weeks_limit / page_size param
+        expected_args.append(None)
+        fetch_daily_fn.assert_called_once_with(*expected_args)
 
     def _test_weekly_aggregates_params_usage(
         self,
@@ -454,7 +611,7 @@ class TestAPIEndpoints:
         weeks_limit,
         sample_weekly_entries,
     ):
-        fetch_daily_fn = mocker.patch("app.api.get_filtered_daily_entries")
+        fetch_daily_fn = mocker.patch("app.api.get_filtered_weight_series")
         fetch_daily_fn.return_value = sample_daily_entries
         fetch_weekly_fn = mocker.patch("app.api.get_filtered_weekly_entries")
         fetch_weekly_fn.return_value = sample_weekly_entries
@@ -473,6 +630,7 @@ class TestAPIEndpoints:
             sample_daily_entries,
             params.get("goal", DEFAULT_GOAL),
             int(weeks_limit) if weeks_limit else None,
+            (),
         )
 
     @pytest.mark.parametrize("date_from, date_to", DATE_PARAMS_TEST_CASES)
@@ -564,6 +722,95 @@ class TestAPIEndpoints:
         assert response.status_code == 200
         assert response.json() == expected_return
 
+    def test_get_daily_entries_first_page(
+        self, client, mock_storage, sample_daily_entries
+    ):
+        mock_storage.get_weight_entries.return_value = sample_daily_entries[:3]
+
+        response = client.get(
+            self.ENDPOINT_URLS["daily-entries"], params={"page_size": 2}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            entry.model_dump(mode="json") for entry in sample_daily_entries[:2]
+        ]
+        assert response.headers["X-Next-Cursor"] == encode_entries_cursor(
+            dt.date(2025, 1, 12)
+        )
+        mock_storage.get_weight_entries.assert_called_once_with(
+            TEST_USER_ID, None, None, limit=3
+        )
+
+    @pytest.mark.parametrize(
+        "date_from, expected_date_from",
+        [
+            (None, dt.date(2025, 1, 13)),
+            ("2024-01-01", dt.date(2025, 1, 13)),
+            ("2025-08-01", dt.date(2025, 8, 1)),
+        ],
+    )
+    def test_get_daily_entries_next_page(
+        self,
+        client,
+        mock_storage,
+        sample_daily_entries,
+        date_from,
+        expected_date_from,
+    ):
+        mock_storage.get_weight_entries.return_value = sample_daily_entries[3:]
+        params = {
+            "page_size": 2,
+            "cursor": encode_entries_cursor(dt.date(2025, 1, 12)),
+            "date_to": "2025-12-31",
+        }
+        if date_from:
+            params["date_from"] = date_from
+
+        response = client.get(self.ENDPOINT_URLS["daily-entries"], params=params)
+
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert "X-Next-Cursor" not in response.headers
+        mock_storage.get_weight_entries.assert_called_once_with(
+            TEST_USER_ID, expected_date_from, dt.date(2025, 12, 31), limit=3
+        )
+
+    def test_get_daily_entries_pages(self, client, mocker, sample_daily_entries):
+        mocker.patch(
+            "app.file_storage.FileStorage._load_weights_from_file"
+        ).return_value = sample_daily_entries
+        app.dependency_overrides[get_data_storage] = lambda: FileStorage()
+
+        entries = []
+        params = {"page_size": 2}
+        while True:
+            response = client.get(self.ENDPOINT_URLS["daily-entries"], params=params)
+            assert response.status_code == 200
+            entries.extend(response.json())
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+        assert entries == [
+            entry.model_dump(mode="json") for entry in sample_daily_entries
+        ]
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"page_size": 0},
+            {"page_size": 1001},
+            {"cursor": encode_entries_cursor(dt.date(2025, 1, 12))},
+            {"page_size": 2, "cursor": "not-a-cursor"},
+            {"page_size": 2, "cursor": encode_entries_cursor(dt.date.max)},
+        ],
+    )
+    def test_get_daily_entries_invalid_page_params(self, client, params):
+        response = client.get(self.ENDPOINT_URLS["daily-entries"], params=params)
+
+        assert response.status_code == 422
+
     def test_get_daily_entries_invalid_dates_range(self, client):
         invalid_params = {"date_from": "2026-01-01", "date_to": "2025-12-02"}
 
@@ -597,13 +844,13 @@ class TestAPIEndpoints:
     ):
         fetch_weekly_fn = mocker.patch("app.api.get_filtered_weekly_entries")
         fetch_weekly_fn.return_value = sample_weekly_entries
-        mocker.patch("app.api.get_filtered_daily_entries")
+        mocker.patch("app.api.get_filtered_weight_series")
 
         params = {"goal": "lose", "weeks_limit": "4"}
 
         expected_return = {
             "weekly_data": [
-                entry.model_dump(mode="json")
+                entry.model_dump(mode="json", exclude_unset=True)
                 for entry in sorted(
                     sample_weekly_entries,
                     key=lambda week: week.week_start,
@@ -649,7 +896,7 @@ class TestAPIEndpoints:
         assert "detail" in response.json()
 
     def test_weekly_aggregates_exceptions(self, client, mocker):
-        mocker.patch("app.api.get_filtered_daily_entries").side_effect = Exception(
+        mocker.patch("app.api.get_filtered_weight_series").side_effect = Exception(
             "Random Error"
         )
 
@@ -658,8 +905,293 @@ class TestAPIEndpoints:
         assert response.status_code == 500
         assert "detail" in response.json()
 
+    def test_weekly_aggregates_cached(
+        self, client, mocker, mock_storage, sample_weekly_entries
+    ):
+        mocker.patch("app.api.get_filtered_weight_series")
+        fetch_weekly_fn = mocker.patch("app.api.get_filtered_weekly_entries")
+        fetch_weekly_fn.return_value = sample_weekly_entries
+        endpoint_url = self.ENDPOINT_URLS["weekly-aggregates"]
+
+        first_response = client.get(endpoint_url)
+        second_response = client.get(endpoint_url)
+
+        assert first_response.json() == second_response.json()
+        fetch_weekly_fn.assert_called_once()
+        mock_storage.add_mutation_listener.assert_called_once()
+
+        # Mutation listener registered by the cache on the storage
+        invalidate = mock_storage.add_mutation_listener.call_args.args[0]
+        invalidate(TEST_USER_ID, dt.date(2025, 9, 1))
+        client.get(endpoint_url)
+        assert fetch_weekly_fn.call_count == 2
+
+        stats = client.app.state.analytics_cache.stats()
+        assert (stats.hits, stats.misses) == (1, 2)
+
+    def test_summary_cached_under_version_of_weekly_entries(
+        self, client, mock_storage, mocker, sample_weekly_entries
+    ):
+        mocker.patch("app.api.get_filtered_weight_series")
+        fetch_weekly_fn = mocker.patch("app.api.get_filtered_weekly_entries")
+        get_summary_fn = mocker.patch("app.api.analytics.get_summary")
+        get_summary_fn.return_value = None
+
+        # A mutation lands after the weekly entries are read
+        def fetch_stale_weekly_entries(*args):
+            invalidate = mock_storage.add_mutation_listener.call_args.args[0]
+            invalidate(TEST_USER_ID, dt.date(2025, 9, 1))
+            return sample_weekly_entries
+
+        fetch_weekly_fn.side_effect = fetch_stale_weekly_entries
+        client.get(self.ENDPOINT_URLS["summary"])
+        fetch_weekly_fn.side_effect = None
+        fetch_weekly_fn.return_value = sample_weekly_entries[:1]
+        client.get(self.ENDPOINT_URLS["summary"])
+
+        # Metrics of the stale weekly entries are not served
+        assert get_summary_fn.call_count == 2
+        get_summary_fn.assert_called_with(sample_weekly_entries[:1])
+
+    def test_analytics_cache_metrics(self, admin_client):
+        admin_client.app.state.analytics_cache.hits = 3
+
+        response = admin_client.get(self.ENDPOINT_URLS["analytics-cache-metrics"])
+
+        assert response.status_code == 200
+        assert response.json()["hits"] == 3
+
+    def test_weekly_aggregates_stats(self, client, mock_storage, sample_daily_entries):
+        mock_storage.get_weight_series.return_value = WeightSeries.from_entries(
+            TEST_USER_ID, sample_daily_entries
+        )
+        mock_storage.get_weight_entries.return_value = sample_daily_entries[-1:]
+        endpoint_url = self.ENDPOINT_URLS["weekly-aggregates"]
+
+        default_response = client.get(endpoint_url)
+        stats_response = client.get(
+            endpoint_url, params={"stats": ["max", "count"], "weeks_limit": "1"}
+        )
+
+        assert stats_response.status_code == 200
+        assert "max_weight" not in default_response.json()["weekly_data"][0]
+        assert [
+            (week["week_start"], week["max_weight"], week["entries_count"])
+            for week in stats_response.json()["weekly_data"]
+        ] == [("2025-09-01", 72.0, 1), ("2025-08-25", 73.5, 2)]
+        assert "median_weight" not in stats_response.json()["weekly_data"][0]
+
+    def test_weekly_aggregates_stats_cache_key(
+        self, client, mocker, sample_weekly_entries
+    ):
+        mocker.patch("app.api.get_filtered_weight_series")
+        fetch_weekly_fn = mocker.patch("app.api.get_filtered_weekly_entries")
+        fetch_weekly_fn.return_value = sample_weekly_entries
+        endpoint_url = self.ENDPOINT_URLS["weekly-aggregates"]
+
+        client.get(endpoint_url, params={"stats": ["min", "max"]})
+        client.get(endpoint_url, params={"stats": ["max", "min", "max"]})
+        client.get(endpoint_url)
+
+        assert fetch_weekly_fn.call_count == 2
+        assert fetch_weekly_fn.call_args_list[0].args[3] == ("max", "min")
+
+    def test_weekly_aggregates_exclude_outliers(
+        self, client, mock_storage, sample_daily_entries_extended
+    ):
+        outlier = WeightEntry(
+            user_id=TEST_USER_ID, entry_date=dt.date(2025, 8, 24), weight=31.0
+        )
+        mock_storage.get_weight_series.return_value = WeightSeries.from_entries(
+            TEST_USER_ID, [*sample_daily_entries_extended, outlier]
+        )
+        endpoint_url = self.ENDPOINT_URLS["weekly-aggregates"]
+
+        default_response = client.get(endpoint_url)
+        response = client.get(endpoint_url, params={"exclude_outliers": "true"})
+        client.get(endpoint_url, params={"exclude_outliers": "true"})
+
+        assert response.status_code == 200
+        assert "outliers" not in default_response.json()
+        assert default_response.json()["weekly_data"][-1]["avg_weight"] == 65.73
+        assert response.json()["outliers"] == [outlier.model_dump(mode="json")]
+        assert response.json()["weekly_data"][-1]["avg_weight"] == 72.68
+        # Second request with outliers excluded is served from the cache
+        assert mock_storage.get_weight_series.call_count == 2
+
+    def test_weekly_aggregates_invalid_stats(self, client):
+        response = client.get(
+            self.ENDPOINT_URLS["weekly-aggregates"], params={"stats": "mode"}
+        )
+
+        assert response.status_code == 422
+
+    def test_aggregates_monthly(self, client, mock_storage, sample_daily_entries):
+        mock_storage.get_weight_series.return_value = WeightSeries.from_entries(
+            TEST_USER_ID, sample_daily_entries
+        )
+        params = {"period": "month", "periods_limit": "2", "goal": "gain"}
+
+        response = client.get(self.ENDPOINT_URLS["aggregates"], params=params)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["period"], body["week_start"], body["goal"]) == (
+            "month",
+            "monday",
+            "gain",
+        )
+        assert [period["period_start"] for period in body["data"]] == [
+            "2025-09-01",
+            "2025-08-01",
+            "2025-01-01",
+        ]
+        assert body["data"][0]["weight_change"] == -0.31
+        assert body["data"][0]["result"] == "negative"
+        # The oldest returned period is the reference point
+        assert body["data"][-1]["weight_change"] == 0.0
+        assert body["data"][-1]["result"] is None
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"period": "year"},
+            {"week_start": "tuesday"},
+            {"periods_limit": "0"},
+            {"date_from": "2025-10-02", "date_to": "2025-10-01"},
+        ],
+    )
+    def test_aggregates_invalid_params(self, client, params):
+        response = client.get(self.ENDPOINT_URLS["aggregates"], params=params)
+
+        assert response.status_code == 422
+        assert "detail" in response.json()
+
+    def test_aggregates_exceptions(self, client, mocker):
+        mocker.patch("app.api.get_filtered_weight_series").side_effect = Exception(
+            "Random Error"
+        )
+
+        response = client.get(self.ENDPOINT_URLS["aggregates"])
+
+        assert response.status_code == 500
+        assert "detail" in response.json()
+
+    def test_get_trend(self, client, mock_storage, sample_daily_entries):
+        mock_storage.get_weight_series.return_value = WeightSeries.from_entries(
+            TEST_USER_ID, sample_daily_entries
+        )
+        params = {"date_from": "2025-08-29"}
+
+        response = client.get(self.ENDPOINT_URLS["trend"], params=params)
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "trend_data": [
+                {"entry_date": "2025-08-30", "weight": 73.5, "trend": 73.39},
+                {"entry_date": "2025-09-02", "weight": 72.0, "trend": 73.25},
+            ],
+            "smoothing": 0.1,
+        }
+
+    def test_get_trend_invalid_dates(self, client):
+        params = {"date_from": "2025-10-02", "date_to": "2025-10-01"}
+
+        response = client.get(self.ENDPOINT_URLS["trend"], params=params)
+
+        assert response.status_code == 422
+
+    def test_get_trend_exceptions(self, client, mock_storage):
+        mock_storage.get_weight_series.side_effect = Exception("Random Error")
+
+        response = client.get(self.ENDPOINT_URLS["trend"])
+
+        assert response.status_code == 500
+        assert "detail" in response.json()
+
+    def test_get_forecast(self, client, mocker, mock_storage):
+        weekly_data = [
+            {
+                "week_start": week_start,
+                "avg_weight": avg_weight,
+                "weight_change": 0.0,
+                "weight_change_prc": 0.0,
+                "net_calories": 0,
+                "result": None,
+            }
+            for week_start, avg_weight in [
+                ("2025-09-15", 78.5),
+                ("2025-09-08", 79.0),
+                ("2025-09-01", 79.5),
+            ]
+        ]
+        fetch_weekly_fn = mocker.patch("app.api.get_weekly_entries")
+        fetch_weekly_fn.return_value = TypeAdapter(
+            list[WeeklyAggregateEntry]
+        ).validate_python(weekly_data)
+        params = {"target_weight": "77.5", "window_weeks": "4"}
+
+        response = client.get(self.ENDPOINT_URLS["forecast"], params=params)
+        # Another target weight reuses the cached fit
+        other_response = client.get(
+            self.ENDPOINT_URLS["forecast"], params={**params, "target_weight": "70"}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "target_weight": 77.5,
+            "current_weight": 78.5,
+            "weekly_change": -0.5,
+            "weekly_change_low": -0.5,
+            "weekly_change_high": -0.5,
+            "target_date": "2025-09-29",
+            "earliest_target_date": "2025-09-29",
+            "latest_target_date": "2025-09-29",
+            "weeks_count": 3,
+        }
+        assert other_response.json()["target_date"] == "2026-01-12"
+        fetch_weekly_fn.assert_called_once_with(
+            mock_storage, TEST_USER_ID, DEFAULT_GOAL, None, None, 4, ()
+        )
+
+    def test_get_forecast_not_enough_data(self, client, mocker):
+        mocker.patch("app.api.get_weekly_entries").return_value = []
+
+        response = client.get(
+            self.ENDPOINT_URLS["forecast"], params={"target_weight": "70"}
+        )
+
+        assert response.status_code == 200
+        assert response.json() is None
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {},
+            {"target_weight": "0"},
+            {"target_weight": "70", "window_weeks": "1"},
+            {"target_weight": "70", "window_weeks": "105"},
+        ],
+    )
+    def test_get_forecast_invalid_params(self, client, params):
+        response = client.get(self.ENDPOINT_URLS["forecast"], params=params)
+
+        assert response.status_code == 422
+
+    def test_get_forecast_exceptions(self, client, mocker):
+        mocker.patch("app.api.get_weekly_entries").side_effect = Exception(
+            "Random Error"
+        )
+
+        response = client.get(
+            self.ENDPOINT_URLS["forecast"], params={"target_weight": "70"}
+        )
+
+        assert response.status_code == 500
+        assert "detail" in response.json()
+
     def test_summary_return_value(self, client, mocker):
-        mocker.patch("app.api.get_filtered_daily_entries")
+        mocker.patch("app.api.get_filtered_weight_series")
         get_weekly_entries_fn = mocker.patch("app.api.get_filtered_weekly_entries")
         get_summary_fn = mocker.patch("app.api.analytics.get_summary")
 
@@ -693,6 +1225,15 @@ class TestAPIEndpoints:
             "latest_week": test_weekly_data[0],
         }
 
+    def test_summary_without_weekly_entries(self, client, mocker):
+        mocker.patch("app.api.get_filtered_weight_series")
+        mocker.patch("app.api.get_filtered_weekly_entries").return_value = []
+
+        response = client.get(self.ENDPOINT_URLS["summary"])
+
+        assert response.status_code == 200
+        assert response.json() == {"metrics": None, "latest_week": None}
+
     def test_summary_invalid_dates(self, client):
         params = {
             "date_from": "2025-10-02",
@@ -705,7 +1246,7 @@ class TestAPIEndpoints:
         assert "detail" in response.json()
 
     def test_summary_exceptions(self, client, mocker):
-        mocker.patch("app.api.get_filtered_daily_entries").side_effect = Exception(
+        mocker.patch("app.api.get_filtered_weight_series").side_effect = Exception(
             "Random Error"
         )
 
@@ -943,3 +1484,162 @@ class TestAPIEndpoints:
             user_id=TEST_USER_ID, entry_date=dt.date.fromisoformat(test_entry_date)
         )
         assert response.status_code == 404
+
+    def test_db_pool_metrics(self, admin_client, mock_storage, mocker):
+        db_storage = mocker.MagicMock(spec=DatabaseStorage)
+        db_storage.pool_stats.return_value = DBPoolStats(
+            primary=PoolStats(
+                pool_size=5,
+                checked_out=2,
+                overflow=0,
+                checkouts=10,
+                timeouts=0,
+                wait_seconds_total=0.5,
+                wait_seconds_max=0.1,
+            )
+        )
+        app.dependency_overrides[get_data_storage] = lambda: db_storage
+
+        response = admin_client.get(self.ENDPOINT_URLS["db-pool-metrics"])
+
+        assert response.status_code == 200
+        assert response.json() == db_storage.pool_stats.return_value.model_dump()
+
+    def test_db_pool_metrics_file_storage(self, admin_client, mock_storage):
+        response = admin_client.get(self.ENDPOINT_URLS["db-pool-metrics"])
+
+        assert response.status_code == 200
+        assert response.json() is None
+
+    def test_db_pool_metrics_requires_authentication(self, client):
+        app.dependency_overrides.pop(get_current_user)
+
+        response = client.get(self.ENDPOINT_URLS["db-pool-metrics"])
+
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize("metrics", ["db-pool-metrics", "analytics-cache-metrics"])
+    def test_metrics_require_admin_user(self, client, mock_storage, metrics):
+        response = client.get(self.ENDPOINT_URLS[metrics])
+
+        assert response.status_code == 403
+
+    @pytest.fixture
+    def async_storage(self, mocker):
+        async_storage = mocker.AsyncMock(spec=AsyncDatabaseStorage)
+        app.dependency_overrides[get_async_data_storage] = lambda: async_storage
+        yield async_storage
+        app.dependency_overrides.pop(get_async_data_storage, None)
+
+    @pytest.fixture
+    def sample_weekly_averages(self):
+        return [
+            WeeklyAverage(
+                week_start=dt.date(2025, 8, 25),
+                avg_weight=73.375,
+                previous_avg_weight=None,
+            ),
+            WeeklyAverage(
+                week_start=dt.date(2025, 9, 1),
+                avg_weight=72.5,
+                previous_avg_weight=73.375,
+            ),
+        ]
+
+    def test_get_daily_entries_async_storage(
+        self, client, mock_storage, async_storage, sample_daily_entries
+    ):
+        async_storage.get_weight_entries.return_value = sample_daily_entries
+
+        response = client.get(
+            self.ENDPOINT_URLS["daily-entries"], params={"date_from": "2025-08-01"}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            entry.model_dump(mode="json") for entry in sample_daily_entries
+        ]
+        async_storage.get_weight_entries.assert_awaited_once_with(
+            TEST_USER_ID, dt.date(2025, 8, 1), None, limit=None
+        )
+        mock_storage.get_weight_entries.assert_not_called()
+
+    def test_weekly_aggregates_async_storage(
+        self, client, mock_storage, async_storage, sample_weekly_averages
+    ):
+        async_storage.aggregate_weekly.return_value = sample_weekly_averages
+
+        response = client.get(
+            self.ENDPOINT_URLS["weekly-aggregates"],
+            params={"date_from": "2025-08-26", "weeks_limit": "1"},
+        )
+
+        assert response.status_code == 200
+        assert [week["week_start"] for week in response.json()["weekly_data"]] == [
+            "2025-09-01",
+            "2025-08-25",
+        ]
+        async_storage.aggregate_weekly.assert_awaited_once_with(
+            TEST_USER_ID, dt.date(2025, 8, 26), None, 2
+        )
+        async_storage.get_weekly_rollups.assert_not_awaited()
+        mock_storage.get_weight_series.assert_not_called()
+
+    def test_weekly_aggregates_async_storage_rollups(
+        self, client, mock_storage, async_storage
+    ):
+        async_storage.get_weekly_rollups.return_value = []
+
+        response = client.get(
+            self.ENDPOINT_URLS["weekly-aggregates"], params={"date_from": "2025-08-25"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["weekly_data"] == []
+        async_storage.get_weekly_rollups.assert_awaited_once_with(
+            TEST_USER_ID, week_from=dt.date(2025, 8, 25), week_to=None
+        )
+        async_storage.aggregate_weekly.assert_not_awaited()
+
+    def test_weekly_aggregates_stats_use_sync_storage(
+        self, client, mock_storage, async_storage, sample_daily_entries
+    ):
+        mock_storage.get_weight_series.return_value = WeightSeries.from_entries(
+            TEST_USER_ID, sample_daily_entries
+        )
+
+        response = client.get(
+            self.ENDPOINT_URLS["weekly-aggregates"], params={"stats": ["count"]}
+        )
+
+        assert response.status_code == 200
+        mock_storage.get_weight_series.assert_called_once()
+        async_storage.get_weight_series.assert_not_awaited()
+        async_storage.aggregate_weekly.assert_not_awaited()
+
+    def test_summary_async_storage(
+        self, client, mock_storage, async_storage, sample_weekly_averages
+    ):
+        async_storage.get_weekly_rollups.return_value = []
+        async_storage.aggregate_weekly.return_value = sample_weekly_averages
+
+        response = client.get(
+            self.ENDPOINT_URLS["summary"], params={"date_from": "2025-08-26"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["latest_week"]["week_start"] == "2025-09-01"
+        async_storage.aggregate_weekly.assert_awaited_once()
+        mock_storage.get_weight_series.assert_not_called()
+
+    def test_get_latest_entry_async_storage(
+        self, client, mock_storage, async_storage, sample_daily_entries
+    ):
+        async_storage.get_latest_weight_entry.return_value = sample_daily_entries[-1]
+
+        response = client.get(self.ENDPOINT_URLS["latest-entry"])
+
+        assert response.status_code == 200
+        assert response.json() == sample_daily_entries[-1].model_dump(mode="json")
+        async_storage.get_latest_weight_entry.assert_awaited_once_with(TEST_USER_ID)
+        mock_storage.get_latest_weight_entry.assert_not_called()
@@ -0,0 +1,70 @@
+# type: ignore
+
+import datetime as dt
+import os
+
+import numpy as np
+import pytest
+
+from app.columnar import ColumnarFormatError, read_columns, write_columns
+
+
+@pytest.fixture
+def columnar_path(tmp_path):
+    return tmp_path / "users" / "user.bin"
+
+
+@pytest.mark.parametrize("entries_count", [0, 1, 2, 5])
+def test_write_and_read_columns(columnar_path, entries_count):
+    first_day = dt.date(2025, 9, 1).toordinal()
+    day_ordinals = np.arange(first_day, first_day + entries_count)
+    weights = np.linspace(70.0, 72.5, entries_count)
+
+    write_columns(columnar_path, day_ordinals, weights)
+    read_day_ordinals, read_weights = read_columns(columnar_path)
+
+    assert read_day_ordinals.tolist() == day_ordinals.tolist()
+    assert read_weights.tolist() == weights.tolist()
+    # Weights stay 8-byte aligned after an odd number of day ordinals
+    assert read_weights.flags.aligned
+    assert not read_weights.flags.writeable
+    assert not columnar_path.with_name(".user.bin.tmp").exists()
+
+
+@pytest.mark.skipif(
+    not os.path.isdir("/proc/self/fd"), reason="Lists open file descriptors"
+)
+def test_read_columns_closes_file(tmp_path):
+    paths = [tmp_path / f"user{index}.bin" for index in range(10)]
+    for path in paths:
+        write_columns(path, [1, 2], [70.0, 71.0])
+    open_fds_count = len(os.listdir("/proc/self/fd"))
+
+    columns = [read_columns(path) for path in paths]
+
+    assert len(columns) == len(paths)
+    assert len(os.listdir("/proc/self/fd")) == open_fds_count
+
+
+def test_write_columns_length_mismatch(columnar_path):
+    with pytest.raises(ValueError):
+        write_columns(columnar_path, [1, 2], [70.0])
+
+
+@pytest.mark.parametrize("truncate_by", [1, 8])
+def test_read_truncated_columns(columnar_path, truncate_by):
+    write_columns(columnar_path, [1, 2, 3], [70.0, 71.0, 72.0])
+    data = columnar_path.read_bytes()
+    columnar_path.write_bytes(data[:-truncate_by])
+
+    with pytest.raises(ColumnarFormatError):
+        read_columns(columnar_path)
+
+
+def test_read_invalid_magic(columnar_path):
+    write_columns(columnar_path, [1], [70.0])
+    data = columnar_path.read_bytes()
+    columnar_path.write_bytes(b"XXXX" + data[4:])
+
+    with pytest.raises(ColumnarFormatError):
+        read_columns(columnar_path)
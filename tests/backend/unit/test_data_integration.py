@@ -42,6 +42,16 @@ def sample_daily_entries():
     return TypeAdapter(list[WeightEntry]).validate_python(data)
 
 
+@pytest.fixture
+def file_service(mocker, sample_daily_entries):
+    mocker.patch(
+        "app.file_storage.FileStorage._load_weights_from_file"
+    ).return_value = sample_daily_entries
+    service = DataIntegrationService(FileStorage(), mocker.Mock())
+    mocker.patch.object(service.storage, "save")
+    return service
+
+
 def test_refresh_no_raw_data_found(mocker, service):
     mocker.patch(
         "app.data_integration.DataIntegrationService.convert_to_daily_entries",
@@ -100,25 +110,19 @@ def test_refresh_no_raw_data_found(mocker, service):
         ],
     ],
 )
-def test_refresh_no_new_data(mocker, service, sample_daily_entries, test_entries):
+def test_refresh_no_new_data(mocker, file_service, test_entries):
     test_entries = TypeAdapter(list[WeightEntry]).validate_python(test_entries)
     mocker.patch(
         "app.data_integration.DataIntegrationService.convert_to_daily_entries"
     ).return_value = test_entries
-    existing_entries = [
-        entry for entry in sample_daily_entries if entry.user_id == TEST_USER_ID
-    ]
-    mocker.patch(
-        "app.data_integration.DataIntegrationService.get_existing_weight_entries"
-    ).return_value = existing_entries
-    mock_store_data = mocker.patch(
-        "app.data_integration.DataIntegrationService.store_new_weight_entries"
-    )
+    read_entries = mocker.spy(file_service.storage, "get_weight_entries")
 
-    new_entries = service.refresh_weight_entries(TEST_USER_ID)
+    new_entries = file_service.refresh_weight_entries(TEST_USER_ID)
 
-    mock_store_data.assert_called_once_with(TEST_USER_ID, [])
+    # Existing entries are skipped by the storage without reading the history
+    read_entries.assert_not_called()
     assert new_entries == []
+    assert len(file_service.storage.get_weight_entries(TEST_USER_ID)) == 3
 
 
 @pytest.mark.parametrize(
@@ -198,9 +202,7 @@ def test_refresh_no_new_data(mocker, service, sample_daily_entries, test_entries
         ),
     ],
 )
-def test_refresh_new_data(
-    mocker, service, sample_daily_entries, test_entries, expected_new_entries
-):
+def test_refresh_new_data(mocker, file_service, test_entries, expected_new_entries):
     test_entries = TypeAdapter(list[WeightEntry]).validate_python(test_entries)
     expected_new_entries = TypeAdapter(list[WeightEntry]).validate_python(
         expected_new_entries
@@ -208,32 +210,20 @@ def test_refresh_new_data(
     mocker.patch(
         "app.data_integration.DataIntegrationService.convert_to_daily_entries"
     ).return_value = test_entries
-    existing_entries = [
-        entry for entry in sample_daily_entries if entry.user_id == TEST_USER_ID
-    ]
-    mocker.patch(
-        "app.data_integration.DataIntegrationService.get_existing_weight_entries"
-    ).return_value = existing_entries
-    mock_store_data = mocker.patch(
-        "app.data_integration.DataIntegrationService.store_new_weight_entries"
-    )
+    read_entries = mocker.spy(file_service.storage, "get_weight_entries")
 
-    new_entries = service.refresh_weight_entries(TEST_USER_ID)
+    new_entries = file_service.refresh_weight_entries(TEST_USER_ID)
 
-    mock_store_data.assert_called_once_with(TEST_USER_ID, expected_new_entries)
+    read_entries.assert_not_called()
     assert new_entries == expected_new_entries
+    stored_entries = file_service.storage.get_weight_entries(TEST_USER_ID)
+    assert all(entry in stored_entries for entry in expected_new_entries)
 
 
 # Disabled for now - it makes no sense to store data in temporary files on a cloud service
 # def test_refresh_with_store_raw_copy_on(mocker, service):
 #     mocker.patch("app.data_integration.DataIntegrationService.get_raw_data")
 #     mocker.patch("app.data_integration.DataIntegrationService.convert_to_daily_entries")
-#     mocker.patch(
-#         "app.data_integration.DataIntegrationService.get_existing_weight_entries"
-#     )
-#     mocker.patch(
-#         "app.data_integration.DataIntegrationService.filter_new_weight_entries"
-#     )
 #     mocker.patch("app.data_integration.DataIntegrationService.store_new_weight_entries")
 #     mock_store_raw_copy_fn = mocker.patch(
 #         "app.data_integration.DataIntegrationService.store_raw_data"
@@ -296,139 +286,18 @@ def test_convert_to_daily_entries_empty_dataset(mocker, service):
     mock_source_fn.assert_called_once_with(test_raw_data)
 
 
-def test_get_existing_weight_entries(mocker, service, sample_daily_entries):
-    existing_entries = [
-        entry for entry in sample_daily_entries if entry.user_id == TEST_USER_ID
-    ]
-    mock_storage_fn = mocker.patch.object(service.storage, "get_weight_entries")
-    mock_storage_fn.return_value = existing_entries
-
-    result = service.get_existing_weight_entries(TEST_USER_ID)
-
-    mock_storage_fn.assert_called_once()
-    assert result == existing_entries
-
-
-@pytest.mark.parametrize(
-    "test_entries, expected_filtered_entries",
-    [
-        (
-            [
-                {
-                    "entry_date": dt.date(2025, 9, 20),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-            ],
-            [
-                {
-                    "entry_date": dt.date(2025, 9, 20),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-            ],
-        ),
-        (
-            [
-                {
-                    "entry_date": dt.date(2025, 8, 28),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 8, 29),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-            ],
-            [],
-        ),
-        (
-            [
-                {
-                    "entry_date": dt.date(2025, 1, 5),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 8, 28),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 8, 29),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 8, 30),
-                    "weight": 72.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 8, 30),
-                    "weight": 72.9,
-                    "user_id": RANDOM_UUID,
-                },
-                {
-                    "entry_date": dt.date(2025, 9, 28),
-                    "weight": 71.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 9, 28),
-                    "weight": 71.9,
-                    "user_id": RANDOM_UUID,
-                },
-            ],
-            [
-                {
-                    "entry_date": dt.date(2025, 1, 5),
-                    "weight": 70.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 8, 30),
-                    "weight": 72.9,
-                    "user_id": TEST_USER_ID,
-                },
-                {
-                    "entry_date": dt.date(2025, 9, 28),
-                    "weight": 71.9,
-                    "user_id": TEST_USER_ID,
-                },
-            ],
-        ),
-    ],
-)
-def test_filter_new_weight_entries(
-    mocker, service, test_entries, sample_daily_entries, expected_filtered_entries
-):
-    existing_entries = [
-        entry for entry in sample_daily_entries if entry.user_id == TEST_USER_ID
-    ]
-    mocker.patch.object(
-        service, "get_existing_weight_entries"
-    ).return_value = existing_entries
-
-    test_entries = TypeAdapter(list[WeightEntry]).validate_python(test_entries)
-    filtered_new_entries = service.filter_new_weight_entries(TEST_USER_ID, test_entries)
-
-    expected_filtered_entries = TypeAdapter(list[WeightEntry]).validate_python(
-        expected_filtered_entries
-    )
-    assert filtered_new_entries == expected_filtered_entries
-
-
 def test_store_new_weight_entries(mocker, service, sample_daily_entries):
     test_user_daily_entries = [
         entry for entry in sample_daily_entries if entry.user_id == TEST_USER_ID
     ]
     mock_storage_fn = mocker.patch.object(service.storage, "create_weight_entries")
 
-    service.store_new_weight_entries(TEST_USER_ID, test_user_daily_entries)
+    # Entries of other users are not stored
+    new_entries = service.store_new_weight_entries(TEST_USER_ID, sample_daily_entries)
 
-    mock_storage_fn.assert_called_once_with(test_user_daily_entries)
+    mock_storage_fn.assert_called_once()
+    assert list(mock_storage_fn.call_args.args[0]) == test_user_daily_entries
+    assert new_entries == mock_storage_fn.return_value
 
 
 def test_store_new_weight_entries_with_persist_command(mocker, sample_daily_entries):
@@ -442,5 +311,5 @@ def test_store_new_weight_entries_with_persist_command(mocker, sample_daily_entr
 
     service.store_new_weight_entries(TEST_USER_ID, test_user_daily_entries)
 
-    mock_storage_fn.assert_called_once_with(test_user_daily_entries)
+    assert list(mock_storage_fn.call_args.args[0]) == test_user_daily_entries
     mock_persist_fn.assert_called_once()
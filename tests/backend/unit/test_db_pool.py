@@ -0,0 +1,96 @@
+# type: ignore
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.db_pool import MeasuredQueuePool, get_pool_options_from_env
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=MeasuredQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.5,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_pool_stats_checkouts(engine):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        stats = engine.pool.stats()
+        assert (stats.pool_size, stats.checked_out, stats.overflow) == (1, 1, 0)
+
+    with engine.connect(), engine.connect():
+        stats = engine.pool.stats()
+        assert (stats.checked_out, stats.overflow) == (2, 1)
+
+    stats = engine.pool.stats()
+    assert stats.checked_out == 0
+    assert stats.checkouts == 3
+    assert stats.timeouts == 0
+    assert 0 <= stats.wait_seconds_max <= stats.wait_seconds_total
+
+
+def test_pool_stats_timeout(engine):
+    with engine.connect(), engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = engine.pool.stats()
+    assert (stats.checkouts, stats.timeouts) == (2, 1)
+
+
+def test_pool_stats_wait_time(engine):
+    released = threading.Event()
+
+    def hold_connection(connection):
+        released.wait(1)
+        connection.close()
+
+    first, second = engine.connect(), engine.connect()
+    holder = threading.Thread(target=hold_connection, args=(first,))
+    holder.start()
+    threading.Timer(0.02, released.set).start()
+
+    # Pool is exhausted until the other thread returns its connection
+    with engine.connect():
+        pass
+    holder.join()
+    second.close()
+
+    assert engine.pool.stats().wait_seconds_max >= 0.01
+
+
+def test_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_MAX_OVERFLOW", "30")
+    monkeypatch.setenv("DB_POOL_TIMEOUT_SECONDS", "2.5")
+    monkeypatch.setenv("DB_POOL_RECYCLE_SECONDS", "1800")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+
+    options = get_pool_options_from_env()
+
+    assert options == {
+        "pool_size": 20,
+        "max_overflow": 30,
+        "pool_timeout": 2.5,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+
+
+def test_pool_options_defaults(monkeypatch):
+    for name in ("DB_POOL_SIZE", "DB_POOL_MAX_OVERFLOW", "DB_POOL_PRE_PING"):
+        monkeypatch.delenv(name, raising=False)
+
+    options = get_pool_options_from_env()
+
+    assert (options["pool_size"], options["max_overflow"]) == (5, 10)
+    assert options["pool_pre_ping"] is False
@@ -1,6 +1,7 @@
 import copy
 import datetime as dt
 import json
+import threading
 from uuid import UUID
 
 import pytest
@@ -8,12 +9,17 @@ from google.oauth2.credentials import Credentials
 from sqlalchemy import func
 from sqlmodel import create_engine, select, SQLModel, Session
 
+from app.analytics import (
+    get_weekly_aggregates_from_averages,
+    get_weekly_aggregates_numpy,
+)
 from app.db_storage import (
     DatabaseStorage,
+    DBWeeklyRollup,
     DBWeightEntry,
     DBGoogleCredentials,
 )
-from app.project_types import EntryNotFoundError, WeightEntry
+from app.project_types import EntryNotFoundError, WeightEntry, WeightSeries
 
 TEST_DB_CONN_STRING = (
     "postgresql+psycopg2://postgres@localhost:5432/test_weight_tracker"
@@ -91,7 +97,9 @@ def storage_sample(sample_daily_entries):
     SQLModel.metadata.create_all(engine)
     try:
         _insert_daily_entries(engine, sample_daily_entries)
-        yield DatabaseStorage()
+        storage = DatabaseStorage()
+        storage.rebuild_weekly_rollups()
+        yield storage
     finally:
         SQLModel.metadata.drop_all(engine)
 
@@ -187,6 +195,99 @@ def test_get_weight_entries(storage_sample, sample_daily_entries):
     ) in [(entry.user_id, entry.entry_date, entry.weight) for entry in results]
 
 
+def test_get_weight_series(storage_sample, sample_daily_entries):
+    expected_rows = sorted(
+        (entry["entry_date"], entry["weight"])
+        for entry in sample_daily_entries
+        if entry["user_id"] == TEST_USER_ID
+    )
+    series = storage_sample.get_weight_series(TEST_USER_ID)
+    assert series.user_id == TEST_USER_ID
+    assert list(series) == expected_rows
+
+
+def test_get_weight_series_date_range(storage_sample):
+    series = storage_sample.get_weight_series(
+        TEST_USER_ID, date_from=dt.date(2025, 8, 30), date_to=dt.date(2025, 9, 2)
+    )
+    assert list(series) == [
+        (dt.date(2025, 8, 30), 73.5),
+        (dt.date(2025, 9, 1), 73.0),
+        (dt.date(2025, 9, 2), 72.0),
+    ]
+
+
+def test_get_weight_entries_pushdown(storage_sample):
+    entries = storage_sample.get_weight_entries(
+        TEST_USER_ID,
+        date_from=dt.date(2025, 8, 28),
+        date_to=dt.date(2025, 9, 1),
+        order="desc",
+        limit=2,
+    )
+    assert [(entry.entry_date, entry.weight) for entry in entries] == [
+        (dt.date(2025, 9, 1), 73.0),
+        (dt.date(2025, 8, 30), 73.5),
+    ]
+
+
+def test_aggregate_weekly(storage_sample, sample_daily_entries):
+    averages = storage_sample.aggregate_weekly(TEST_USER_ID)
+
+    assert [
+        (
+            average.week_start,
+            round(average.avg_weight, 2),
+            average.previous_avg_weight and round(average.previous_avg_weight, 2),
+        )
+        for average in averages
+    ] == [
+        (dt.date(2025, 8, 18), 72.68, None),
+        (dt.date(2025, 8, 25), 73.38, 72.68),
+        (dt.date(2025, 9, 1), 72.5, 73.38),
+    ]
+
+    # Same weekly aggregates as calculated in Python from daily entries
+    series = WeightSeries.from_entries(
+        TEST_USER_ID,
+        (
+            WeightEntry.model_validate(entry)
+            for entry in sample_daily_entries
+            if entry["user_id"] == TEST_USER_ID
+        ),
+    )
+    for goal in ["lose", "gain", "maintain"]:
+        assert get_weekly_aggregates_from_averages(
+            averages, goal
+        ) == get_weekly_aggregates_numpy(series, goal)
+
+
+def test_aggregate_weekly_limit_and_dates(storage_sample):
+    averages = storage_sample.aggregate_weekly(
+        TEST_USER_ID, date_from=dt.date(2025, 8, 20), weeks_limit=2
+    )
+
+    # The oldest returned week still has the average of the week before it
+    assert [
+        (average.week_start, average.previous_avg_weight is not None)
+        for average in averages
+    ] == [(dt.date(2025, 8, 25), True), (dt.date(2025, 9, 1), True)]
+    assert averages[0].previous_avg_weight == pytest.approx(72.5)
+
+
+def test_aggregate_weekly_no_entries(storage_sample):
+    assert storage_sample.aggregate_weekly(UUID(int=1)) == []
+
+
+def test_get_latest_weight_entry(storage_sample):
+    latest_entry = storage_sample.get_latest_weight_entry(TEST_USER_ID)
+
+    assert latest_entry == WeightEntry(
+        user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 3), weight=72.5
+    )
+    assert storage_sample.get_latest_weight_entry(UUID(int=1)) is None
+
+
 def test_get_weight_entry(storage_sample, sample_daily_entries):
     existing_entry = sample_daily_entries[0]
     result = storage_sample.get_weight_entry(
@@ -229,10 +330,223 @@ def test_delete_entry(storage_sample, sample_daily_entries):
         assert result is None
 
 
+def test_mutation_listeners(mocker, storage_empty, sample_daily_entries):
+    listener = mocker.Mock()
+    storage_empty.add_mutation_listener(listener)
+
+    storage_empty.create_weight_entries(
+        [WeightEntry.model_validate(entry) for entry in sample_daily_entries]
+    )
+    storage_empty.create_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1), 72.1)
+    storage_empty.update_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1), 72.4)
+    storage_empty.delete_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1))
+
+    assert listener.call_args_list == [
+        mocker.call(TEST_USER_ID, dt.date(2025, 8, 18)),
+        mocker.call(RANDOM_UUID, dt.date(2025, 8, 30)),
+        mocker.call(TEST_USER_ID, dt.date(2025, 10, 1)),
+        mocker.call(TEST_USER_ID, dt.date(2025, 10, 1)),
+        mocker.call(TEST_USER_ID, dt.date(2025, 10, 1)),
+    ]
+
+
+def test_no_mutation_notification_on_failure(mocker, storage_sample):
+    listener = mocker.Mock()
+    storage_sample.add_mutation_listener(listener)
+
+    with pytest.raises(EntryNotFoundError):
+        storage_sample.delete_weight_entry(TEST_USER_ID, dt.date(1990, 1, 1))
+
+    listener.assert_not_called()
+
+
+def _get_rollup(user_id, week_start):
+    engine = create_engine(TEST_DB_CONN_STRING)
+    with Session(engine) as session:
+        return session.get(DBWeeklyRollup, (user_id, week_start))
+
+
+def test_rebuild_weekly_rollups(storage_sample):
+    rollups = storage_sample.get_weekly_rollups(TEST_USER_ID)
+
+    assert [rollup.week_start for rollup in rollups] == [
+        dt.date(2025, 8, 18),
+        dt.date(2025, 8, 25),
+        dt.date(2025, 9, 1),
+    ]
+    assert [rollup.entry_count for rollup in rollups] == [5, 6, 3]
+    assert rollups[0].weight_sum == pytest.approx(363.4)
+
+
+def test_get_weekly_rollups_date_range(storage_sample):
+    rollups = storage_sample.get_weekly_rollups(
+        TEST_USER_ID, week_from=dt.date(2025, 8, 25), week_to=dt.date(2025, 8, 25)
+    )
+    assert [rollup.week_start for rollup in rollups] == [dt.date(2025, 8, 25)]
+
+
+def test_create_weight_entries_updates_rollups(storage_empty, sample_daily_entries):
+    test_user_daily_entries = [
+        WeightEntry.model_validate(entry)
+        for entry in sample_daily_entries
+        if entry["user_id"] == TEST_USER_ID
+    ]
+    storage_empty.create_weight_entries(test_user_daily_entries)
+
+    rollup = _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1))
+    assert rollup.entry_count == 3
+    assert rollup.weight_sum == pytest.approx(217.5)
+
+
+def test_create_weight_entries_skips_existing(storage_sample):
+    entries = [
+        WeightEntry(user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 1), weight=80.0),
+        WeightEntry(user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 4), weight=74.5),
+        WeightEntry(user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 4), weight=81.0),
+    ]
+
+    inserted_entries = storage_sample.create_weight_entries(entries)
+
+    assert inserted_entries == [entries[1]]
+    assert (
+        storage_sample.get_weight_entry(TEST_USER_ID, dt.date(2025, 9, 1)).weight
+        == 73.0
+    )
+    # Skipped entries don't change the rollup
+    rollup = _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1))
+    assert rollup.entry_count == 4
+    assert rollup.weight_sum == pytest.approx(292.0)
+
+
+def test_create_weight_entries_in_chunks(storage_empty, sample_daily_entries, mocker):
+    mocker.patch("app.db_storage.BULK_INSERT_CHUNK_SIZE", 2)
+    test_user_daily_entries = [
+        WeightEntry.model_validate(entry)
+        for entry in sample_daily_entries
+        if entry["user_id"] == TEST_USER_ID
+    ]
+
+    inserted_entries = storage_empty.create_weight_entries(test_user_daily_entries)
+
+    assert sorted(inserted_entries, key=lambda entry: entry.entry_date) == (
+        test_user_daily_entries
+    )
+    assert storage_empty.get_weight_entries(TEST_USER_ID) == test_user_daily_entries
+
+
+def test_create_weight_entry_updates_rollup(storage_sample):
+    storage_sample.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 4), 74.5)
+
+    rollup = _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1))
+    assert rollup.entry_count == 4
+    assert rollup.weight_sum == pytest.approx(292.0)
+
+
+def test_update_entry_updates_rollup(storage_sample):
+    storage_sample.update_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 73.0)
+
+    rollup = _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1))
+    assert rollup.entry_count == 3
+    assert rollup.weight_sum == pytest.approx(218.5)
+
+
+def test_delete_entry_updates_rollup(storage_sample):
+    storage_sample.delete_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2))
+
+    rollup = _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1))
+    assert rollup.entry_count == 2
+    assert rollup.weight_sum == pytest.approx(145.5)
+
+
+def test_delete_last_week_entry_removes_rollup(storage_sample):
+    for day in [1, 2, 3]:
+        storage_sample.delete_weight_entry(TEST_USER_ID, dt.date(2025, 9, day))
+
+    assert _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1)) is None
+    assert _get_rollup(RANDOM_UUID, dt.date(2025, 9, 1)) is not None
+
+
+@pytest.mark.parametrize(
+    "mutation",
+    [
+        lambda storage: storage.update_weight_entry(
+            TEST_USER_ID, dt.date(2025, 9, 2), 75.0
+        ),
+        lambda storage: storage.delete_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2)),
+    ],
+)
+def test_concurrent_update_keeps_rollups(storage_sample, mocker, mutation):
+    other_storage = DatabaseStorage()
+    other_update = threading.Thread(
+        target=other_storage.update_weight_entry,
+        args=(TEST_USER_ID, dt.date(2025, 9, 2), 80.0),
+    )
+    get = Session.get
+
+    # The other update runs after the first read of the entry. On Postgres it
+    # waits for the row lock, on SQLite it changes the weight that was read
+    def get_then_update(session, *args, **kwargs):
+        entry = get(session, *args, **kwargs)
+        if other_update.ident is None:
+            other_update.start()
+            other_update.join(timeout=0.5)
+        return entry
+
+    mocker.patch.object(Session, "get", get_then_update)
+    mutation(storage_sample)
+    other_update.join()
+    mocker.stopall()
+
+    entries = storage_sample.get_weight_entries(
+        TEST_USER_ID, dt.date(2025, 9, 1), dt.date(2025, 9, 7)
+    )
+    rollup = _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1))
+    assert rollup.entry_count == len(entries)
+    assert rollup.weight_sum == pytest.approx(sum(entry.weight for entry in entries))
+    other_storage.close_connection()
+
+
+def test_concurrent_deletes_subtract_once(storage_sample, mocker):
+    other_storage = DatabaseStorage()
+    outcomes = []
+
+    def delete(storage):
+        try:
+            storage.delete_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2))
+            outcomes.append("deleted")
+        except EntryNotFoundError:
+            outcomes.append("not found")
+
+    other_delete = threading.Thread(target=delete, args=(other_storage,))
+    get = Session.get
+
+    def get_then_delete(session, *args, **kwargs):
+        entry = get(session, *args, **kwargs)
+        if other_delete.ident is None:
+            other_delete.start()
+            other_delete.join(timeout=0.5)
+        return entry
+
+    mocker.patch.object(Session, "get", get_then_delete)
+    delete(storage_sample)
+    other_delete.join()
+    mocker.stopall()
+
+    assert sorted(outcomes) == ["deleted", "not found"]
+    rollup = _get_rollup(TEST_USER_ID, dt.date(2025, 9, 1))
+    assert rollup.entry_count == 2
+    assert rollup.weight_sum == pytest.approx(145.5)
+    other_storage.close_connection()
+
+
 def test_empty_get_weight_entries(storage_empty):
     assert len(storage_empty.get_weight_entries(TEST_USER_ID)) == 0
 
 
+def test_empty_get_weight_series(storage_empty):
+    assert len(storage_empty.get_weight_series(TEST_USER_ID)) == 0
+
+
 def test_get_nonexistent_weight_entry(storage_sample):
     result = storage_sample.get_weight_entry(TEST_USER_ID, dt.date(1900, 1, 1))
     assert result is None
@@ -386,3 +700,18 @@ def test_load_nonexisting_credentials(storage_empty, monkeypatch):
     monkeypatch.setenv("GOOGLE_CLIENT_SECRET", "ddd11")
     result = storage_empty.load_google_credentials(TEST_USER_ID)
     assert result is None
+
+
+def test_pool_stats(storage_sample):
+    storage_sample.get_weight_entries(TEST_USER_ID)
+
+    stats = storage_sample.pool_stats()
+    assert stats.primary.checked_out == 0
+    assert stats.primary.checkouts >= 1
+    assert stats.replica is None
+
+
+def test_pool_stats_without_measured_pool(storage_empty, mocker):
+    mocker.patch.object(storage_empty, "_engine", mocker.MagicMock())
+
+    assert storage_empty.pool_stats() is None
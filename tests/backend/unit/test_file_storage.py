@@ -2,6 +2,8 @@
 
 import datetime as dt
 import json
+import threading
+import time
 from pathlib import Path
 from uuid import UUID
 
@@ -9,8 +11,11 @@ import pytest
 from google.oauth2.credentials import Credentials
 from pydantic import TypeAdapter, ValidationError
 
+from app.columnar import read_columns
 from app.file_storage import FileStorage
+from app.manage import main
 from app.project_types import EntryNotFoundError, WeightEntry
+from app.wal import WalRecord, WriteAheadLog
 
 
 TEST_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
@@ -193,6 +198,383 @@ class TestWeightStorageProtocol:
         ]
         assert sample_storage.get_weight_entries(TEST_USER_ID) == expected_entries
 
+    def test_get_weight_series(self, sample_storage, sample_weight_entries):
+        expected_entries = sorted(
+            (entry for entry in sample_weight_entries if entry.user_id == TEST_USER_ID),
+            key=lambda entry: entry.entry_date,
+        )
+        series = sample_storage.get_weight_series(TEST_USER_ID)
+        assert series.to_entries() == expected_entries
+
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_get_weight_entries_filters(
+        self, sample_storage, sample_weight_entries, order
+    ):
+        date_from, date_to = dt.date(2025, 8, 20), dt.date(2025, 8, 29)
+        expected_entries = sorted(
+            (
+                entry
+                for entry in sample_weight_entries
+                if entry.user_id == TEST_USER_ID
+                and date_from <= entry.entry_date <= date_to
+            ),
+            key=lambda entry: entry.entry_date,
+            reverse=order == "desc",
+        )
+
+        entries = sample_storage.get_weight_entries(
+            TEST_USER_ID, date_from, date_to, order=order, limit=3
+        )
+
+        assert entries == expected_entries[:3]
+
+    def test_get_weight_entries_index_after_mutations(self, sample_storage):
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 8, 24), 70.0)
+        sample_storage.delete_weight_entry(TEST_USER_ID, dt.date(2025, 8, 28))
+        sample_storage.update_weight_entry(TEST_USER_ID, dt.date(2025, 8, 30), 71.0)
+
+        entries = sample_storage.get_weight_entries(
+            TEST_USER_ID, dt.date(2025, 8, 23), dt.date(2025, 8, 30)
+        )
+
+        assert [(entry.entry_date, entry.weight) for entry in entries] == [
+            (dt.date(2025, 8, 24), 70.0),
+            (dt.date(2025, 8, 29), 73.6),
+            (dt.date(2025, 8, 30), 71.0),
+        ]
+
+    def test_compact_after_mutations(self, sample_storage):
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 8, 24), 70.0)
+        sample_storage.delete_weight_entry(RANDOM_UUID, dt.date(2025, 8, 31))
+        sample_storage.update_weight_entry(TEST_USER_ID, dt.date(2025, 8, 30), 71.0)
+
+        sample_storage.compact()
+
+        for user_id in (TEST_USER_ID, RANDOM_UUID):
+            user_file_path = sample_storage.users_dir / f"{user_id}.bin"
+            day_ordinals, weights = read_columns(user_file_path)
+            saved = [
+                (dt.date.fromordinal(day_ordinal), weight)
+                for day_ordinal, weight in zip(
+                    day_ordinals.tolist(), weights.tolist(), strict=True
+                )
+            ]
+            assert saved == [
+                (entry.entry_date, entry.weight)
+                for entry in sample_storage.get_weight_entries(user_id)
+            ]
+            assert not user_file_path.with_suffix(".wal").exists()
+
+    def test_restart_replays_mutations(self, mocker, sample_storage):
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 8, 24), 70.0)
+        sample_storage.delete_weight_entry(RANDOM_UUID, dt.date(2025, 8, 31))
+        sample_storage.update_weight_entry(TEST_USER_ID, dt.date(2025, 8, 30), 71.0)
+
+        # The user files are not rewritten, the logs are replayed over them
+        mocker.stopall()
+        restarted_storage = FileStorage()
+
+        for user_id in (TEST_USER_ID, RANDOM_UUID):
+            assert restarted_storage.get_weight_entries(
+                user_id
+            ) == sample_storage.get_weight_entries(user_id)
+        assert (
+            restarted_storage.get_weight_entry(RANDOM_UUID, dt.date(2025, 8, 31))
+            is None
+        )
+
+    def test_save_compacts_log_past_threshold(self, mocker, sample_storage):
+        wal_path = sample_storage.users_dir / f"{TEST_USER_ID}.wal"
+        sample_storage.wal_compaction_records = 2
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 8, 24), 70.0)
+
+        sample_storage.save()
+        assert wal_path.exists()
+
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 8, 25), 70.5)
+        sample_storage.save()
+
+        assert not wal_path.exists()
+        mocker.stopall()
+        restarted_storage = FileStorage()
+        assert restarted_storage.get_weight_entries(
+            TEST_USER_ID
+        ) == sample_storage.get_weight_entries(TEST_USER_ID)
+
+    def test_main_file_moved_into_user_files(
+        self, mocker, sample_storage, sample_weight_entries
+    ):
+        main_file_path = FileStorage.DAILY_ENTRIES_MAIN_FILE_PATH
+        main_file_path.write_bytes(
+            TypeAdapter(list[WeightEntry]).dump_json(sample_weight_entries)
+        )
+        # Mutation logged before the switch to user files
+        WriteAheadLog(main_file_path.with_suffix(".wal")).append(
+            [
+                WalRecord(
+                    op="delete", user_id=RANDOM_UUID, entry_date=dt.date(2025, 9, 1)
+                )
+            ]
+        )
+        mocker.stopall()
+
+        storage = FileStorage()
+
+        assert storage.get_weight_entries(TEST_USER_ID) == [
+            entry for entry in sample_weight_entries if entry.user_id == TEST_USER_ID
+        ]
+        assert storage.get_weight_entry(RANDOM_UUID, dt.date(2025, 9, 1)) is None
+        assert json.loads(main_file_path.read_text()) == []
+        assert main_file_path.with_suffix(".json.migrated").exists()
+        assert not main_file_path.with_suffix(".wal").exists()
+
+    def test_user_files_load_lazily(self, mocker, sample_storage):
+        mocker.stopall()
+        load_shard = mocker.spy(FileStorage, "_load_shard")
+
+        storage = FileStorage()
+        load_shard.assert_not_called()
+
+        storage.get_weight_entries(TEST_USER_ID)
+        storage.get_latest_weight_entry(TEST_USER_ID)
+        load_shard.assert_called_once_with(storage, TEST_USER_ID)
+
+    def test_resident_users_evicted_past_budget(self, mocker, sample_storage):
+        mocker.stopall()
+        storage = FileStorage()
+        storage.max_resident_entries = 5
+        load_shard = mocker.spy(storage, "_load_shard")
+
+        storage.get_weight_entries(TEST_USER_ID)
+        storage.get_weight_entries(RANDOM_UUID)
+        # 4 + 5 entries are over the budget, the least recently used user goes
+        assert list(storage._shards) == [RANDOM_UUID]
+
+        storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+        assert list(storage._shards) == [TEST_USER_ID]
+        assert load_shard.call_count == 3
+        assert len(storage.get_weight_entries(TEST_USER_ID)) == 5
+        assert len(storage.get_weight_entries(RANDOM_UUID)) == 5
+
+    def test_shards_in_use_not_evicted(self, mocker, sample_storage):
+        mocker.stopall()
+        storage = FileStorage()
+        storage.max_resident_entries = 5
+
+        with storage._use_shard(TEST_USER_ID):
+            storage.get_weight_entries(RANDOM_UUID)
+            # Over the budget, but a request still uses the first user's shard
+            assert list(storage._shards) == [TEST_USER_ID, RANDOM_UUID]
+
+        # Evicted on the next load once it's no longer used
+        storage.get_weight_entries(UUID(int=1))
+        assert list(storage._shards) == [RANDOM_UUID, UUID(int=1)]
+
+    def test_changed_users_not_evicted_before_flush(self, mocker, sample_storage):
+        mocker.stopall()
+        storage = FileStorage()
+        storage.max_resident_entries = 5
+        storage.flush_interval_seconds = 60
+        storage.start_flusher()
+        try:
+            storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+            storage.get_weight_entries(RANDOM_UUID)
+            assert list(storage._shards) == [TEST_USER_ID, RANDOM_UUID]
+
+            storage.flush()
+            storage.get_weight_entries(UUID(int=1))
+            assert list(storage._shards) == [RANDOM_UUID, UUID(int=1)]
+        finally:
+            storage.close_connection()
+
+    def test_flush_keeps_log_records_of_other_shards(self, mocker, sample_storage):
+        mocker.stopall()
+        storage = FileStorage()
+        storage.get_weight_entries(TEST_USER_ID)
+        # A second shard of the same user, e.g. one evicted while still in use
+        other_shard = storage._load_shard(TEST_USER_ID)
+        other_shard.wal.append(
+            [
+                WalRecord(
+                    op="put",
+                    user_id=TEST_USER_ID,
+                    entry_date=dt.date(2025, 9, 2),
+                    weight=72.0,
+                )
+            ]
+        )
+        storage.update_weight_entry(TEST_USER_ID, dt.date(2025, 9, 1), 73.5)
+
+        storage.compact()
+
+        restarted_storage = FileStorage()
+        assert [
+            (entry.entry_date, entry.weight)
+            for entry in restarted_storage.get_weight_entries(
+                TEST_USER_ID, date_from=dt.date(2025, 9, 1)
+            )
+        ] == [(dt.date(2025, 9, 1), 73.5), (dt.date(2025, 9, 2), 72.0)]
+
+    def test_reads_served_from_user_file(self, mocker, sample_storage):
+        mocker.stopall()
+        storage = FileStorage()
+
+        series = storage.get_weight_series(
+            RANDOM_UUID, dt.date(2025, 8, 29), dt.date(2025, 8, 31)
+        )
+        assert list(series) == [
+            (dt.date(2025, 8, 29), 73.6),
+            (dt.date(2025, 8, 30), 82.5),
+            (dt.date(2025, 8, 31), 92.5),
+        ]
+        assert (
+            storage.get_weight_entry(RANDOM_UUID, dt.date(2025, 8, 30)).weight == 82.5
+        )
+        assert storage.get_weight_entry(RANDOM_UUID, dt.date(2025, 8, 27)) is None
+        assert storage.get_latest_weight_entry(RANDOM_UUID).weight == 73.0
+        # The entries are only loaded for a mutation
+        shard = storage._shards[RANDOM_UUID]
+        assert shard.columns is not None
+        assert shard._entries_by_date is None
+
+        storage.update_weight_entry(RANDOM_UUID, dt.date(2025, 8, 30), 82.0)
+        assert shard.columns is None
+        assert storage.get_weight_series(RANDOM_UUID).weights[2] == 82.0
+
+    def test_reads_wait_for_mutations(self, sample_storage):
+        sample_storage.get_weight_entries(TEST_USER_ID)
+        shard = sample_storage._shards[TEST_USER_ID]
+        entries = []
+        reader = threading.Thread(
+            target=lambda: entries.extend(
+                sample_storage.get_weight_entries(TEST_USER_ID)
+            )
+        )
+
+        with shard.lock:
+            # Halfway through a mutation, the date is indexed without its entry
+            shard.dates.append(dt.date(2025, 9, 10))
+            shard.columns = None
+            reader.start()
+            reader.join(timeout=0.1)
+            assert reader.is_alive()
+            shard.entries_by_date[dt.date(2025, 9, 10)] = WeightEntry(
+                user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 10), weight=70.0
+            )
+        reader.join()
+
+        assert entries[-1].entry_date == dt.date(2025, 9, 10)
+
+    def test_legacy_user_files_converted(
+        self, mocker, sample_storage, sample_weight_entries
+    ):
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 8, 24), 70.0)
+        expected_entries = sample_storage.get_weight_entries(TEST_USER_ID)
+        user_file_path = sample_storage.users_dir / f"{TEST_USER_ID}.bin"
+        user_file_path.unlink()
+        user_file_path.with_suffix(".json").write_bytes(
+            TypeAdapter(list[WeightEntry]).dump_json(
+                [
+                    entry
+                    for entry in sample_weight_entries
+                    if entry.user_id == TEST_USER_ID
+                ]
+            )
+        )
+        mocker.stopall()
+
+        storage = FileStorage()
+        assert storage.convert_user_files() == 1
+
+        assert not user_file_path.with_suffix(".json").exists()
+        assert user_file_path.exists()
+        assert storage.get_weight_entries(TEST_USER_ID) == expected_entries
+
+    def test_flusher_writes_changed_users(self, sample_storage):
+        wal_path = sample_storage.users_dir / f"{TEST_USER_ID}.wal"
+        sample_storage.flush_interval_seconds = 0.01
+        sample_storage.start_flusher()
+        try:
+            sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+            assert wal_path.exists()
+
+            deadline = time.monotonic() + 5
+            while wal_path.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            assert not wal_path.exists()
+            day_ordinals, weights = read_columns(wal_path.with_suffix(".bin"))
+            assert (day_ordinals[-1], weights[-1]) == (
+                dt.date(2025, 9, 2).toordinal(),
+                72.0,
+            )
+            assert sample_storage._dirty_users == set()
+        finally:
+            sample_storage.close_connection()
+
+    def test_failed_flush_keeps_users_changed(self, mocker, sample_storage):
+        wal_path = sample_storage.users_dir / f"{TEST_USER_ID}.wal"
+        sample_storage.flush_interval_seconds = 60
+        sample_storage.start_flusher()
+        try:
+            sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+            write_shard = mocker.patch.object(
+                sample_storage, "_write_shard", side_effect=OSError("disk full")
+            )
+
+            with pytest.raises(OSError):
+                sample_storage.flush()
+            assert sample_storage._dirty_users == {TEST_USER_ID}
+
+            mocker.stop(write_shard)
+            sample_storage.flush()
+            assert not wal_path.exists()
+            assert sample_storage._dirty_users == set()
+        finally:
+            sample_storage.close_connection()
+
+    def test_close_flushes_pending_mutations(self, mocker, sample_storage):
+        wal_path = sample_storage.users_dir / f"{TEST_USER_ID}.wal"
+        sample_storage.flush_interval_seconds = 60
+        sample_storage.start_flusher()
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+        sample_storage.delete_weight_entry(TEST_USER_ID, dt.date(2025, 8, 28))
+        # The flusher does the writes, not the request path
+        sample_storage.save()
+        assert wal_path.exists()
+
+        sample_storage.close_connection()
+
+        assert sample_storage._flusher is None
+        assert not wal_path.exists()
+        mocker.stopall()
+        restarted_storage = FileStorage()
+        assert restarted_storage.get_weight_entries(
+            TEST_USER_ID
+        ) == sample_storage.get_weight_entries(TEST_USER_ID)
+
+    def test_flusher_disabled(self, sample_storage):
+        sample_storage.flush_interval_seconds = 0
+
+        sample_storage.start_flusher()
+
+        assert sample_storage._flusher is None
+
+    def test_manage_convert_file_storage(self, mocker, sample_weight_entries):
+        main_file_path = FileStorage.DAILY_ENTRIES_MAIN_FILE_PATH
+        main_file_path.write_bytes(
+            TypeAdapter(list[WeightEntry]).dump_json(sample_weight_entries)
+        )
+
+        main(["convert-file-storage"])
+
+        users_dir = FileStorage().users_dir
+        assert sorted(path.name for path in users_dir.iterdir()) == [
+            f"{TEST_USER_ID}.bin",
+            f"{RANDOM_UUID}.bin",
+        ]
+        assert len(read_columns(users_dir / f"{RANDOM_UUID}.bin")[0]) == 5
+
     def test_get_existing_weight_entry(self, sample_storage):
         expected = {
             "entry_date": dt.date(2025, 8, 28),
@@ -254,6 +636,39 @@ class TestWeightStorageProtocol:
         assert count_before_create + len(test_user_daily_entries) == len(new_entries)
         assert test_user_daily_entries[1] == new_entries[1]
 
+    def test_create_weight_entries_failed_log_append(self, mocker, sample_storage):
+        entries_before = sample_storage.get_weight_entries(TEST_USER_ID)
+        mocker.patch.object(
+            sample_storage._shards[TEST_USER_ID].wal,
+            "append",
+            side_effect=OSError("No space left on device"),
+        )
+
+        with pytest.raises(OSError):
+            sample_storage.create_weight_entries(
+                [
+                    WeightEntry(
+                        user_id=TEST_USER_ID,
+                        entry_date=dt.date(2025, 9, 2),
+                        weight=72.0,
+                    )
+                ]
+            )
+
+        # Entries that are not in the log are not served either
+        assert sample_storage.get_weight_entries(TEST_USER_ID) == entries_before
+
+    def test_create_weight_entries_duplicate_in_batch(self, empty_storage):
+        entries = [
+            WeightEntry(
+                user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 2), weight=weight
+            )
+            for weight in (72.0, 71.0)
+        ]
+
+        assert empty_storage.create_weight_entries(entries) == entries[:1]
+        assert empty_storage.get_weight_entries(TEST_USER_ID) == entries[:1]
+
     def test_create_duplicate_weight_entry(self, sample_storage):
         existing_entries = sample_storage.get_weight_entries(TEST_USER_ID)
         assert len(existing_entries) > 0
@@ -314,6 +729,42 @@ class TestWeightStorageProtocol:
 
         assert len(sample_storage.get_weight_entries(TEST_USER_ID)) == 0
 
+    def test_mutation_listeners(self, mocker, sample_storage):
+        listener = mocker.Mock()
+        sample_storage.add_mutation_listener(listener)
+
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1), 72.1)
+        sample_storage.update_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1), 72.4)
+        sample_storage.delete_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1))
+        sample_storage.create_weight_entries(
+            [
+                WeightEntry(
+                    user_id=TEST_USER_ID, entry_date=dt.date(2025, 10, 3), weight=72
+                ),
+                WeightEntry(
+                    user_id=TEST_USER_ID, entry_date=dt.date(2025, 10, 2), weight=72
+                ),
+                WeightEntry(
+                    user_id=RANDOM_UUID, entry_date=dt.date(2025, 10, 5), weight=80
+                ),
+            ]
+        )
+
+        assert listener.call_args_list == [
+            mocker.call(TEST_USER_ID, dt.date(2025, 10, 1)),
+            mocker.call(TEST_USER_ID, dt.date(2025, 10, 1)),
+            mocker.call(TEST_USER_ID, dt.date(2025, 10, 1)),
+            mocker.call(TEST_USER_ID, dt.date(2025, 10, 2)),
+            mocker.call(RANDOM_UUID, dt.date(2025, 10, 5)),
+        ]
+
+    def test_failing_mutation_listener(self, mocker, sample_storage):
+        sample_storage.add_mutation_listener(mocker.Mock(side_effect=Exception))
+
+        sample_storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1), 72.1)
+
+        assert sample_storage.get_weight_entry(TEST_USER_ID, dt.date(2025, 10, 1))
+
     def test_delete_nonexisting_weight_entry(self, sample_storage):
         date = dt.date(1990, 1, 1)
         count_before = len(sample_storage.get_weight_entries(TEST_USER_ID))
@@ -391,6 +842,25 @@ class TestWeightStorageProtocol:
         with pytest.raises(ValueError):
             empty_storage.update_weight_entry(TEST_USER_ID, date, weight)
 
+    def test_get_latest_weight_entry(self, sample_storage, sample_weight_entries):
+        user_entries = [
+            entry for entry in sample_weight_entries if entry.user_id == TEST_USER_ID
+        ]
+        latest_entry = max(user_entries, key=lambda entry: entry.entry_date)
+        assert sample_storage.get_latest_weight_entry(TEST_USER_ID) == latest_entry
+
+        # Pointer follows entries added after or removed from the end of the history
+        new_date = latest_entry.entry_date + dt.timedelta(days=1)
+        sample_storage.create_weight_entry(TEST_USER_ID, new_date, 70.0)
+        assert sample_storage.get_latest_weight_entry(TEST_USER_ID).entry_date == (
+            new_date
+        )
+        sample_storage.delete_weight_entry(TEST_USER_ID, new_date)
+        assert sample_storage.get_latest_weight_entry(TEST_USER_ID) == latest_entry
+
+    def test_get_latest_weight_entry_empty_storage(self, empty_storage):
+        assert empty_storage.get_latest_weight_entry(TEST_USER_ID) is None
+
     def test_delete_weight_entry_empty_storage(self, empty_storage):
         date = dt.date(1990, 1, 1)
         assert empty_storage.get_weight_entry(TEST_USER_ID, date) == None
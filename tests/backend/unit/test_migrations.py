@@ -0,0 +1,174 @@
+# type: ignore
+
+import datetime as dt
+from uuid import UUID
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import migrations
+from app.db_storage import DatabaseStorage, DBWeeklyRollup, DBWeightEntry
+from app.manage import main
+
+
+@pytest.fixture
+def connection_string(tmp_path, monkeypatch):
+    connection_string = f"sqlite:///{tmp_path / 'test.db'}"
+    monkeypatch.setenv("DB_CONNECTION_STRING", connection_string)
+    return connection_string
+
+
+@pytest.fixture
+def engine(connection_string):
+    engine = create_engine(connection_string)
+    yield engine
+    engine.dispose()
+
+
+def get_index_names(engine, table_name):
+    return {index["name"] for index in inspect(engine).get_indexes(table_name)}
+
+
+def test_migrate_fresh_database(engine):
+    assert migrations.get_schema_version(engine) == 0
+
+    applied = migrations.migrate(engine)
+
+    assert [migration.version for migration in applied] == [1, 2, 3, 4]
+    assert migrations.get_schema_version(engine) == migrations.LATEST_SCHEMA_VERSION
+    assert {"weight_entries", "weekly_rollups", "google_credentials"} <= set(
+        inspect(engine).get_table_names()
+    )
+    assert "ix_weight_entries_user_date_weight" in get_index_names(
+        engine, "weight_entries"
+    )
+    assert "ix_weekly_rollups_user_week_totals" in get_index_names(
+        engine, "weekly_rollups"
+    )
+
+
+def test_migrate_is_idempotent(engine):
+    migrations.migrate(engine)
+
+    assert migrations.migrate(engine) == []
+    with engine.connect() as connection:
+        versions = connection.execute(
+            text("SELECT version FROM schema_version ORDER BY version")
+        ).all()
+    assert [version for (version,) in versions] == [1, 2, 3, 4]
+
+
+def test_migrated_tables_match_models(engine):
+    migrations.migrate(engine)
+
+    inspector = inspect(engine)
+    for name in ("weight_entries", "weekly_rollups", "google_credentials"):
+        model_table = SQLModel.metadata.tables[name]
+        assert {
+            column["name"]: (str(column["type"]), column["nullable"])
+            for column in inspector.get_columns(name)
+        } == {
+            column.name: (
+                str(column.type.compile(engine.dialect)),
+                column.nullable,
+            )
+            for column in model_table.columns
+        }
+        assert inspector.get_pk_constraint(name)["constrained_columns"] == [
+            column.name for column in model_table.primary_key
+        ]
+
+
+def test_migrate_tables_created_before_migrations(engine):
+    # Databases set up with create_all on every startup
+    SQLModel.metadata.create_all(
+        engine,
+        tables=[
+            SQLModel.metadata.tables[name]
+            for name in ("weight_entries", "weekly_rollups", "google_credentials")
+        ],
+    )
+
+    applied = migrations.migrate(engine)
+
+    assert [migration.version for migration in applied] == [1, 2, 3, 4]
+    assert "ix_weight_entries_user_date_weight" in get_index_names(
+        engine, "weight_entries"
+    )
+
+
+def test_migrate_backfills_weekly_rollups(engine):
+    # Entries stored before rollups existed, and a rollup written afterwards
+    # that only counts the week's new entry
+    user_id = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
+    for migration in migrations.MIGRATIONS[:3]:
+        with engine.begin() as connection:
+            migration.apply(connection)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                DBWeightEntry(
+                    user_id=user_id, entry_date=dt.date(2025, 9, 1), weight=72.0
+                ),
+                DBWeightEntry(
+                    user_id=user_id, entry_date=dt.date(2025, 9, 7), weight=73.0
+                ),
+                DBWeightEntry(
+                    user_id=user_id, entry_date=dt.date(2025, 9, 8), weight=71.0
+                ),
+                DBWeeklyRollup(
+                    user_id=user_id,
+                    week_start=dt.date(2025, 9, 1),
+                    weight_sum=73.0,
+                    entry_count=1,
+                ),
+            ]
+        )
+        session.commit()
+
+    migrations.migrate(engine)
+
+    with Session(engine) as session:
+        rollups = session.exec(
+            select(DBWeeklyRollup).order_by(DBWeeklyRollup.week_start)
+        ).all()
+    assert [
+        (rollup.week_start, rollup.weight_sum, rollup.entry_count) for rollup in rollups
+    ] == [(dt.date(2025, 9, 1), 145.0, 2), (dt.date(2025, 9, 8), 71.0, 1)]
+
+
+def test_weight_series_uses_covering_index(engine):
+    migrations.migrate(engine)
+
+    with engine.connect() as connection:
+        plan = connection.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT entry_date, weight FROM weight_entries "
+                "WHERE user_id = 'user' ORDER BY entry_date"
+            )
+        ).all()
+    assert "COVERING INDEX ix_weight_entries_user_date_weight" in str(plan)
+
+
+def test_database_storage_applies_pending_migrations(connection_string, engine):
+    storage = DatabaseStorage()
+    storage.close_connection()
+
+    assert migrations.get_schema_version(engine) == migrations.LATEST_SCHEMA_VERSION
+
+
+def test_database_storage_skips_current_schema(connection_string, engine, mocker):
+    migrations.migrate(engine)
+    migrate = mocker.spy(migrations, "migrate")
+
+    storage = DatabaseStorage()
+    storage.close_connection()
+
+    migrate.assert_not_called()
+
+
+def test_manage_migrate(connection_string, engine):
+    main(["migrate"])
+
+    assert migrations.get_schema_version(engine) == migrations.LATEST_SCHEMA_VERSION
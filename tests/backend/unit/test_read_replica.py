@@ -0,0 +1,170 @@
+# type: ignore
+
+import asyncio
+import datetime as dt
+from uuid import UUID
+
+import pytest
+from google.oauth2.credentials import Credentials
+from sqlmodel import Session, create_engine
+
+from app import migrations
+from app.async_db_storage import AsyncDatabaseStorage
+from app.db_storage import DatabaseStorage, DBWeightEntry
+
+TEST_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
+RANDOM_UUID = UUID("5ebcce4b-e597-406e-9d93-8de7072bbc34")
+
+
+# Primary and replica are two local SQLite files without replication,
+# so each read shows which database it was served from
+@pytest.fixture
+def replica_engine(tmp_path, monkeypatch):
+    replica_connection_string = f"sqlite:///{tmp_path / 'replica.db'}"
+    monkeypatch.setenv("DB_CONNECTION_STRING", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv("DB_READ_CONNECTION_STRING", replica_connection_string)
+    monkeypatch.setenv("DB_READ_YOUR_WRITES_SECONDS", "5")
+    engine = create_engine(replica_connection_string)
+    migrations.migrate(engine)
+    with Session(engine) as session:
+        session.add(
+            DBWeightEntry(
+                user_id=RANDOM_UUID, entry_date=dt.date(2025, 9, 1), weight=90.0
+            )
+        )
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def storage(replica_engine, clock):
+    storage = DatabaseStorage()
+    storage._clock = clock
+    yield storage
+    storage.close_connection()
+
+
+def test_reads_go_to_replica(storage):
+    entries = storage.get_weight_entries(RANDOM_UUID)
+
+    assert [(entry.entry_date, entry.weight) for entry in entries] == [
+        (dt.date(2025, 9, 1), 90.0)
+    ]
+    assert storage.get_latest_weight_entry(RANDOM_UUID).weight == 90.0
+    assert storage.get_weight_entry(RANDOM_UUID, dt.date(2025, 9, 1)).weight == 90.0
+    assert len(storage.get_weight_series(RANDOM_UUID)) == 1
+
+
+def test_writes_go_to_primary(storage, replica_engine):
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+
+    with Session(replica_engine) as session:
+        assert session.get(DBWeightEntry, (TEST_USER_ID, dt.date(2025, 9, 2))) is None
+    with Session(storage._engine) as session:
+        assert session.get(DBWeightEntry, (TEST_USER_ID, dt.date(2025, 9, 2)))
+
+
+def test_read_your_writes_window(storage, clock):
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+
+    # The writing user reads the primary within the window
+    clock.now += 4
+    assert storage.get_latest_weight_entry(TEST_USER_ID).weight == 72.0
+    assert len(storage.get_weekly_rollups(TEST_USER_ID)) == 1
+    # Other users still read the replica
+    assert storage.get_latest_weight_entry(RANDOM_UUID).weight == 90.0
+
+    # Replica reads again once the window has passed
+    clock.now += 2
+    assert storage.get_latest_weight_entry(TEST_USER_ID) is None
+    assert storage._primary_reads_until == {}
+
+
+def test_read_your_writes_window_extended_by_writes(storage, clock):
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+    clock.now += 4
+    storage.update_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 71.0)
+    clock.now += 4
+
+    assert storage.get_latest_weight_entry(TEST_USER_ID).weight == 71.0
+
+
+def test_passed_windows_dropped_on_writes(storage, clock):
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+    clock.now += 3
+    storage.create_weight_entry(RANDOM_UUID, dt.date(2025, 9, 2), 80.0)
+    clock.now += 3
+    storage.create_weight_entry(UUID(int=1), dt.date(2025, 9, 2), 60.0)
+
+    # Users that didn't read after their window passed don't stay in the map
+    assert list(storage._primary_reads_until) == [RANDOM_UUID, UUID(int=1)]
+
+
+def test_async_reads_follow_read_your_writes_window(storage, clock, monkeypatch):
+    monkeypatch.delenv("ASYNC_DB_CONNECTION_STRING", raising=False)
+    monkeypatch.delenv("ASYNC_DB_READ_CONNECTION_STRING", raising=False)
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+
+    async def get_latest_weights():
+        async_storage = AsyncDatabaseStorage(reads_primary=storage.reads_primary)
+        try:
+            return [
+                await async_storage.get_latest_weight_entry(user_id)
+                for user_id in (TEST_USER_ID, RANDOM_UUID)
+            ]
+        finally:
+            await async_storage.close_connection()
+
+    clock.now += 4
+    writer_entry, other_entry = asyncio.run(get_latest_weights())
+    assert writer_entry.weight == 72.0
+    assert other_entry.weight == 90.0
+
+    clock.now += 2
+    writer_entry, other_entry = asyncio.run(get_latest_weights())
+    assert writer_entry is None
+    assert other_entry.weight == 90.0
+
+
+def test_pool_stats_include_replica(storage):
+    storage.get_weight_entries(RANDOM_UUID)
+
+    stats = storage.pool_stats()
+
+    assert stats.replica.checkouts >= 1
+    assert stats.replica.checked_out == 0
+    assert stats.primary is not None
+
+
+def test_credentials_read_your_writes(storage, clock, monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client1")
+    monkeypatch.setenv("GOOGLE_CLIENT_SECRET", "secret1")
+    storage.store_google_credentials(
+        TEST_USER_ID,
+        Credentials(
+            token="abc123",
+            refresh_token="dae/",
+            scopes=["read"],
+            token_uri="https://url.sample",
+        ),
+    )
+
+    assert storage.load_google_credentials(TEST_USER_ID).token == "abc123"
+    clock.now += 6
+    # Missing from the unreplicated replica
+    assert storage.load_google_credentials(TEST_USER_ID) is None
+
+
+def test_without_replica_reads_primary(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_CONNECTION_STRING", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.delenv("DB_READ_CONNECTION_STRING", raising=False)
+    storage = DatabaseStorage()
+    try:
+        storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 2), 72.0)
+
+        assert storage._read_engine is storage._engine
+        assert storage._primary_reads_until == {}
+        assert storage.get_latest_weight_entry(TEST_USER_ID).weight == 72.0
+    finally:
+        storage.close_connection()
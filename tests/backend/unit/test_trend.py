@@ -0,0 +1,244 @@
+# type: ignore
+
+import datetime as dt
+import threading
+from uuid import UUID
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.file_storage import FileStorage
+from app.project_types import WeightEntry
+from app.trend import TrendTracker
+
+TEST_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
+RANDOM_UUID = UUID("5ebcce4b-e597-406e-9d93-8de7072bbc34")
+
+
+@pytest.fixture
+def sample_weight_entries():
+    data = [
+        {"entry_date": dt.date(2025, 9, 3), "weight": 72.0, "user_id": TEST_USER_ID},
+        {"entry_date": dt.date(2025, 9, 1), "weight": 74.0, "user_id": TEST_USER_ID},
+        {"entry_date": dt.date(2025, 9, 2), "weight": 73.0, "user_id": TEST_USER_ID},
+        {"entry_date": dt.date(2025, 9, 5), "weight": 71.0, "user_id": TEST_USER_ID},
+        {"entry_date": dt.date(2025, 9, 1), "weight": 90.0, "user_id": RANDOM_UUID},
+    ]
+    return TypeAdapter(list[WeightEntry]).validate_python(data)
+
+
+@pytest.fixture
+def storage(mocker, sample_weight_entries):
+    mocker.patch(
+        "app.file_storage.FileStorage._load_weights_from_file"
+    ).return_value = sample_weight_entries
+    return FileStorage()
+
+
+@pytest.fixture
+def tracker(storage):
+    tracker = TrendTracker()
+    tracker.watch(storage)
+    return tracker
+
+
+def expected_trends(weights, smoothing=0.1):
+    trends = []
+    for weight in weights:
+        trends.append(
+            weight if not trends else trends[-1] + smoothing * (weight - trends[-1])
+        )
+    return [round(trend, 2) for trend in trends]
+
+
+def test_get_trend(tracker, storage):
+    points = tracker.get_trend(storage, TEST_USER_ID)
+
+    assert [point.entry_date for point in points] == [
+        dt.date(2025, 9, 1),
+        dt.date(2025, 9, 2),
+        dt.date(2025, 9, 3),
+        dt.date(2025, 9, 5),
+    ]
+    assert [point.weight for point in points] == [74.0, 73.0, 72.0, 71.0]
+    assert [point.trend for point in points] == expected_trends([74, 73, 72, 71])
+
+
+def test_get_trend_date_range(tracker, storage):
+    points = tracker.get_trend(
+        storage, TEST_USER_ID, dt.date(2025, 9, 2), dt.date(2025, 9, 4)
+    )
+
+    # Trend still starts from the first entry of the whole history
+    assert [(point.entry_date, point.trend) for point in points] == [
+        (dt.date(2025, 9, 2), expected_trends([74, 73])[-1]),
+        (dt.date(2025, 9, 3), expected_trends([74, 73, 72])[-1]),
+    ]
+
+
+def test_get_trend_no_entries(tracker, storage):
+    assert tracker.get_trend(storage, UUID(int=1)) == []
+
+
+def test_trend_append_reads_only_new_entries(tracker, storage, mocker):
+    tracker.get_trend(storage, TEST_USER_ID)
+    read_series = mocker.spy(storage, "get_weight_series")
+
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 6), 70.0)
+    points = tracker.get_trend(storage, TEST_USER_ID)
+
+    read_series.assert_called_once_with(TEST_USER_ID, date_from=dt.date(2025, 9, 6))
+    assert [point.trend for point in points] == expected_trends([74, 73, 72, 71, 70])
+
+
+@pytest.mark.parametrize(
+    "mutation, expected_weights",
+    [
+        (
+            lambda storage: storage.update_weight_entry(
+                TEST_USER_ID, dt.date(2025, 9, 2), 80.0
+            ),
+            [74, 80, 72, 71],
+        ),
+        (
+            lambda storage: storage.delete_weight_entry(
+                TEST_USER_ID, dt.date(2025, 9, 2)
+            ),
+            [74, 72, 71],
+        ),
+        (
+            lambda storage: storage.create_weight_entries(
+                TypeAdapter(list[WeightEntry]).validate_python(
+                    [
+                        {
+                            "entry_date": dt.date(2025, 9, 6),
+                            "weight": 70.0,
+                            "user_id": TEST_USER_ID,
+                        },
+                        {
+                            "entry_date": dt.date(2025, 9, 4),
+                            "weight": 71.5,
+                            "user_id": TEST_USER_ID,
+                        },
+                    ]
+                )
+            ),
+            [74, 73, 72, 71.5, 71, 70],
+        ),
+    ],
+)
+def test_trend_recomputes_changed_suffix(
+    tracker, storage, mocker, mutation, expected_weights
+):
+    tracker.get_trend(storage, TEST_USER_ID)
+    read_series = mocker.spy(storage, "get_weight_series")
+
+    mutation(storage)
+    points = tracker.get_trend(storage, TEST_USER_ID)
+
+    assert read_series.call_args.kwargs["date_from"] > dt.date(2025, 9, 1)
+    assert [point.weight for point in points] == expected_weights
+    assert [point.trend for point in points] == expected_trends(expected_weights)
+
+
+def test_trend_other_user_mutation(tracker, storage, mocker):
+    tracker.get_trend(storage, TEST_USER_ID)
+    read_series = mocker.spy(storage, "get_weight_series")
+
+    storage.create_weight_entry(RANDOM_UUID, dt.date(2025, 9, 2), 89.0)
+    tracker.get_trend(storage, TEST_USER_ID)
+
+    read_series.assert_not_called()
+
+
+def test_trend_evicts_least_recent_user(storage, mocker):
+    tracker = TrendTracker(max_users=1)
+    tracker.get_trend(storage, TEST_USER_ID)
+    tracker.get_trend(storage, RANDOM_UUID)
+    read_series = mocker.spy(storage, "get_weight_series")
+
+    tracker.get_trend(storage, TEST_USER_ID)
+
+    read_series.assert_called_once_with(TEST_USER_ID)
+
+
+def test_trend_reloaded_after_ttl(storage, clock, mocker):
+    tracker = TrendTracker(ttl_seconds=60, clock=clock)
+    tracker.get_trend(storage, TEST_USER_ID)
+    read_series = mocker.spy(storage, "get_weight_series")
+
+    clock.now = 60
+    tracker.get_trend(storage, TEST_USER_ID)
+    read_series.assert_not_called()
+
+    # Not watched, the change is only seen after the trend expires
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 6), 70.0)
+    clock.now = 61
+    points = tracker.get_trend(storage, TEST_USER_ID)
+
+    read_series.assert_called_once_with(TEST_USER_ID)
+    assert [point.weight for point in points] == [74.0, 73.0, 72.0, 71.0, 70.0]
+
+
+def test_trend_reread_after_replica_lag(storage, clock, mocker):
+    tracker = TrendTracker(clock=clock, replica_lag_seconds=30)
+    tracker.watch(storage)
+    tracker.get_trend(storage, TEST_USER_ID)
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 6), 70.0)
+    read_series = mocker.spy(storage, "get_weight_series")
+
+    # The change stays marked while a lagging replica may serve the reads
+    for now in [10, 29.9, 30]:
+        clock.now = now
+        tracker.get_trend(storage, TEST_USER_ID)
+    clock.now = 31
+    tracker.get_trend(storage, TEST_USER_ID)
+
+    assert read_series.call_count == 3
+    assert read_series.call_args.kwargs["date_from"] == dt.date(2025, 9, 6)
+
+
+def test_trend_first_load_reread_after_replica_lag(storage, clock, mocker):
+    tracker = TrendTracker(clock=clock, replica_lag_seconds=30)
+    tracker.watch(storage)
+    storage.create_weight_entry(TEST_USER_ID, dt.date(2025, 9, 6), 70.0)
+    tracker.get_trend(storage, TEST_USER_ID)
+    read_series = mocker.spy(storage, "get_weight_series")
+
+    clock.now = 30
+    points = tracker.get_trend(storage, TEST_USER_ID)
+    clock.now = 31
+    tracker.get_trend(storage, TEST_USER_ID)
+
+    read_series.assert_called_once()
+    assert [point.weight for point in points] == [74.0, 73.0, 72.0, 71.0, 70.0]
+
+
+def test_trend_read_does_not_block_other_users(tracker, storage, mocker):
+    read_started = threading.Event()
+    release_read = threading.Event()
+    get_weight_series = storage.get_weight_series
+
+    def slow_get_weight_series(user_id, **kwargs):
+        if user_id == TEST_USER_ID:
+            read_started.set()
+            release_read.wait(timeout=5)
+        return get_weight_series(user_id, **kwargs)
+
+    mocker.patch.object(storage, "get_weight_series", slow_get_weight_series)
+    slow_read = threading.Thread(target=tracker.get_trend, args=(storage, TEST_USER_ID))
+    slow_read.start()
+    try:
+        assert read_started.wait(timeout=5)
+        points = tracker.get_trend(storage, RANDOM_UUID)
+        assert not release_read.is_set()
+        assert [point.weight for point in points] == [90.0]
+    finally:
+        release_read.set()
+        slow_read.join()
+
+
+@pytest.mark.parametrize("smoothing", [0, -0.1, 1.5])
+def test_invalid_trend_smoothing(smoothing):
+    with pytest.raises(ValueError):
+        TrendTracker(smoothing=smoothing)
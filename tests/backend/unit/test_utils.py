@@ -6,12 +6,8 @@ import pytest
 from pydantic import TypeAdapter
 from uuid import UUID
 
-from app.project_types import WeightEntry
-from app.utils import (
-    filter_daily_entries,
-    get_latest_daily_entry,
-    get_latest_entry_date,
-)
+from app.project_types import WeightEntry, WeightSeries
+from app.utils import MutationNotifier, RecentChanges, get_env_flag, get_env_uuids
 
 TEST_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
 
@@ -49,119 +45,97 @@ class TestDailyEntriesManipulation:
         return TypeAdapter(list[WeightEntry]).validate_python(data)
 
     @pytest.mark.parametrize(
-        "daily_entries, date_from, date_to, expected_count",
+        "date_from, date_to",
         [
-            ([], None, None, 0),
-            ([], dt.date(2025, 8, 30), None, 0),
-            ([], None, dt.date(2025, 8, 30), 0),
+            (dt.date(2025, 8, 1), dt.date(2025, 9, 1)),
+            (dt.date(2025, 5, 28), None),
+            (None, dt.date(2025, 6, 1)),
+            (dt.date(2025, 8, 29), dt.date(2025, 8, 29)),
+            (None, None),
+            (dt.date(2025, 5, 28), dt.date(2025, 1, 1)),
         ],
     )
-    def test_filter_empty_daily_entries(
-        self, daily_entries, date_from, date_to, expected_count
-    ):
-        filtered: list[WeightEntry] = filter_daily_entries(
-            daily_entries=daily_entries, date_from=date_from, date_to=date_to
+    def test_filter_weight_series(self, sample_daily_entries, date_from, date_to):
+        series = WeightSeries.from_entries(TEST_USER_ID, sample_daily_entries)
+        expected = sorted(
+            (
+                entry
+                for entry in sample_daily_entries
+                if (date_from is None or entry.entry_date >= date_from)
+                and (date_to is None or entry.entry_date <= date_to)
+            ),
+            key=lambda entry: entry.entry_date,
         )
-        assert len(filtered) == expected_count
+        assert series.between(date_from, date_to).to_entries() == expected
 
-    @pytest.mark.parametrize(
-        "date_from, date_to, expected_count",
-        [
-            (dt.date(2025, 8, 1), dt.date(2025, 9, 1), 3),
-            (dt.date(2025, 5, 28), dt.date(2025, 9, 1), 4),
-            (dt.date(2025, 5, 28), None, 4),
-            (None, dt.date(2025, 6, 1), 2),
-            (None, None, 5),
-            (dt.date(2025, 5, 28), dt.date(2025, 1, 1), 0),
-        ],
-    )
-    def test_filter_sample_daily_entries(
-        self, sample_daily_entries, date_from, date_to, expected_count
-    ):
-        filtered: list[WeightEntry] = filter_daily_entries(
-            daily_entries=sample_daily_entries, date_from=date_from, date_to=date_to
+    def test_weight_series_sorted_by_date(self, sample_daily_entries):
+        series = WeightSeries.from_entries(TEST_USER_ID, sample_daily_entries)
+        assert len(series) == len(sample_daily_entries)
+        assert list(series.day_ordinals) == sorted(
+            entry.entry_date.toordinal() for entry in sample_daily_entries
         )
-        assert len(filtered) == expected_count
+        assert list(series)[-1] == (dt.date(2025, 8, 30), 72.5)
 
-    @pytest.mark.parametrize(
-        "entries, expected_value",
-        [
-            ([], None),
-            (
-                [
-                    {
-                        "entry_date": dt.date(2025, 5, 20),
-                        "weight": 72.5,
-                        "user_id": TEST_USER_ID,
-                    }
-                ],
-                dt.date(2025, 5, 20),
-            ),
-            (
-                [
-                    {
-                        "entry_date": dt.date(2024, 5, 20),
-                        "weight": 72.5,
-                        "user_id": TEST_USER_ID,
-                    },
-                    {
-                        "entry_date": dt.date(2025, 1, 15),
-                        "weight": 72.5,
-                        "user_id": TEST_USER_ID,
-                    },
-                ],
-                dt.date(2025, 1, 15),
-            ),
-        ],
-    )
-    def test_get_latest_date(self, entries, expected_value):
-        daily_entries = TypeAdapter(list[WeightEntry]).validate_python(entries)
-        result = get_latest_entry_date(daily_entries)
-        assert result == expected_value
+    def test_empty_weight_series(self):
+        series = WeightSeries(TEST_USER_ID)
+        assert len(series) == 0
+        assert series.to_entries() == []
 
-    @pytest.mark.parametrize(
-        "entries, expected_value",
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("true", True), ("1", True), (" Yes ", True), ("false", False), ("", False)],
+)
+def test_get_env_flag(monkeypatch, value, expected):
+    monkeypatch.setenv("TEST_FLAG", value)
+    assert get_env_flag("TEST_FLAG") is expected
+
+
+def test_get_env_flag_default(monkeypatch):
+    monkeypatch.delenv("TEST_FLAG", raising=False)
+    assert get_env_flag("TEST_FLAG") is False
+    assert get_env_flag("TEST_FLAG", default=True) is True
+
+
+def test_get_env_uuids(monkeypatch):
+    monkeypatch.setenv("TEST_IDS", f" {TEST_USER_ID}, ,{UUID(int=1)}")
+    assert get_env_uuids("TEST_IDS") == {TEST_USER_ID, UUID(int=1)}
+
+    monkeypatch.delenv("TEST_IDS")
+    assert get_env_uuids("TEST_IDS") == frozenset()
+
+
+def test_mutation_notifier(mocker):
+    notifier = MutationNotifier()
+    failing_listener = mocker.Mock(side_effect=Exception)
+    listener = mocker.Mock()
+    notifier.add_mutation_listener(failing_listener)
+    notifier.add_mutation_listener(listener)
+
+    notifier._notify_entries_mutation(
         [
-            ([], None),
-            (
-                [
-                    {
-                        "entry_date": dt.date(2025, 5, 20),
-                        "weight": 72.5,
-                        "user_id": TEST_USER_ID,
-                    }
-                ],
-                {
-                    "entry_date": dt.date(2025, 5, 20),
-                    "weight": 72.5,
-                    "user_id": TEST_USER_ID,
-                },
-            ),
-            (
-                [
-                    {
-                        "entry_date": dt.date(2024, 5, 20),
-                        "weight": 75.5,
-                        "user_id": TEST_USER_ID,
-                    },
-                    {
-                        "entry_date": dt.date(2025, 1, 15),
-                        "weight": 71.5,
-                        "user_id": TEST_USER_ID,
-                    },
-                ],
-                {
-                    "entry_date": dt.date(2025, 1, 15),
-                    "weight": 71.5,
-                    "user_id": TEST_USER_ID,
-                },
-            ),
-        ],
+            (TEST_USER_ID, dt.date(2025, 9, 3)),
+            (UUID(int=1), dt.date(2025, 9, 5)),
+            (TEST_USER_ID, dt.date(2025, 9, 1)),
+        ]
     )
-    def test_get_latest_daily_entry(self, entries, expected_value):
-        daily_entries = TypeAdapter(list[WeightEntry]).validate_python(entries)
-        result = get_latest_daily_entry(daily_entries)
-        expected_latest_entry = (
-            WeightEntry.model_validate(expected_value) if expected_value else None
-        )
-        assert result == expected_latest_entry
+
+    # A failing listener doesn't keep the others from being notified
+    assert listener.call_args_list == [
+        mocker.call(TEST_USER_ID, dt.date(2025, 9, 1)),
+        mocker.call(UUID(int=1), dt.date(2025, 9, 5)),
+    ]
+    assert failing_listener.call_count == 2
+
+
+def test_recent_changes():
+    recent_changes = RecentChanges(max_age=5)
+    recent_changes.add(TEST_USER_ID, now=0)
+    recent_changes.add(UUID(int=1), now=3)
+
+    assert recent_changes.get(TEST_USER_ID, now=4.9) == 0
+    assert recent_changes.get(TEST_USER_ID, now=5) is None
+
+    # Changes older than max_age are dropped on the next change
+    recent_changes.add(UUID(int=2), now=6)
+    assert list(recent_changes._changed_at) == [UUID(int=1), UUID(int=2)]
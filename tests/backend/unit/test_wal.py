@@ -0,0 +1,97 @@
+# type: ignore
+
+import datetime as dt
+from uuid import UUID
+
+import pytest
+
+from app.wal import WalRecord, WriteAheadLog
+
+TEST_USER_ID = UUID("3760183f-61fa-4ee1-badf-2668fbec152d")
+
+
+@pytest.fixture
+def records():
+    return [
+        WalRecord(
+            op="put", user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 1), weight=72.5
+        ),
+        WalRecord(
+            op="put", user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 2), weight=72.0
+        ),
+        WalRecord(op="delete", user_id=TEST_USER_ID, entry_date=dt.date(2025, 9, 1)),
+    ]
+
+
+@pytest.fixture
+def wal(tmp_path):
+    return WriteAheadLog(tmp_path / "data" / "daily_data.wal")
+
+
+def test_replay_missing_log(wal):
+    assert wal.replay() == []
+    assert wal.record_count == 0
+
+
+def test_append_and_replay(wal, records):
+    wal.append(records[:2])
+    wal.append(records[2:])
+
+    assert wal.record_count == 3
+    assert WriteAheadLog(wal.path).replay() == records
+    # One compact line per record
+    assert len(wal.path.read_bytes().splitlines()) == 3
+
+
+def test_append_nothing(wal):
+    wal.append([])
+
+    assert not wal.path.exists()
+    assert wal.record_count == 0
+
+
+@pytest.mark.parametrize(
+    "torn_tail",
+    [b'{"op":"put","user_id":"3760183f', b"\x00\x00\x00", b'{"op":"oops"}\n'],
+)
+def test_replay_truncates_torn_record(wal, records, torn_tail):
+    wal.append(records)
+    valid_size = wal.path.stat().st_size
+    with open(wal.path, "ab") as wal_file:
+        wal_file.write(torn_tail)
+
+    replay_wal = WriteAheadLog(wal.path)
+
+    assert replay_wal.replay() == records
+    assert replay_wal.record_count == 3
+    assert wal.path.stat().st_size == valid_size
+
+    # Appends continue after the last complete record
+    replay_wal.append(records[:1])
+    assert WriteAheadLog(wal.path).replay() == records + records[:1]
+
+
+def test_reset(wal, records):
+    wal.append(records)
+
+    wal.reset()
+
+    assert not wal.path.exists()
+    assert wal.record_count == 0
+    assert wal.replay() == []
+
+
+def test_reset_keeps_records_appended_by_others(wal, records):
+    wal.append(records[:2])
+    # Appended through another object, not part of this log's snapshot
+    WriteAheadLog(wal.path).append(records[2:])
+
+    wal.reset()
+
+    assert wal.record_count == 0
+    assert WriteAheadLog(wal.path).replay() == records
+
+    replay_wal = WriteAheadLog(wal.path)
+    replay_wal.replay()
+    replay_wal.reset()
+    assert not wal.path.exists()